@@ -0,0 +1 @@
+"""Route-level benchmarks on a synthetic dataset (python -m benchmarks.run --help)"""
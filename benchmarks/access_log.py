@@ -0,0 +1,182 @@
+"""Access-log route report and traffic replay.
+
+    python -m benchmarks.access_log report gunicorn_access.log [--top 20]
+    python -m benchmarks.access_log replay gunicorn_access.log --target http://localhost:8080 [--speed 2]
+
+Lines use the combined format written by ``gunicorn.conf.py`` with the
+``rt_us=<microseconds> worker=<pid> cache=<X-Cache> rid=<X-Request-ID>``
+suffix; older lines without it are still parsed (they count, but have no
+latency). Paths are grouped into routes by replacing ids, upload names and
+hashed asset names with placeholders.
+
+``replay`` re-issues the logged GET/HEAD requests against another instance,
+keeping their relative timing (divided by ``--speed``; 0 sends them as fast
+as the workers allow), and reports the latencies it measured per route.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from .run import percentile
+import argparse
+import re
+import sys
+import threading
+import time
+
+import requests
+
+LINE_RE = re.compile(
+    r'^(?P<host>\S+) \S+ \S+ \[(?P<time>[^\]]+)\] "(?P<method>[A-Z]+) (?P<target>\S+)(?: [^"]*)?" '
+    r'(?P<status>\d{3}) (?P<size>\S+)(?: "(?P<referer>[^"]*)" "(?P<agent>[^"]*)")?'
+    r'(?: rt_us=(?P<rt_us>\d+) worker=<?(?P<worker>[^> ]*)>? cache=(?P<cache>\S*)(?: rid=(?P<request_id>\S+))?)?'
+)
+LOG_TIME_FORMAT = '%d/%b/%Y:%H:%M:%S %z'
+REPLAY_METHODS = ('GET', 'HEAD')
+DEFAULT_CONCURRENCY = 8
+
+_ROUTE_PATTERNS = (
+    (re.compile(r'^/static/uploads/.+'), '/static/uploads/<file>'),
+    (re.compile(r'^/static/dist/.+'), '/static/dist/<asset>'),
+    (re.compile(r'/\d+(?=/|$)'), '/<id>'),
+    (re.compile(r'/[0-9a-f]{16,}(?=/|$)'), '/<hash>'),
+)
+
+
+def parse_line(line):
+    """Dict of one access-log line's fields, or None if it does not match"""
+    match = LINE_RE.match(line)
+    if not match:
+        return None
+    entry = match.groupdict()
+    entry['status'] = int(entry['status'])
+    entry['time'] = datetime.strptime(entry['time'], LOG_TIME_FORMAT)
+    entry['duration_ms'] = int(entry['rt_us']) / 1000 if entry['rt_us'] else None
+    entry['cache'] = entry['cache'] if entry['cache'] not in (None, '-', '') else None
+    entry['request_id'] = entry['request_id'] if entry['request_id'] not in (None, '-') else None
+    entry['route'] = route_of(entry['target'])
+    return entry
+
+
+def route_of(target):
+    path = target.split('?', 1)[0]
+    for pattern, replacement in _ROUTE_PATTERNS:
+        path = pattern.sub(replacement, path)
+    return path
+
+
+def read_log(path):
+    entries = []
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            entry = parse_line(line.rstrip('\n'))
+            if entry is not None:
+                entries.append(entry)
+    return entries
+
+
+def route_report(entries):
+    """Per ``METHOD route`` stats, slowest total time first"""
+    groups = {}
+    for entry in entries:
+        groups.setdefault(f"{entry['method']} {entry['route']}", []).append(entry)
+    report = []
+    for route, group in groups.items():
+        durations = [e['duration_ms'] for e in group if e['duration_ms'] is not None]
+        cached = [e for e in group if e['cache']]
+        report.append({
+            'route': route,
+            'count': len(group),
+            'p50_ms': round(percentile(durations, 50), 1) if durations else None,
+            'p90_ms': round(percentile(durations, 90), 1) if durations else None,
+            'p99_ms': round(percentile(durations, 99), 1) if durations else None,
+            'max_ms': round(max(durations), 1) if durations else None,
+            'total_ms': round(sum(durations), 1),
+            'errors': sum(1 for e in group if e['status'] >= 500),
+            'cache_hit_rate': round(sum(1 for e in cached if e['cache'] == 'HIT') / len(cached), 2) if cached else None,
+        })
+    report.sort(key=lambda r: (r['total_ms'], r['count']), reverse=True)
+    return report
+
+
+def print_report(report, top=None):
+    def cell(value):
+        return '-' if value is None else value
+    print(f"{'route':<40} {'count':>7} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8} {'5xx':>5} {'hit':>5}")
+    for r in report[:top]:
+        print(f"{r['route'][:40]:<40} {r['count']:>7} {cell(r['p50_ms']):>8} {cell(r['p90_ms']):>8} "
+              f"{cell(r['p99_ms']):>8} {cell(r['max_ms']):>8} {r['errors']:>5} {cell(r['cache_hit_rate']):>5}")
+
+
+def replay(entries, target, speed=1.0, concurrency=DEFAULT_CONCURRENCY, methods=REPLAY_METHODS, timeout=30):
+    """Re-issue logged requests against ``target``; returns entries with the measured durations"""
+    entries = [e for e in entries if e['method'] in methods]
+    if not entries:
+        return []
+    target = target.rstrip('/')
+    start_time = entries[0]['time']
+    results = []
+    lock = threading.Lock()
+    session = requests.Session()
+
+    def send(entry):
+        headers = {}
+        if entry['agent'] and entry['agent'] != '-':
+            headers['User-Agent'] = entry['agent']
+        started = time.perf_counter()
+        try:
+            response = session.request(entry['method'], target + entry['target'], headers=headers,
+                                        timeout=timeout, allow_redirects=False)
+            status = response.status_code
+            cache = response.headers.get('X-Cache')
+        except requests.exceptions.RequestException as e:
+            print(f"[ERROR] {entry['method']} {entry['target']}: {e}")
+            status, cache = 599, None
+        result = dict(entry, status=status, cache=cache, duration_ms=(time.perf_counter() - started) * 1000)
+        with lock:
+            results.append(result)
+
+    began = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for entry in entries:
+            if speed > 0:
+                delay = (entry['time'] - start_time).total_seconds() / speed - (time.monotonic() - began)
+                if delay > 0:
+                    time.sleep(delay)
+            executor.submit(send, entry)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    report_parser = commands.add_parser('report', help='per-route latency percentiles of a log')
+    report_parser.add_argument('log')
+    report_parser.add_argument('--top', type=int, help='only the N routes with the most total time')
+    replay_parser = commands.add_parser('replay', help='replay a log against an instance')
+    replay_parser.add_argument('log')
+    replay_parser.add_argument('--target', default='http://localhost:8080')
+    replay_parser.add_argument('--speed', type=float, default=1.0,
+                               help='time compression factor; 0 replays as fast as possible')
+    replay_parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY)
+    replay_parser.add_argument('--methods', default=','.join(REPLAY_METHODS),
+                               help='comma-separated methods to replay (others are skipped)')
+    replay_parser.add_argument('--top', type=int)
+    args = parser.parse_args(argv)
+
+    entries = read_log(args.log)
+    if not entries:
+        print(f'[ERROR] No access-log lines found in {args.log}')
+        return 1
+    if args.command == 'report':
+        print_report(route_report(entries), args.top)
+        return 0
+
+    methods = tuple(m.strip().upper() for m in args.methods.split(',') if m.strip())
+    started = time.monotonic()
+    results = replay(entries, args.target, args.speed, args.concurrency, methods)
+    print(f'[INFO] Replayed {len(results)} requests in {time.monotonic() - started:.1f}s against {args.target}')
+    print_report(route_report(results), args.top)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
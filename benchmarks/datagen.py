@@ -0,0 +1,125 @@
+"""Deterministic synthetic dataset for benchmarks.
+
+The same ``seed`` always produces the same rows: categories are drawn from
+a Zipf distribution (a few large sections, a long tail of small ones),
+article lengths from a log-normal distribution around a typical news story,
+and words from a Zipf-weighted vocabulary so term statistics resemble
+real text.
+"""
+from datetime import datetime, timedelta, timezone
+from news_app.Backend.models.article import Article
+from news_app.Backend.models.db import db
+from news_app.Backend.models.media import Media
+from news_app.Backend.services.category_service import create_category, invalidate_category_directory, list_categories
+from news_app.Backend.services.media_reference_service import rebuild_media_references
+from news_app.Backend.services.related_service import rebuild_related_articles
+from sqlalchemy import insert
+import hashlib
+import itertools
+import random
+
+INSERT_CHUNK_SIZE = 1000
+ZIPF_EXPONENT = 1.1
+VOCABULARY_SIZE = 20000
+# Median article length in words and the spread of the log-normal
+MEDIAN_WORDS = 600
+WORDS_SIGMA = 0.6
+TITLE_WORDS = (4, 12)
+MEDIA_TYPES = (('image/jpeg', 'jpg', 0.6), ('image/png', 'png', 0.3), ('image/webp', 'webp', 0.1))
+# Share of articles whose image is an uploaded media item
+UPLOAD_IMAGE_SHARE = 0.4
+
+
+def zipf_weights(n, exponent=ZIPF_EXPONENT):
+    return [1 / (rank ** exponent) for rank in range(1, n + 1)]
+
+
+def _vocabulary(rng, size):
+    syllables = ['ka', 'lo', 'mi', 'ne', 'tor', 'vas', 'rin', 'del', 'sum', 'pra', 'qui', 'ber', 'gon', 'tel']
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(syllables) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+class DatasetGenerator:
+    def __init__(self, seed=42, vocabulary_size=VOCABULARY_SIZE):
+        self.rng = random.Random(seed)
+        self.vocabulary = _vocabulary(self.rng, vocabulary_size)
+        self.cumulative_word_weights = list(itertools.accumulate(zipf_weights(vocabulary_size)))
+
+    def words(self, count):
+        return ' '.join(self.rng.choices(self.vocabulary, cum_weights=self.cumulative_word_weights, k=count))
+
+    def article_length(self):
+        return max(30, int(self.rng.lognormvariate(0, WORDS_SIGMA) * MEDIAN_WORDS))
+
+    def media_rows(self, count, start=datetime(2024, 1, 1, tzinfo=timezone.utc)):
+        rows = []
+        types, exts, weights = zip(*MEDIA_TYPES)
+        for i in range(count):
+            index = self.rng.choices(range(len(types)), weights=weights)[0]
+            sha256 = hashlib.sha256(f'bench-media-{i}'.encode()).hexdigest()
+            filename = f'{sha256}.{exts[index]}'
+            rows.append({
+                'filename': filename,
+                'original_name': f'photo-{i:06d}.{exts[index]}',
+                'file_type': types[index],
+                'file_size': int(self.rng.lognormvariate(12, 1)),
+                'file_path': filename,
+                'sha256': sha256,
+                'uploaded_at': start + timedelta(minutes=i),
+            })
+        return rows
+
+    def article_rows(self, count, category_ids, media_filenames, days=90):
+        weights = zipf_weights(len(category_ids))
+        now = datetime.now(timezone.utc)
+        for i in range(count):
+            image_url = None
+            if media_filenames and self.rng.random() < UPLOAD_IMAGE_SHARE:
+                image_url = '/static/uploads/' + self.rng.choice(media_filenames)
+            created_at = now - timedelta(seconds=self.rng.randint(0, days * 86400))
+            yield {
+                'title': self.words(self.rng.randint(*TITLE_WORDS)).capitalize(),
+                'author': f'Reporter {self.rng.randint(1, 200)}',
+                'content': self.words(self.article_length()),
+                'image_url': image_url,
+                'category_id': self.rng.choices(category_ids, weights=weights)[0],
+                'created_at': created_at,
+                'updated_at': created_at,
+            }
+
+
+def generate_dataset(articles=5000, categories=30, media=1000, seed=42, related=True):
+    """Insert a synthetic dataset into the current app's database; returns row counts.
+
+    Derived tables (media references, related articles unless ``related`` is
+    False) are rebuilt so routes see the same state as on a live site.
+    """
+    generator = DatasetGenerator(seed)
+    existing = {c.name for c in list_categories()}
+    for i in range(categories):
+        name = f'Section {i + 1:03d}'
+        if name not in existing:
+            create_category(name, f'Synthetic category {i + 1}')
+    category_ids = [c.id for c in list_categories()]
+
+    media_rows = generator.media_rows(media)
+    if media_rows:
+        db.session.execute(insert(Media), media_rows)
+        db.session.commit()
+    media_filenames = [row['filename'] for row in media_rows]
+
+    rows = generator.article_rows(articles, category_ids, media_filenames)
+    while True:
+        chunk = list(itertools.islice(rows, INSERT_CHUNK_SIZE))
+        if not chunk:
+            break
+        db.session.execute(insert(Article), chunk)
+    db.session.commit()
+    invalidate_category_directory()
+    rebuild_media_references()
+    if related:
+        rebuild_related_articles()
+    return {'articles': Article.query.count(), 'categories': len(category_ids), 'media': Media.query.count()}
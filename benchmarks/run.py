@@ -0,0 +1,219 @@
+"""Route-level benchmarks against a synthetic dataset.
+
+    python -m benchmarks.run [--articles 5000] [--requests 20]
+    python -m benchmarks.run --save-baseline      # record benchmarks/baseline.json
+
+Each route is requested through the Flask test client against a fresh
+SQLite database filled by ``benchmarks.datagen``. For every route the run
+reports p50/p99 latency, SQL statements per request and the peak Python
+memory allocated while serving one request. With a baseline file present
+the results are compared against it and the exit status is 1 when a route
+got slower (p50, beyond ``--tolerance``), issues more queries or needs
+more memory. Timings depend on the machine, so record the baseline on the
+hardware you compare on.
+"""
+from news_app import create_app
+from news_app.Backend.models.article import Article
+from news_app.Backend.models.db import db
+from news_app.Backend.services import related_service
+from news_app.Backend.services.category_service import get_category_directory
+from sqlalchemy import event
+from .datagen import generate_dataset
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+DEFAULT_TOLERANCE = 0.25
+
+
+def _drain_background_work():
+    related_service._executor.submit(lambda: None).result()
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def build_routes(app):
+    """``(name, method, path)`` callables; paths are resolved per request"""
+    with app.app_context():
+        directory = get_category_directory()
+        # The largest category, as a slug link from the categories page would use
+        busiest = max(directory.entries, key=lambda entry: entry.article_count)
+        total = Article.query.count()
+    middle = max(1, total // 2)
+    return [
+        ('home', 'GET', lambda: '/'),
+        ('articles_page', 'GET', lambda: '/articles'),
+        ('articles_page_category', 'GET', lambda: f'/articles?category={busiest.slug}&page=3'),
+        ('api_articles', 'GET', lambda: '/api/articles'),
+        ('bookmarks', 'GET', lambda: '/bookmarks'),
+        ('manage', 'GET', lambda: '/manage'),
+        # Deleting from the middle renumbers every later id, the expensive case
+        ('delete_article', 'DELETE', lambda: f'/api/articles/{middle}'),
+    ]
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _listener(self, conn, cursor, statement, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._listener)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._listener)
+
+
+def measure_route(client, engine, method, path, requests):
+    """p50/p99 latency (ms), most queries per request and peak traced memory (KB) for one route"""
+    def call():
+        response = client.open(path(), method=method)
+        response.get_data()
+        if response.status_code >= 400:
+            raise RuntimeError(f'{method} {path()} returned {response.status_code}')
+
+    call()  # warm caches and compiled statements
+    _drain_background_work()
+    samples, queries = [], []
+    for _ in range(requests):
+        with QueryCounter(engine) as counter:
+            start = time.perf_counter()
+            call()
+            samples.append((time.perf_counter() - start) * 1000)
+        queries.append(counter.count)
+        # Work a request hands to a background thread is not part of its latency,
+        # but must not overlap the next sample
+        _drain_background_work()
+
+    # Measured separately: tracing allocations slows the request down
+    tracemalloc.start()
+    try:
+        call()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    _drain_background_work()
+    return {
+        'p50_ms': round(percentile(samples, 50), 2),
+        'p99_ms': round(percentile(samples, 99), 2),
+        'queries': max(queries),
+        'peak_kb': round(peak / 1024),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Regression messages for routes that got worse than the baseline"""
+    problems = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if current['p50_ms'] > previous['p50_ms'] * (1 + tolerance):
+            problems.append(f"{name}: p50 {current['p50_ms']}ms > baseline {previous['p50_ms']}ms")
+        if current['queries'] > previous['queries']:
+            problems.append(f"{name}: {current['queries']} queries > baseline {previous['queries']}")
+        if current['peak_kb'] > previous['peak_kb'] * (1 + tolerance):
+            problems.append(f"{name}: peak {current['peak_kb']}KB > baseline {previous['peak_kb']}KB")
+    return problems
+
+
+def meta_mismatches(meta, baseline_meta):
+    """Run settings that differ from the baseline's; timings are only comparable without any"""
+    return [key for key in meta if baseline_meta.get(key) != meta[key]]
+
+
+def print_table(results, baseline):
+    print(f"{'route':<24} {'p50 ms':>9} {'p99 ms':>9} {'queries':>8} {'peak KB':>9} {'base p50':>9}")
+    for name, r in results.items():
+        base = baseline.get(name, {}).get('p50_ms', '-')
+        print(f"{name:<24} {r['p50_ms']:>9} {r['p99_ms']:>9} {r['queries']:>8} {r['peak_kb']:>9} {base:>9}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--articles', type=int, default=5000)
+    parser.add_argument('--categories', type=int, default=30)
+    parser.add_argument('--media', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--requests', type=int, default=20, help='timed requests per route')
+    parser.add_argument('--routes', help='comma-separated route names to run')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='write the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='allowed relative slowdown before a route counts as a regression')
+    parser.add_argument('--output', help='also write the results as JSON to this file')
+    args = parser.parse_args(argv)
+    # Resolve before switching to the scratch directory
+    args.baseline = os.path.abspath(args.baseline)
+    args.output = os.path.abspath(args.output) if args.output else None
+
+    with tempfile.TemporaryDirectory(prefix='news-bench-') as workdir:
+        # Keep the benchmark database away from the real one
+        os.environ['DISK_MOUNT_PATH'] = workdir
+        os.chdir(workdir)
+        app = create_app()
+        _drain_background_work()
+        with app.app_context():
+            start = time.perf_counter()
+            counts = generate_dataset(args.articles, args.categories, args.media, args.seed)
+            print(f"[INFO] Generated {counts['articles']} articles, {counts['categories']} categories, "
+                  f"{counts['media']} media in {time.perf_counter() - start:.1f}s")
+            engine = db.engine
+
+        # Admin requests skip rate limits and load shedding, which would otherwise answer most repeats
+        app.config['ADMIN_TOKEN'] = 'benchmark'
+        client = app.test_client()
+        client.environ_base['HTTP_X_ADMIN_TOKEN'] = 'benchmark'
+        selected = set(args.routes.split(',')) if args.routes else None
+        results = {}
+        for name, method, path in build_routes(app):
+            if selected and name not in selected:
+                continue
+            results[name] = measure_route(client, engine, method, path, args.requests)
+
+    meta = {'articles': args.articles, 'categories': args.categories, 'media': args.media,
+            'seed': args.seed, 'requests': args.requests}
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            stored = json.load(f)
+        mismatches = meta_mismatches(meta, stored.get('meta', {}))
+        if not mismatches:
+            baseline = stored.get('routes', {})
+        else:
+            print(f"[WARNING] Baseline was recorded with different {', '.join(mismatches)}; not comparing")
+
+    print_table(results, baseline)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'meta': meta, 'routes': results}, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({'meta': meta, 'routes': results}, f, indent=2)
+            f.write('\n')
+        print(f'[INFO] Baseline written to {args.baseline}')
+        return 0
+
+    problems = compare(results, baseline, args.tolerance)
+    for problem in problems:
+        print(f'[ERROR] Regression: {problem}')
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+"""
+Build fingerprinted, precompressed static assets (run during deployment)
+"""
+import sys
+from news_app.Backend.assets import build_assets
+
+if __name__ == '__main__':
+    try:
+        manifest = build_assets()
+        for logical_name, hashed_name in sorted(manifest.items()):
+            print(f'   {logical_name} -> {hashed_name}')
+        print(f'✅ Built {len(manifest)} fingerprinted assets')
+        sys.exit(0)
+    except Exception as e:
+        print(f'❌ Asset build failed: {str(e)}')
+        sys.exit(1)
@@ -0,0 +1,15 @@
+"""gunicorn settings, read automatically from the working directory.
+
+Command-line flags (Procfile, start.sh, render.yaml) still take precedence.
+The access log extends the combined format with the response time in
+microseconds, the worker pid, the X-Cache status and the request id (the
+``request_id`` field of the application's JSON log records), which
+``python -m benchmarks.access_log`` parses into per-route percentiles.
+"""
+import os
+
+accesslog = os.getenv('ACCESS_LOG', '-')
+access_log_format = (
+    '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s" '
+    'rt_us=%(D)s worker=%(p)s cache=%({x-cache}o)s rid=%({x-request-id}o)s'
+)
@@ -0,0 +1,192 @@
+"""Admission control for expensive endpoints: rate limits and load shedding.
+
+Views decorated with ``@admission_control('<bucket>')`` pass two checks
+before they run; requests with the admin token (see ``auth.py``) skip
+both.
+
+* Load shedding: while the worker is saturated the request is refused
+  with 503 and ``Retry-After`` before it does any work. Saturation is
+  either more than ``SHED_MAX_IN_FLIGHT`` requests in progress in this
+  process (threaded workers) or a request that waited longer than
+  ``SHED_QUEUE_MS`` in front of the worker, measured from the proxy's
+  ``X-Request-Start`` header (the listen backlog of a sync worker is not
+  visible otherwise).
+* Rate limits: every client has a token bucket per bucket name, sized and
+  refilled from ``RATE_LIMIT_<BUCKET>`` (e.g. ``30/minute``). An empty
+  bucket answers 429 with ``Retry-After``.
+
+Clients are identified by ``request.remote_addr``. Behind reverse proxies
+set ``TRUSTED_PROXY_HOPS`` to their number: ``ProxyFix`` then takes the
+client address from that many ``X-Forwarded-For`` hops, and headers a
+client sent itself are never trusted (the default of 0 ignores the
+header). Buckets live in the worker process, so with several workers a
+client gets the limit once per worker.
+"""
+from flask import current_app, g, jsonify, request
+from werkzeug.middleware.proxy_fix import ProxyFix
+from .auth import is_admin_request
+from .metrics import REGISTRY, ADMISSION_REJECTIONS
+from functools import wraps
+import math
+import os
+import threading
+import time
+
+RATE_LIMITS = {
+    # /api/live, /api/search and /api/sources: each miss costs NewsAPI quota
+    'newsapi': os.getenv('RATE_LIMIT_NEWSAPI', '30/minute'),
+    # Whole-table dumps (/api/articles, /api/export) and bulk imports
+    'bulk': os.getenv('RATE_LIMIT_BULK', '10/minute'),
+}
+SHED_MAX_IN_FLIGHT = int(os.getenv('SHED_MAX_IN_FLIGHT', '32'))
+SHED_QUEUE_MS = float(os.getenv('SHED_QUEUE_MS', '2000'))
+SHED_RETRY_AFTER = 5
+# Reverse proxies in front of the app whose X-Forwarded-* headers are trusted
+TRUSTED_PROXY_HOPS = int(os.getenv('TRUSTED_PROXY_HOPS', '0'))
+# Clients tracked per bucket before idle ones are forgotten
+MAX_CLIENTS = 10000
+_PERIODS = {'second': 1, 'minute': 60, 'hour': 3600}
+
+
+def parse_rate(text):
+    """``'30/minute'`` -> (capacity, tokens per second)"""
+    count, _, period = text.partition('/')
+    count = int(count)
+    seconds = _PERIODS.get(period.strip().lower())
+    if count <= 0 or seconds is None:
+        raise ValueError(f'Invalid rate limit {text!r}; use N/second, N/minute or N/hour')
+    return count, count / seconds
+
+
+class TokenBuckets:
+    """Per-client token buckets with one capacity and refill rate"""
+
+    def __init__(self, capacity, refill_rate):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.lock = threading.Lock()
+        self.buckets = {}
+
+    def take(self, client, now=None):
+        """0 if a token was taken, else the seconds until one is available"""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            tokens, updated = self.buckets.get(client, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated) * self.refill_rate)
+            if tokens >= 1:
+                if client not in self.buckets and len(self.buckets) >= MAX_CLIENTS:
+                    self._forget_full(now)
+                self.buckets[client] = (tokens - 1, now)
+                return 0.0
+            self.buckets[client] = (tokens, now)
+            return (1 - tokens) / self.refill_rate
+
+    def _forget_full(self, now):
+        # A bucket that has refilled completely holds nothing worth keeping
+        refill_time = self.capacity / self.refill_rate
+        self.buckets = {client: state for client, state in self.buckets.items()
+                        if now - state[1] < refill_time}
+        if len(self.buckets) >= MAX_CLIENTS:
+            self.buckets.clear()
+
+
+def queue_wait_ms(header, now=None):
+    """Milliseconds since the proxy's ``X-Request-Start`` (``t=<us>``, or s/ms/us since the epoch)"""
+    value = header.strip()
+    if value.startswith('t='):
+        value = value[2:]
+    try:
+        start = float(value)
+    except ValueError:
+        return None
+    # Tell the unit apart by magnitude: seconds ~1e9, ms ~1e12, us ~1e15
+    if start > 1e14:
+        start /= 1e6
+    elif start > 1e11:
+        start /= 1e3
+    return ((time.time() if now is None else now) - start) * 1000
+
+
+def client_address():
+    # Already resolved from trusted X-Forwarded-For hops by ProxyFix
+    return request.remote_addr or ''
+
+
+def _too_busy(status, message, retry_after):
+    response = jsonify({'status': 'error', 'message': message})
+    response.status_code = status
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+class AdmissionController:
+    """Rate-limit buckets and in-flight request count of one app"""
+
+    def __init__(self, app):
+        self.app = app
+        self.limits = {name: TokenBuckets(*parse_rate(rate)) for name, rate in RATE_LIMITS.items()}
+        self.max_in_flight = SHED_MAX_IN_FLIGHT
+        self.shed_queue_ms = SHED_QUEUE_MS
+        self.in_flight = 0
+        self.lock = threading.Lock()
+
+    def should_shed(self):
+        if self.max_in_flight and self.in_flight > self.max_in_flight:
+            return True
+        header = request.headers.get('X-Request-Start')
+        if header and self.shed_queue_ms:
+            waited = queue_wait_ms(header)
+            return waited is not None and waited > self.shed_queue_ms
+        return False
+
+    def admit(self, bucket):
+        """None to let the request through, else the 429/503 response"""
+        if is_admin_request():
+            return None
+        if self.should_shed():
+            REGISTRY.inc(ADMISSION_REJECTIONS, (bucket, 'shed'))
+            return _too_busy(503, 'Server is busy, please retry shortly', SHED_RETRY_AFTER)
+        wait = self.limits[bucket].take(client_address())
+        if wait:
+            REGISTRY.inc(ADMISSION_REJECTIONS, (bucket, 'rate_limited'))
+            return _too_busy(429, 'Too many requests, please slow down', wait)
+        return None
+
+
+def get_admission(app):
+    return app.extensions['admission']
+
+
+def admission_control(bucket):
+    """Decorator: shed load and apply the ``bucket`` rate limit before the view runs"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            rejection = get_admission(current_app).admit(bucket)
+            if rejection is not None:
+                return rejection
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def init_admission(app):
+    """Create the rate-limit buckets and count the requests in progress"""
+    if TRUSTED_PROXY_HOPS:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS, x_proto=TRUSTED_PROXY_HOPS)
+    admission = AdmissionController(app)
+    app.extensions['admission'] = admission
+
+    @app.before_request
+    def count_in_flight():
+        with admission.lock:
+            admission.in_flight += 1
+        g._admission_counted = True
+
+    @app.teardown_request
+    def release_in_flight(exc):
+        if g.pop('_admission_counted', False):
+            with admission.lock:
+                admission.in_flight -= 1
+
+    return admission
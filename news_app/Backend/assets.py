@@ -0,0 +1,174 @@
+"""Fingerprinted, precompressed static assets.
+
+``build_assets()`` copies each CSS/JS file to ``static/dist/<name>.<hash>.<ext>``
+with ``.gz`` and ``.br`` siblings and writes ``static/dist/manifest.json``.
+Hashed files listed in neither the new nor the previous manifest are
+deleted, so the directory does not grow with every build while pages
+rendered before a deploy can still load their assets. When the manifest
+exists, ``url_for('static', filename='css/style.css')`` resolves to the
+hashed file, which is served precompressed with an immutable Cache-Control
+header.
+
+Run it as part of the build:  python build_assets.py
+"""
+from flask import request, send_from_directory
+from markupsafe import Markup
+from .stylesheet import build_stylesheet, CRITICAL_DIRNAME
+import brotli
+import gzip
+import hashlib
+import json
+import os
+
+DIST_DIRNAME = 'dist'
+MANIFEST_NAME = 'manifest.json'
+ASSET_EXTENSIONS = ('.css', '.js')
+# Directories under static/ that hold source assets
+ASSET_DIRS = ('css', 'js')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Content-Encoding and file suffix, in order of preference
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+DEFAULT_STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'Frontend', 'static')
+
+
+def _write(path, data):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def write_asset(static_dir, logical_name, data, manifest):
+    """Write one fingerprinted asset plus compressed siblings and record it"""
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    stem, ext = os.path.splitext(logical_name)
+    hashed_name = f'{DIST_DIRNAME}/{stem}.{digest}{ext}'
+    out_path = os.path.join(static_dir, hashed_name)
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    if not os.path.exists(out_path):
+        _write(out_path, data)
+        _write(out_path + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+        _write(out_path + '.br', brotli.compress(data, quality=11))
+    manifest[logical_name] = hashed_name
+    return hashed_name
+
+
+def build_assets(static_dir=DEFAULT_STATIC_DIR):
+    """Fingerprint every CSS/JS file, build the purged stylesheet and write the manifest.
+
+    The prebuilt stylesheet is recorded as ``css/app.css`` and the critical
+    CSS of each layout is written to ``dist/critical/<layout>.css``.
+    Returns the manifest dict.
+    """
+    manifest = {}
+    for asset_dir in ASSET_DIRS:
+        source_dir = os.path.join(static_dir, asset_dir)
+        if not os.path.isdir(source_dir):
+            continue
+        for name in sorted(os.listdir(source_dir)):
+            if not name.endswith(ASSET_EXTENSIONS):
+                continue
+            with open(os.path.join(source_dir, name), 'rb') as f:
+                write_asset(static_dir, f'{asset_dir}/{name}', f.read(), manifest)
+
+    app_css, critical = build_stylesheet(static_dir)
+    if app_css is not None:
+        write_asset(static_dir, 'css/app.css', app_css.encode('utf-8'), manifest)
+        critical_dir = os.path.join(static_dir, DIST_DIRNAME, CRITICAL_DIRNAME)
+        os.makedirs(critical_dir, exist_ok=True)
+        for layout, css in critical.items():
+            _write(os.path.join(critical_dir, layout.rsplit('.', 1)[0] + '.css'), css.encode('utf-8'))
+
+    previous = load_manifest(static_dir)
+    manifest_path = os.path.join(static_dir, DIST_DIRNAME, MANIFEST_NAME)
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    _write(manifest_path, json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    prune_assets(static_dir, set(manifest.values()) | set(previous.values()))
+    return manifest
+
+
+def prune_assets(static_dir, keep):
+    """Delete hashed files (and their .gz/.br siblings) whose names are not in ``keep``"""
+    removed = []
+    for asset_dir in ASSET_DIRS:
+        dist_dir = os.path.join(static_dir, DIST_DIRNAME, asset_dir)
+        if not os.path.isdir(dist_dir):
+            continue
+        for name in os.listdir(dist_dir):
+            hashed_name = f'{DIST_DIRNAME}/{asset_dir}/{name}'
+            for _, suffix in PRECOMPRESSED:
+                if hashed_name.endswith(suffix):
+                    hashed_name = hashed_name[:-len(suffix)]
+            if hashed_name not in keep:
+                os.remove(os.path.join(dist_dir, name))
+                removed.append(name)
+    return removed
+
+
+def load_manifest(static_dir):
+    try:
+        with open(os.path.join(static_dir, DIST_DIRNAME, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def load_critical_css(static_dir):
+    critical = {}
+    critical_dir = os.path.join(static_dir, DIST_DIRNAME, CRITICAL_DIRNAME)
+    if os.path.isdir(critical_dir):
+        for name in os.listdir(critical_dir):
+            if name.endswith('.css'):
+                with open(os.path.join(critical_dir, name), encoding='utf-8') as f:
+                    critical[name[:-len('.css')] + '.html'] = f.read()
+    return critical
+
+
+def init_assets(app):
+    """Resolve static URLs through the manifest and serve hashed files precompressed"""
+    manifest = load_manifest(app.static_folder)
+    critical = load_critical_css(app.static_folder)
+    app.extensions['asset_manifest'] = manifest
+
+    @app.template_global()
+    def has_asset(logical_name):
+        return logical_name in manifest
+
+    @app.template_global()
+    def critical_css(layout):
+        return Markup(critical.get(layout, ''))
+
+    if not manifest:
+        return
+
+    @app.url_defaults
+    def fingerprint_static_urls(endpoint, values):
+        if endpoint == 'static' and values.get('filename') in manifest:
+            values['filename'] = manifest[values['filename']]
+
+    default_static_view = app.view_functions['static']
+
+    def static(filename):
+        if not filename.startswith(DIST_DIRNAME + '/'):
+            return default_static_view(filename=filename)
+        for encoding, suffix in PRECOMPRESSED:
+            if request.accept_encodings[encoding] and os.path.exists(os.path.join(app.static_folder, filename + suffix)):
+                response = send_from_directory(app.static_folder, filename + suffix, mimetype=_mimetype(filename))
+                response.headers['Content-Encoding'] = encoding
+                break
+        else:
+            response = send_from_directory(app.static_folder, filename)
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        response.vary.add('Accept-Encoding')
+        return response
+
+    app.view_functions['static'] = static
+
+
+def _mimetype(filename):
+    if filename.endswith('.css'):
+        return 'text/css'
+    if filename.endswith('.js'):
+        return 'text/javascript'
+    return None
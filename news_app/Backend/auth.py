@@ -0,0 +1,31 @@
+"""Admin token check for operational endpoints.
+
+Set ``ADMIN_TOKEN`` and send it as ``Authorization: Bearer <token>`` or
+``X-Admin-Token: <token>``. Without a configured token the protected
+endpoints are disabled.
+"""
+from flask import current_app, jsonify, request
+from functools import wraps
+import hmac
+
+
+def is_admin_request():
+    """Whether the current request carries the configured admin token"""
+    expected = current_app.config.get('ADMIN_TOKEN')
+    if not expected:
+        return False
+    supplied = request.headers.get('X-Admin-Token', '')
+    auth = request.headers.get('Authorization', '')
+    if not supplied and auth.lower().startswith('bearer '):
+        supplied = auth[len('bearer '):].strip()
+    return bool(supplied) and hmac.compare_digest(supplied.encode(), expected.encode())
+
+
+def admin_required(view):
+    """Reject requests without the admin token (403)"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not is_admin_request():
+            return jsonify({'status': 'error', 'message': 'Admin token required'}), 403
+        return view(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,91 @@
+"""Circuit breaker for calls to an upstream service.
+
+After ``failure_threshold`` consecutive failures the circuit opens and
+calls are rejected immediately (``CircuitOpenError``) instead of each
+waiting for a timeout. Once ``reset_timeout`` seconds have passed the
+circuit is half-open: the next call goes through as a probe while the
+others keep failing fast. A successful probe closes the circuit, a failed
+one opens it for another ``reset_timeout``.
+
+The state of every breaker is exported as the ``circuit_breaker_state``
+gauge (1 for the current state), so ``/metrics`` shows how many workers
+have given up on an upstream.
+"""
+from .metrics import REGISTRY, CIRCUIT_STATE, CIRCUIT_REJECTIONS
+import logging
+import threading
+import time
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+STATES = (CLOSED, OPEN, HALF_OPEN)
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of calling an upstream whose circuit is open"""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f'{name} is unavailable, retrying in {retry_after:.0f}s')
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Close the circuit and forget past failures"""
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+            self._set_state(CLOSED)
+
+    def _set_state(self, state):
+        self.state = state
+        for name in STATES:
+            REGISTRY.set(CIRCUIT_STATE, (self.name, name), 1 if name == state else 0)
+
+    def retry_after(self):
+        """Seconds until the next probe is allowed (0 unless open)"""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def before_call(self):
+        """Raise ``CircuitOpenError`` unless a call may go through now"""
+        with self.lock:
+            if self.state == CLOSED:
+                return
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self._set_state(HALF_OPEN)
+            if self.state == HALF_OPEN and not self.probing:
+                self.probing = True
+                return
+            retry_after = self.retry_after() if self.state == OPEN else self.reset_timeout
+        REGISTRY.inc(CIRCUIT_REJECTIONS, (self.name,))
+        raise CircuitOpenError(self.name, retry_after)
+
+    def record_success(self):
+        with self.lock:
+            if self.state != CLOSED:
+                logger.info('Circuit %s closed', self.name)
+            self.failures = 0
+            self.probing = False
+            self._set_state(CLOSED)
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.probing = False
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self.opened_at = time.monotonic()
+                self._set_state(OPEN)
+                logger.warning('Circuit %s opened after %s consecutive failures', self.name, self.failures)
@@ -0,0 +1,167 @@
+"""Flask CLI commands (run with ``flask --app app <command>``)"""
+import gzip
+import sys
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from .assets import build_assets
+from .query_plans import QUERY_PLAN_LOG, format_entry, read_plan_log
+from .tracing import TRACE_FILE, format_trace, read_traces, span_duration_ms
+from .services.article_service import bulk_create_articles, iter_article_payload
+from .services.export_service import iter_export, EXPORT_RESOURCES, EXPORT_FORMATS
+from .services.image_service import build_derivatives, get_derivatives
+from .services.media_reference_service import rebuild_media_references
+from .services.related_service import rebuild_related_articles
+from .services.media_gc_service import collect_garbage, GC_BATCH_SIZE, GC_MIN_AGE
+from .services.media_service import list_media, get_upload_folder
+import os
+
+
+@click.command('import-articles')
+@click.argument('source', type=click.File('r', encoding='utf-8'), default='-')
+@click.option('--chunk-size', default=500, show_default=True, help='Rows per executemany batch')
+@click.option('--show-errors/--no-show-errors', default=True, help='Print each rejected row')
+@with_appcontext
+def import_articles_command(source, chunk_size, show_errors):
+    """Bulk import articles from an NDJSON file or JSON array (``-`` for stdin)"""
+    report = bulk_create_articles(iter_article_payload(source), chunk_size=chunk_size)
+    if show_errors:
+        for result in report['results']:
+            if result['status'] == 'error':
+                click.echo(f"[ERROR] Row {result['row']}: {result['error']}", err=True)
+    click.echo(f"[SUCCESS] Imported {report['created']} articles, {report['failed']} rejected")
+    if report['failed'] and not report['created']:
+        sys.exit(1)
+
+
+@click.command('export-data')
+@click.argument('resource', type=click.Choice(list(EXPORT_RESOURCES)))
+@click.option('--format', 'fmt', type=click.Choice(EXPORT_FORMATS), default='ndjson', show_default=True)
+@click.option('--output', '-o', default='-', help='Output file; a .gz suffix enables gzip (default stdout)')
+@click.option('--after-id', default=0, show_default=True, help='Resume after this id')
+@with_appcontext
+def export_data_command(resource, fmt, output, after_id):
+    """Stream a table to NDJSON or CSV in constant memory"""
+    if output == '-':
+        out = sys.stdout
+    elif output.endswith('.gz'):
+        out = gzip.open(output, 'at' if after_id else 'wt', encoding='utf-8')
+    else:
+        out = open(output, 'a' if after_id else 'w', encoding='utf-8')
+    try:
+        for chunk in iter_export(resource, fmt, after_id=after_id):
+            out.write(chunk)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+@click.command('build-image-derivatives')
+@click.option('--force', is_flag=True, help='Rebuild variants that already exist')
+@with_appcontext
+def build_image_derivatives_command(force):
+    """Generate resized variants for existing uploads"""
+    built = 0
+    for media in list_media():
+        if not force and get_derivatives(media.filename):
+            continue
+        try:
+            if build_derivatives(os.path.join(get_upload_folder(), media.filename)):
+                built += 1
+        except Exception as e:
+            click.echo(f'[ERROR] {media.filename}: {e}', err=True)
+    click.echo(f'[SUCCESS] Built derivatives for {built} images')
+
+
+@click.command('gc-media')
+@click.option('--dry-run', is_flag=True, help='Report what would be removed without touching anything')
+@click.option('--quarantine', is_flag=True, help='Move orphan uploads to uploads/.quarantine instead of deleting')
+@click.option('--prune-rows', is_flag=True, help='Delete media rows whose file is missing')
+@click.option('--min-age', default=GC_MIN_AGE, show_default=True, help='Seconds before an unreferenced file counts as orphaned')
+@click.option('--batch-size', default=GC_BATCH_SIZE, show_default=True, help='Names or rows checked per query')
+@with_appcontext
+def gc_media_command(dry_run, quarantine, prune_rows, min_age, batch_size):
+    """Reconcile the uploads folder with the media table"""
+    report = collect_garbage(quarantine=quarantine, prune_rows=prune_rows, dry_run=dry_run,
+                             min_age_seconds=min_age, batch_size=batch_size)
+    for media_id in report['missing_media_ids']:
+        click.echo(f'[WARNING] Media {media_id} has no file' + (' (row deleted)' if report['rows_pruned'] else ''), err=True)
+    prefix = '[DRY RUN] ' if dry_run else '[SUCCESS] '
+    click.echo(f"{prefix}{report['orphan_files']} orphan files, {report['reclaimed_bytes']} bytes reclaimed, "
+               f"{report['quarantined_bytes']} bytes quarantined, {report['missing_files']} rows without a file")
+
+
+@click.command('reindex-media')
+@with_appcontext
+def reindex_media_command():
+    """Rebuild the media -> article reference index from article text"""
+    click.echo(f'[SUCCESS] Indexed {rebuild_media_references()} media references')
+
+
+@click.command('rebuild-related')
+@with_appcontext
+def rebuild_related_command():
+    """Recompute the related-articles table from scratch"""
+    click.echo(f'[SUCCESS] Stored {rebuild_related_articles()} related-article pairs')
+
+
+@click.command('build-assets')
+@with_appcontext
+def build_assets_command():
+    """Write content-hashed, precompressed CSS/JS and the asset manifest"""
+    manifest = build_assets(current_app.static_folder)
+    for logical_name, hashed_name in sorted(manifest.items()):
+        click.echo(f'{logical_name} -> {hashed_name}')
+    click.echo('[SUCCESS] Restart the app to serve the new manifest')
+
+
+@click.command('query-plans')
+@click.option('--log', 'log_path', default=lambda: QUERY_PLAN_LOG or 'query_plans.jsonl', show_default='QUERY_PLAN_LOG',
+              help='Plan log written while QUERY_PLAN_LOG was set')
+@click.option('--all', 'show_all', is_flag=True, help='List every recorded statement, not only the problem ones')
+def query_plans_command(log_path, show_all):
+    """List recorded statements that scan a whole table or use a temp B-tree"""
+    if not os.path.exists(log_path):
+        raise click.ClickException(f'No plan log at {log_path}; run the app with QUERY_PLAN_LOG={log_path} first')
+    entries = read_plan_log(log_path)
+    flagged = [entry for entry in entries if entry['problems']]
+    for entry in sorted(entries if show_all else flagged, key=lambda e: e['caller']):
+        click.echo(format_entry(entry))
+    click.echo(f'[INFO] {len(flagged)} of {len(entries)} statements scan a table or use a temp B-tree')
+
+
+@click.command('traces')
+@click.argument('trace_id', required=False)
+@click.option('--file', 'trace_path', default=lambda: TRACE_FILE or 'traces.jsonl', show_default='TRACE_FILE',
+              help='Trace file written while TRACE_FILE was set')
+@click.option('--slowest', default=1, show_default=True, help='Without TRACE_ID, show the N slowest traces')
+def traces_command(trace_id, trace_path, slowest):
+    """Print recorded traces as span trees with durations"""
+    if not os.path.exists(trace_path):
+        raise click.ClickException(f'No trace file at {trace_path}; run the app with TRACE_FILE={trace_path} first')
+    traces = read_traces(trace_path)
+    if trace_id:
+        if trace_id not in traces:
+            raise click.ClickException(f'Trace {trace_id} not found in {trace_path}')
+        selected = [trace_id]
+    else:
+        def trace_duration(tid):
+            return max(span_duration_ms(data) for data in traces[tid])
+        selected = sorted(traces, key=trace_duration, reverse=True)[:slowest]
+    for tid in selected:
+        click.echo(f'[INFO] Trace {tid}')
+        click.echo(format_trace(traces[tid]))
+    click.echo(f'[INFO] {len(traces)} traces in {trace_path}')
+
+
+def register_commands(app):
+    """Attach the CLI commands to the application"""
+    app.cli.add_command(import_articles_command)
+    app.cli.add_command(export_data_command)
+    app.cli.add_command(build_image_derivatives_command)
+    app.cli.add_command(gc_media_command)
+    app.cli.add_command(reindex_media_command)
+    app.cli.add_command(rebuild_related_command)
+    app.cli.add_command(build_assets_command)
+    app.cli.add_command(query_plans_command)
+    app.cli.add_command(traces_command)
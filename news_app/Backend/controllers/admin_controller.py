@@ -1,6 +1,6 @@
 from flask import Blueprint, render_template
 from ..services.article_service import list_articles
-from ..services.category_service import list_categories
+from ..services.category_service import get_category_directory
 
 admin_bp = Blueprint('admin', __name__, template_folder='templates')
 
@@ -8,6 +8,6 @@ admin_bp = Blueprint('admin', __name__, template_folder='templates')
 @admin_bp.route('/admin')
 def dashboard():
     articles = list_articles(page=None, per_page=None)
-    categories = list_categories()
+    categories = get_category_directory().entries
     return render_template('admin_dashboard.html', articles=articles, categories=categories)
 
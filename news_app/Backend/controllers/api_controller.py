@@ -1,22 +1,59 @@
-from flask import Blueprint, jsonify, request, current_app
-from ..services.news_service import top_headlines, search_news, get_sources
+from flask import Blueprint, jsonify, request, current_app, Response, stream_with_context
+from ..services.news_service import top_headlines, search_news, get_sources, newsapi_breaker
+from ..circuit_breaker import CLOSED
 from ..models.db import db
 from ..services.article_service import list_articles
-from ..services.category_service import list_categories
+from ..services.category_service import get_category_directory
+from ..services.export_service import iter_export, EXPORT_RESOURCES, EXPORT_FORMATS
+from ..admission import TokenBuckets, admission_control
+from ..auth import admin_required, is_admin_request
+from ..metrics import REGISTRY, NEWSAPI_PREFETCHES, record_cache
+from ..tracing import current_span
+from concurrent.futures import ThreadPoolExecutor
+import logging
 import os
 import hashlib
+import threading
 import time
 
+logger = logging.getLogger(__name__)
+
 api_bp = Blueprint('api', __name__)
 
 # Cache configuration for API endpoints
 CACHE_TIMEOUT_LIVE = 300  # 5 minutes for live news
 CACHE_TIMEOUT_SEARCH = 600  # 10 minutes for search results
 CACHE_TIMEOUT_SOURCES = 3600  # 1 hour for sources (rarely change)
+CACHE_MAX_STALE = 24 * 3600  # oldest payload served (marked stale) while NewsAPI is failing
 
 # In-memory cache storage
 _api_cache = {}
 
+# Next-page prefetch: serving page N of /api/live or /api/search fetches page
+# N+1 in the background, so "Load more" is a cache hit. Only queries (their
+# parameters without the page) whose page 2 or later was requested within the
+# cache window are prefetched, since most readers never page. Each query gets
+# at most PREFETCH_PAGES_PER_KEY prefetches per cache window, and all queries
+# together PREFETCH_PER_MINUTE and PREFETCH_PER_DAY (per UTC day, as NewsAPI
+# counts its quota).
+PREFETCH_ENABLED = os.getenv('NEWSAPI_PREFETCH', '1') != '0'
+PREFETCH_PAGES_PER_KEY = 5
+PREFETCH_PER_MINUTE = int(os.getenv('NEWSAPI_PREFETCH_PER_MINUTE', '20'))
+PREFETCH_PER_DAY = int(os.getenv('NEWSAPI_PREFETCH_PER_DAY', '50'))
+# Longest a request waits for a running prefetch of the page it wants
+PREFETCH_WAIT = 10
+# NewsAPI refuses pages past the first 100 results on the developer plan
+NEWSAPI_MAX_RESULTS = 100
+
+_prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='newsapi-prefetch')
+_prefetch_lock = threading.Lock()
+_prefetch_pending = {}  # cache key -> future of the running prefetch
+_prefetched = set()  # cache keys filled by a prefetch and not served yet
+_prefetch_budget = {}  # query key -> (window start, prefetches in the window)
+_paginated = {}  # query key -> when a page after the first was last requested
+_prefetch_rate = TokenBuckets(PREFETCH_PER_MINUTE, PREFETCH_PER_MINUTE / 60)
+_prefetch_day = [0, 0]  # UTC day number, prefetches on that day
+
 
 def _get_cache_key(prefix, **kwargs):
     """Generate a cache key from request parameters"""
@@ -28,10 +65,18 @@ def _get_cache_key(prefix, **kwargs):
 
 def _get_cached_response(cache_key, timeout):
     """Get cached response if still valid"""
+    span = current_span()
     if cache_key in _api_cache:
         cached_time, response_data = _api_cache[cache_key]
         if time.time() - cached_time < timeout:
+            record_cache('newsapi_response', True)
+            _mark_prefetch_used(cache_key)
+            if span is not None:
+                span.set_attribute('cache.hit', True)
             return response_data
+    record_cache('newsapi_response', False)
+    if span is not None:
+        span.set_attribute('cache.hit', False)
     return None
 
 
@@ -40,13 +85,139 @@ def _set_cached_response(cache_key, response_data, timeout):
     _api_cache[cache_key] = (time.time(), response_data)
 
 
+def _mark_prefetch_used(cache_key):
+    with _prefetch_lock:
+        if cache_key not in _prefetched:
+            return
+        _prefetched.discard(cache_key)
+    REGISTRY.inc(NEWSAPI_PREFETCHES, ('used',))
+
+
+def _take_daily_prefetch(now):
+    """Count a prefetch against today's budget; False once it is spent (call under _prefetch_lock)"""
+    day = int(now // 86400)
+    if _prefetch_day[0] != day:
+        _prefetch_day[:] = [day, 0]
+    if _prefetch_day[1] >= PREFETCH_PER_DAY:
+        return False
+    _prefetch_day[1] += 1
+    return True
+
+
+def _prefetch(cache_key, fetch, params, timeout):
+    try:
+        data = fetch(**params)
+        if data.get('status') == 'ok':
+            _set_cached_response(cache_key, data, timeout)
+            with _prefetch_lock:
+                _prefetched.add(cache_key)
+            REGISTRY.inc(NEWSAPI_PREFETCHES, ('fetched',))
+        else:
+            REGISTRY.inc(NEWSAPI_PREFETCHES, ('failed',))
+    except Exception as e:
+        logger.error('Prefetch of %s page %s failed: %s', fetch.__name__, params.get('page'), e)
+        REGISTRY.inc(NEWSAPI_PREFETCHES, ('failed',))
+    finally:
+        with _prefetch_lock:
+            _prefetch_pending.pop(cache_key, None)
+
+
+def _schedule_prefetch(prefix, fetch, params, data, timeout):
+    """Warm the cache with the page after ``params['page']``; returns whether a fetch was queued"""
+    page, page_size = params['page'], params['page_size']
+    if not PREFETCH_ENABLED or page < 1 or page * page_size >= min(data.get('totalResults', 0), NEWSAPI_MAX_RESULTS):
+        return False
+    next_params = dict(params, page=page + 1)
+    cache_key = _get_cache_key(prefix, **next_params)
+    query_key = _get_cache_key(prefix, **dict(params, page=None))
+    now = time.time()
+    with _prefetch_lock:
+        if page >= 2:
+            if len(_paginated) >= 10000:
+                _paginated.clear()
+            _paginated[query_key] = now
+        elif now - _paginated.get(query_key, 0) >= timeout:
+            # Nobody has paged through this query lately
+            return False
+        entry = _api_cache.get(cache_key)
+        if cache_key in _prefetch_pending or (entry is not None and now - entry[0] < timeout):
+            return False
+        # Upstream trouble: the probe belongs to a real request
+        if newsapi_breaker.state != CLOSED:
+            return False
+        window_start, used = _prefetch_budget.get(query_key, (now, 0))
+        if now - window_start >= timeout:
+            window_start, used = now, 0
+        if used >= PREFETCH_PAGES_PER_KEY or _prefetch_rate.take('all') or not _take_daily_prefetch(now):
+            REGISTRY.inc(NEWSAPI_PREFETCHES, ('over_budget',))
+            return False
+        if len(_prefetch_budget) >= 10000:
+            _prefetch_budget.clear()
+        _prefetch_budget[query_key] = (window_start, used + 1)
+        _prefetch_pending[cache_key] = _prefetch_executor.submit(_prefetch, cache_key, fetch, next_params, timeout)
+    return True
+
+
+def _wait_for_prefetch(cache_key, timeout):
+    """Payload of a prefetch of this page that is still running, rather than fetching it twice"""
+    future = _prefetch_pending.get(cache_key)
+    if future is None:
+        return None
+    try:
+        future.result(timeout=PREFETCH_WAIT)
+    except Exception:
+        return None
+    entry = _api_cache.get(cache_key)
+    if entry is None or time.time() - entry[0] >= timeout:
+        return None
+    _mark_prefetch_used(cache_key)
+    return entry[1]
+
+
+def _get_stale_response(cache_key):
+    """Last good payload for the key, however old (up to CACHE_MAX_STALE)"""
+    entry = _api_cache.get(cache_key)
+    if entry is not None and time.time() - entry[0] < CACHE_MAX_STALE:
+        return entry[1]
+    return None
+
+
+def _json_with_cache_status(data, status):
+    """JSON response tagged with X-Cache (HIT, MISS, STALE or BYPASS) for the access log"""
+    response = jsonify(data)
+    response.headers['X-Cache'] = status
+    return response
+
+
+def _upstream_response(cache_key, data, timeout, no_cache):
+    """Cache a good NewsAPI payload; when the call failed, serve the last good one marked stale"""
+    if data.get('status') == 'ok':
+        if not no_cache:
+            _set_cached_response(cache_key, data, timeout)
+        return _json_with_cache_status(data, 'BYPASS' if no_cache else 'MISS')
+    stale = None if no_cache else _get_stale_response(cache_key)
+    if stale is not None:
+        return _json_with_cache_status(dict(stale, stale=True), 'STALE')
+    response = _json_with_cache_status(data, 'BYPASS' if no_cache else 'MISS')
+    if 'retry_after' in data:
+        # Circuit open and nothing cached: fail fast
+        response.status_code = 503
+        response.headers['Retry-After'] = str(data['retry_after'])
+    return response
+
+
 def clear_api_cache():
     """Clear all API cache"""
     global _api_cache
     _api_cache = {}
+    with _prefetch_lock:
+        _prefetched.clear()
+        _prefetch_budget.clear()
+        _paginated.clear()
 
 
 @api_bp.route('/live')
+@admission_control('newsapi')
 def live_news():
     """Get top headlines with optional country and category filters"""
     country = request.args.get('country', 'us')
@@ -54,27 +225,28 @@ def live_news():
     page = request.args.get('page', 1, type=int)
     page_size = request.args.get('pageSize', 10, type=int)
     
-    # Check for no-cache parameter
-    no_cache = request.args.get('no_cache') == '1'
+    # Cache bypass is reserved for admins; anyone else gets the cached copy
+    no_cache = request.args.get('no_cache') == '1' and is_admin_request()
+    params = dict(country=country, category=category, page=page, page_size=page_size)
+    cache_key = _get_cache_key('live', **params)
     
     if not no_cache:
         # Try to get from cache
-        cache_key = _get_cache_key('live', country=country, category=category, page=page, page_size=page_size)
-        cached = _get_cached_response(cache_key, CACHE_TIMEOUT_LIVE)
+        cached = _get_cached_response(cache_key, CACHE_TIMEOUT_LIVE) or _wait_for_prefetch(cache_key, CACHE_TIMEOUT_LIVE)
         if cached:
-            return jsonify(cached)
+            _schedule_prefetch('live', top_headlines, params, cached, CACHE_TIMEOUT_LIVE)
+            return _json_with_cache_status(cached, 'HIT')
     
     # Fetch from external API
-    data = top_headlines(country=country, category=category, page=page, page_size=page_size)
-    
-    # Cache the response
-    if not no_cache:
-        _set_cached_response(cache_key, data, CACHE_TIMEOUT_LIVE)
+    data = top_headlines(**params)
     
-    return jsonify(data)
+    if not no_cache and data.get('status') == 'ok':
+        _schedule_prefetch('live', top_headlines, params, data, CACHE_TIMEOUT_LIVE)
+    return _upstream_response(cache_key, data, CACHE_TIMEOUT_LIVE, no_cache)
 
 
 @api_bp.route('/search')
+@admission_control('newsapi')
 def search():
     """Search for news articles by keyword"""
     query = request.args.get('q', '')
@@ -87,57 +259,48 @@ def search():
     if not query:
         return jsonify({'status': 'error', 'message': 'Query parameter is required', 'articles': []}), 400
     
-    # Check for no-cache parameter
-    no_cache = request.args.get('no_cache') == '1'
+    # Cache bypass is reserved for admins; anyone else gets the cached copy
+    no_cache = request.args.get('no_cache') == '1' and is_admin_request()
+    params = dict(query=query, from_date=from_date, to_date=to_date, sort_by=sort_by, page=page, page_size=page_size)
+    cache_key = _get_cache_key('search', **params)
     
     if not no_cache:
         # Try to get from cache
-        cache_key = _get_cache_key('search', q=query, from_date=from_date, to_date=to_date, sort_by=sort_by, page=page, page_size=page_size)
-        cached = _get_cached_response(cache_key, CACHE_TIMEOUT_SEARCH)
+        cached = _get_cached_response(cache_key, CACHE_TIMEOUT_SEARCH) or _wait_for_prefetch(cache_key, CACHE_TIMEOUT_SEARCH)
         if cached:
-            return jsonify(cached)
+            _schedule_prefetch('search', search_news, params, cached, CACHE_TIMEOUT_SEARCH)
+            return _json_with_cache_status(cached, 'HIT')
     
     # Fetch from external API
-    data = search_news(
-        query=query,
-        from_date=from_date,
-        to_date=to_date,
-        sort_by=sort_by,
-        page=page,
-        page_size=page_size
-    )
+    data = search_news(**params)
     
-    # Cache the response
-    if not no_cache:
-        _set_cached_response(cache_key, data, CACHE_TIMEOUT_SEARCH)
-    
-    return jsonify(data)
+    if not no_cache and data.get('status') == 'ok':
+        _schedule_prefetch('search', search_news, params, data, CACHE_TIMEOUT_SEARCH)
+    return _upstream_response(cache_key, data, CACHE_TIMEOUT_SEARCH, no_cache)
 
 
 @api_bp.route('/sources')
+@admission_control('newsapi')
 def sources():
     """Get available news sources"""
-    # Check for no-cache parameter
-    no_cache = request.args.get('no_cache') == '1'
+    # Cache bypass is reserved for admins; anyone else gets the cached copy
+    no_cache = request.args.get('no_cache') == '1' and is_admin_request()
+    cache_key = _get_cache_key('sources')
     
     if not no_cache:
         # Try to get from cache
-        cache_key = _get_cache_key('sources')
         cached = _get_cached_response(cache_key, CACHE_TIMEOUT_SOURCES)
         if cached:
-            return jsonify(cached)
+            return _json_with_cache_status(cached, 'HIT')
     
     # Fetch from external API
     data = get_sources()
     
-    # Cache the response
-    if not no_cache:
-        _set_cached_response(cache_key, data, CACHE_TIMEOUT_SOURCES)
-    
-    return jsonify(data)
+    return _upstream_response(cache_key, data, CACHE_TIMEOUT_SOURCES, no_cache)
 
 
 @api_bp.route('/clear-cache', methods=['POST'])
+@admin_required
 def clear_cache_endpoint():
     """Clear API cache (admin endpoint)"""
     try:
@@ -169,7 +332,7 @@ def health():
         
         # Test database connection and get counts
         articles = list_articles()
-        categories = list_categories()
+        categories = get_category_directory().entries
         article_count = len(articles)
         category_count = len(categories)
         db_status = 'connected'
@@ -186,11 +349,16 @@ def health():
             'url_set': bool(db_url),
             'article_count': article_count,
             'category_count': category_count
+        },
+        'newsapi': {
+            'circuit': newsapi_breaker.state,
+            'retry_after': round(newsapi_breaker.retry_after())
         }
     })
 
 
 @api_bp.route('/articles')
+@admission_control('bulk')
 def get_articles():
     """Get all articles from database"""
     try:
@@ -217,7 +385,7 @@ def get_articles():
 def get_categories():
     """Get all categories from database"""
     try:
-        categories = list_categories()
+        categories = get_category_directory().entries
         return jsonify({
             'status': 'success',
             'categories': [{
@@ -230,6 +398,34 @@ def get_categories():
         return jsonify({'status': 'error', 'message': str(e), 'categories': []}), 500
 
 
+@api_bp.route('/export')
+@admission_control('bulk')
+def export_data():
+    """Stream articles, categories or media as NDJSON/CSV, resumable with after_id"""
+    resource = request.args.get('resource', 'articles')
+    fmt = request.args.get('format', 'ndjson')
+    after_id = request.args.get('after_id', 0, type=int)
+    compress = request.args.get('compress') == 'gzip'
+
+    if resource not in EXPORT_RESOURCES:
+        return jsonify({'status': 'error', 'message': f'resource must be one of: {", ".join(EXPORT_RESOURCES)}'}), 400
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'status': 'error', 'message': f'format must be one of: {", ".join(EXPORT_FORMATS)}'}), 400
+
+    # A compressed export is a .gz file, not a gzip-encoded NDJSON/CSV body that
+    # clients would transparently decode before saving
+    if compress:
+        mimetype, filename = 'application/gzip', f'{resource}.{fmt}.gz'
+    else:
+        mimetype, filename = ('text/csv' if fmt == 'csv' else 'application/x-ndjson'), f'{resource}.{fmt}'
+    response = Response(
+        stream_with_context(iter_export(resource, fmt, after_id=after_id, compress=compress)),
+        mimetype=mimetype
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
+
+
 @api_bp.route('/redirect')
 def redirect_external():
     """Redirect to external URL - ensures links open properly"""
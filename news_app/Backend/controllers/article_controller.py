@@ -1,6 +1,10 @@
 from flask import Blueprint, render_template, request, redirect, url_for, jsonify
-from ..services.article_service import list_articles, list_articles_by_category, get_article, create_article, update_article, delete_article, get_articles_by_ids, count_articles, count_articles_today, count_articles_this_week
-from ..services.category_service import list_categories, get_category
+from werkzeug.exceptions import HTTPException
+from ..services.article_service import list_articles, list_articles_by_category, get_article, create_article, update_article, delete_article, get_articles_by_ids, count_articles, count_articles_today, count_articles_this_week, bulk_create_articles, iter_article_payload
+from ..services.category_service import get_category_directory
+from ..services.related_service import get_related_articles
+from ..services.view_service import record_view, get_trending_articles
+from ..admission import admission_control
 
 article_bp = Blueprint('articles', __name__, template_folder='templates')
 
@@ -19,7 +23,7 @@ def home():
         total_count = len(articles)
         total_pages = 1
     
-    categories = list_categories()
+    categories = get_category_directory().entries
     
     # Performance: Use efficient count functions instead of iterating
     today_count = count_articles_today()
@@ -28,6 +32,7 @@ def home():
     return render_template('index.html', 
                          articles=articles, 
                          categories=categories,
+                         trending=get_trending_articles(),
                          total_articles=total_count,
                          today_count=today_count,
                          week_count=week_count)
@@ -40,63 +45,22 @@ def articles_page():
     page = request.args.get('page', 1, type=int)
     per_page = 12
     
-    selected_category = ''
-    
-    if category_param:
-        # First try to find category by ID (if parameter is numeric)
-        if category_param.isdigit():
-            category = get_category(int(category_param))
-            if category:
-                result = list_articles_by_category(category.id, page=page, per_page=per_page)
-                if isinstance(result, dict):
-                    articles = result['items']
-                    pagination = result
-                else:
-                    articles = result
-                    pagination = None
-                selected_category = category.name
-            else:
-                result = list_articles(page=page, per_page=per_page)
-                if isinstance(result, dict):
-                    articles = result['items']
-                    pagination = result
-                else:
-                    articles = result
-                    pagination = None
-                selected_category = ''
-        else:
-            # Try to find category by name
-            categories = list_categories()
-            category = next((cat for cat in categories if cat.name == category_param), None)
-            if category:
-                result = list_articles_by_category(category.id, page=page, per_page=per_page)
-                if isinstance(result, dict):
-                    articles = result['items']
-                    pagination = result
-                else:
-                    articles = result
-                    pagination = None
-                selected_category = category.name
-            else:
-                result = list_articles(page=page, per_page=per_page)
-                if isinstance(result, dict):
-                    articles = result['items']
-                    pagination = result
-                else:
-                    articles = result
-                    pagination = None
-                selected_category = ''
+    directory = get_category_directory()
+    category = directory.resolve(category_param) if category_param else None
+    if category:
+        result = list_articles_by_category(category.id, page=page, per_page=per_page)
+        selected_category = category.name
     else:
         result = list_articles(page=page, per_page=per_page)
-        if isinstance(result, dict):
-            articles = result['items']
-            pagination = result
-        else:
-            articles = result
-            pagination = None
         selected_category = ''
+    if isinstance(result, dict):
+        articles = result['items']
+        pagination = result
+    else:
+        articles = result
+        pagination = None
     
-    categories = list_categories()
+    categories = directory.entries
     return render_template('articles.html', 
                          articles=articles, 
                          categories=categories, 
@@ -113,7 +77,7 @@ def latest_news():
         articles = result['items']
     else:
         articles = result
-    categories = list_categories()
+    categories = get_category_directory().entries
     return render_template('latest.html', articles=articles, categories=categories)
 
 
@@ -128,13 +92,13 @@ def live_feed():
 def bookmarks_page():
     """Show user's bookmarked articles"""
     articles = list_articles(page=None, per_page=None)
-    categories = list_categories()
+    categories = get_category_directory().entries
     return render_template('bookmarks.html', articles=articles, categories=categories)
 
 
 @article_bp.route('/articles/create', methods=['GET', 'POST'])
 def create_article_page():
-    categories = list_categories()
+    categories = get_category_directory().entries
     if request.method == 'POST':
         title = request.form['title']
         author = request.form.get('author') or None
@@ -151,17 +115,29 @@ def article_detail(article_id):
     a = get_article(article_id)
     if not a:
         return 'Not found', 404
-    return render_template('article_detail.html', article=a)
+    # Speculative prefetches are not reads
+    purpose = request.headers.get('Sec-Purpose') or request.headers.get('Purpose') or ''
+    if 'prefetch' not in purpose:
+        visitor = (request.access_route[0] if request.access_route else '') + '|' + request.user_agent.string
+        record_view(a.id, visitor)
+    return render_template('article_detail.html', article=a, related_articles=get_related_articles(a.id))
 
 
 @article_bp.route('/manage')
 def manage_articles():
     articles = list_articles(page=None, per_page=None)
-    categories = list_categories()
+    categories = get_category_directory().entries
     return render_template('manage_articles.html', articles=articles, categories=categories)
 
 
+@article_bp.route('/api/articles/trending')
+def api_trending_articles():
+    """Most viewed articles with time decay (precomputed, refreshed on each counter flush)"""
+    return jsonify({'articles': get_trending_articles()})
+
+
 @article_bp.route('/api/articles')
+@admission_control('bulk')
 def api_list_articles():
     articles = list_articles(page=None, per_page=None)
     return jsonify([{
@@ -184,3 +160,21 @@ def api_modify_article(aid):
     a = update_article(aid, data.get('title'), data.get('content'), data.get('category_id'), data.get('image_url'), data.get('author'))
     return jsonify(a.to_dict()) if a else ('Not found', 404)
 
+
+@article_bp.route('/api/articles/bulk', methods=['POST'])
+@admission_control('bulk')
+def api_bulk_import_articles():
+    """Import many articles from an NDJSON body or a JSON array in one transaction"""
+    try:
+        report = bulk_create_articles(iter_article_payload(request.stream))
+    except HTTPException:
+        # e.g. 413 for a body over MAX_CONTENT_LENGTH keeps its own status
+        raise
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e), 'created': 0}), 500
+    if not report['results']:
+        return jsonify({'status': 'error', 'message': 'No articles provided', 'created': 0}), 400
+    if not report['created']:
+        return jsonify({'status': 'error', **report}), 400
+    return jsonify({'status': 'success', **report}), 201
+
@@ -1,12 +1,12 @@
 from flask import Blueprint, render_template, request, redirect, url_for, jsonify
-from ..services.category_service import list_categories, create_category, update_category, delete_category, get_category
+from ..services.category_service import get_category_directory, create_category, update_category, delete_category, get_category
 
 category_bp = Blueprint('categories', __name__, template_folder='templates')
 
 
 @category_bp.route('/categories')
 def categories_page():
-    cats = list_categories()
+    cats = get_category_directory().entries
     return render_template('categories.html', categories=cats)
 
 
@@ -16,14 +16,14 @@ def manage_categories():
         name = request.form['name']
         create_category(name)
         return redirect(url_for('categories.manage_categories'))
-    cats = list_categories()
+    cats = get_category_directory().entries
     return render_template('manage_categories.html', categories=cats)
 
 
 @category_bp.route('/api/categories', methods=['GET'])
 def api_list_categories():
     """API endpoint to get all categories"""
-    cats = list_categories()
+    cats = get_category_directory().entries
     return jsonify([c.to_dict() for c in cats])
 
 
@@ -0,0 +1,113 @@
+from flask import Blueprint, jsonify, request, current_app, send_file, url_for
+from ..auth import admin_required
+from ..instrumentation import get_instrumentation, set_request_timing
+from ..profiler import (
+    DEFAULT_INTERVAL, PROFILE_ID_RE, memory_diff, profile_path, profile_status, start_profile,
+    stop_memory_tracing, take_memory_snapshot
+)
+from ..tracing import get_tracer, set_tracing
+
+debug_bp = Blueprint('debug', __name__)
+
+
+@debug_bp.route('/timing', methods=['GET', 'POST'])
+@admin_required
+def request_timing_endpoint():
+    """Show or switch per-request timing and slow logs"""
+    app = current_app._get_current_object()
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        # A POST that only changes a threshold leaves timing as it is
+        enabled = data.get('enabled', get_instrumentation(app).enabled)
+        try:
+            set_request_timing(app, bool(enabled), data.get('slow_query_ms'), data.get('slow_request_ms'))
+        except (TypeError, ValueError):
+            return jsonify({'status': 'error', 'message': 'Thresholds must be numbers'}), 400
+    instrumentation = get_instrumentation(app)
+    return jsonify({
+        'enabled': instrumentation.enabled,
+        'slow_query_ms': instrumentation.slow_query_ms,
+        'slow_request_ms': instrumentation.slow_request_ms,
+    })
+
+
+@debug_bp.route('/tracing', methods=['GET', 'POST'])
+@admin_required
+def tracing_endpoint():
+    """Show or switch request tracing and its sampling rate"""
+    app = current_app._get_current_object()
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        # A POST that only changes the sampling rate leaves tracing as it is
+        enabled = data.get('enabled', get_tracer(app).enabled)
+        try:
+            set_tracing(app, bool(enabled), sample_rate=data.get('sample_rate'))
+        except (TypeError, ValueError):
+            return jsonify({'status': 'error', 'message': 'sample_rate must be a number'}), 400
+    tracer = get_tracer(app)
+    return jsonify({
+        'enabled': tracer.enabled,
+        'sample_rate': tracer.sample_rate,
+        'file': tracer.exporter.path if tracer.exporter else None,
+    })
+
+
+@debug_bp.route('/profile', methods=['POST'])
+@admin_required
+def start_profile_endpoint():
+    """Sample this worker's stacks for ``seconds`` in the background"""
+    seconds = request.args.get('seconds', 10, type=float)
+    interval_ms = request.args.get('interval_ms', DEFAULT_INTERVAL * 1000, type=float)
+    try:
+        profile_id = start_profile(seconds, interval_ms / 1000)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    if profile_id is None:
+        return jsonify({'status': 'error', 'message': 'A profile is already running in this worker'}), 409
+    return jsonify({
+        'status': 'running',
+        'id': profile_id,
+        'seconds': seconds,
+        'url': url_for('debug.get_profile_endpoint', profile_id=profile_id),
+    }), 202
+
+
+@debug_bp.route('/profile/<profile_id>')
+@admin_required
+def get_profile_endpoint(profile_id):
+    """Collapsed-stack file of a finished profile (202 while it runs)"""
+    status = profile_status(profile_id) if PROFILE_ID_RE.match(profile_id) else None
+    if status is None:
+        return jsonify({'status': 'error', 'message': 'Unknown profile'}), 404
+    if status == 'running':
+        return jsonify({'status': 'running', 'id': profile_id}), 202
+    return send_file(profile_path(profile_id), mimetype='text/plain', as_attachment=True,
+                     download_name=f'profile-{profile_id}.folded')
+
+
+@debug_bp.route('/memory/snapshot', methods=['POST'])
+@admin_required
+def memory_snapshot_endpoint():
+    """Start tracemalloc (if needed) and remember the heap to diff against"""
+    return jsonify(take_memory_snapshot())
+
+
+@debug_bp.route('/memory/diff')
+@admin_required
+def memory_diff_endpoint():
+    """Allocation sites that grew since the last snapshot"""
+    group_by = request.args.get('group', 'lineno')
+    if group_by not in ('lineno', 'traceback', 'filename'):
+        return jsonify({'status': 'error', 'message': 'group must be lineno, traceback or filename'}), 400
+    diff = memory_diff(limit=min(request.args.get('limit', 20, type=int), 200), group_by=group_by)
+    if diff is None:
+        return jsonify({'status': 'error', 'message': 'Take a snapshot first'}), 409
+    return jsonify(diff)
+
+
+@debug_bp.route('/memory', methods=['DELETE'])
+@admin_required
+def stop_memory_endpoint():
+    """Stop tracemalloc and forget the snapshot"""
+    stop_memory_tracing()
+    return '', 204
@@ -1,33 +1,153 @@
-from flask import Blueprint, render_template, request, jsonify
-from ..services.media_service import list_media, create_media, delete_media, count_media
-import os
-import uuid
+from flask import Blueprint, render_template, request, jsonify, current_app, send_file, abort, Response
+from ..services.media_service import list_media_page, media_usage_totals, delete_media, count_media, store_upload, create_or_get_media, get_upload_folder, MEDIA_PAGE_SIZE, UploadTooLargeError
+from ..services.image_service import schedule_derivatives
+from ..services.media_reference_service import get_media_articles, count_media_usages
+from ..services.upload_service import UploadError, start_upload, get_upload_state, write_chunk, finish_upload, abort_upload
+from werkzeug.exceptions import RequestEntityTooLarge
 from datetime import datetime
+import mimetypes
+import os
+import re
 
 
 media_bp = Blueprint('media', __name__, template_folder='templates')
 
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp', 'bmp'}
+
+# Uploads are content-addressed (or uniquely named), so a URL never changes content
+UPLOAD_CACHE_MAX_AGE = 31536000
+SHA256_NAME_RE = re.compile(r'^([0-9a-f]{64})(?:-\d+)?\.[a-z0-9]+$')
+
+# Room for the multipart envelope around a maximum-size file
+UPLOAD_ENVELOPE_SIZE = 64 * 1024
+
+
+def _file_extension(filename):
+    return filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+
+
+def _too_large():
+    max_size = current_app.config['MAX_UPLOAD_SIZE']
+    return jsonify({'error': f'File too large. Maximum size is {max_size // (1024 * 1024)}MB'}), 413
+
+
+@media_bp.errorhandler(RequestEntityTooLarge)
+def request_too_large(error):
+    """Bodies over the upload limit get the JSON error, not the HTML page"""
+    return _too_large()
+
+
+def _parse_datetime(value):
+    """Parse an ISO date/datetime query parameter; None when absent or invalid"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _media_page_from_request():
+    return list_media_page(
+        cursor=request.args.get('cursor'),
+        limit=request.args.get('limit', MEDIA_PAGE_SIZE, type=int),
+        file_type=request.args.get('type') or None,
+        since=_parse_datetime(request.args.get('since')),
+        until=_parse_datetime(request.args.get('until')),
+        name_prefix=request.args.get('q') or None
+    )
+
+
+def _store_media(original_name, file_type, sha256, filename, file_path, file_size):
+    """Create (or reuse) the media row for stored content and build derivatives"""
+    media, created = create_or_get_media(
+        filename=filename,
+        original_name=original_name,
+        file_type=file_type,
+        file_size=file_size,
+        file_path=file_path,
+        sha256=sha256
+    )
+    if created:
+        schedule_derivatives(file_path)
+    return jsonify({
+        'success': True,
+        'duplicate': not created,
+        'media': media.to_dict()
+    }), 201 if created else 200
+
+
+@media_bp.route('/static/uploads/<path:filename>')
+def serve_upload(filename):
+    """Serve an uploaded file without tying up the worker for the whole transfer.
+
+    With MEDIA_ACCEL=nginx the response is an empty X-Accel-Redirect to
+    MEDIA_ACCEL_PREFIX + filename; with MEDIA_ACCEL=sendfile it carries an
+    X-Sendfile header (Apache/lighttpd). Otherwise the file is streamed via
+    wsgi.file_wrapper, which gunicorn turns into a zero-copy sendfile(), with
+    Range requests and a strong ETag (the content hash for hashed names).
+    """
+    if any(part.startswith('.') or part == '' for part in filename.split('/')):
+        abort(404)
+    upload_folder = get_upload_folder()
+    file_path = os.path.realpath(os.path.join(upload_folder, filename))
+    if not file_path.startswith(os.path.realpath(upload_folder) + os.sep) or not os.path.isfile(file_path):
+        abort(404)
+
+    match = SHA256_NAME_RE.match(os.path.basename(filename))
+    accel = current_app.config['MEDIA_ACCEL']
+    if accel == 'nginx':
+        response = Response(status=200, mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        response.headers['X-Accel-Redirect'] = current_app.config['MEDIA_ACCEL_PREFIX'] + filename
+    elif accel == 'sendfile':
+        response = Response(status=200, mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        response.headers['X-Sendfile'] = file_path
+    else:
+        etag = os.path.basename(filename) if match else True
+        response = send_file(file_path, conditional=True, etag=etag, max_age=UPLOAD_CACHE_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.max_age = UPLOAD_CACHE_MAX_AGE
+    if match:
+        response.cache_control.immutable = True
+    return response
+
 
 @media_bp.route('/media/manage')
 def manage():
     """Render the media management page"""
-    media = list_media()
-    return render_template('manage_media.html', media=media)
+    page = _media_page_from_request()
+    return render_template('manage_media.html', media=page['items'], next_cursor=page['next_cursor'],
+                           usage=media_usage_totals(), used_by=count_media_usages([m.id for m in page['items']]))
 
 
 @media_bp.route('/api/media', methods=['GET'])
 def list_media_api():
-    """List all media files"""
-    media = list_media()
+    """List media files, newest first unless filtered (see list_media_page): ?limit=&cursor=&type=&since=&until=&q="""
+    page = _media_page_from_request()
+    used_by = count_media_usages([m.id for m in page['items']])
     return jsonify({
-        'media': [m.to_dict() for m in media],
-        'count': len(media)
+        'media': [dict(m.to_dict(), used_by=used_by.get(m.id, 0)) for m in page['items']],
+        'count': len(page['items']),
+        'next_cursor': page['next_cursor'],
+        'total': count_media()
     })
 
 
+@media_bp.route('/api/media/usage', methods=['GET'])
+def media_usage_api():
+    """Media count and disk usage, overall and per file type"""
+    return jsonify(media_usage_totals())
+
+
 @media_bp.route('/api/media', methods=['POST'])
 def upload_media():
     """Upload a new media file"""
+    # Cap this request's body as it is read (chunked bodies included); other
+    # routes, like bulk imports, keep the app-wide limit
+    request.max_content_length = current_app.config['MAX_UPLOAD_SIZE'] + UPLOAD_ENVELOPE_SIZE
+    if request.content_length and request.content_length > request.max_content_length:
+        return _too_large()
+    
     if 'file' not in request.files:
         return jsonify({'error': 'No file provided'}), 400
     
@@ -37,45 +157,72 @@ def upload_media():
         return jsonify({'error': 'No file selected'}), 400
     
     # Check allowed extensions
-    allowed_extensions = {'png', 'jpg', 'jpeg', 'gif', 'webp', 'bmp'}
-    file_ext = file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else ''
-    
-    if file_ext not in allowed_extensions:
-        return jsonify({'error': f'Invalid file type. Allowed: {", ".join(allowed_extensions)}'}), 400
+    file_ext = _file_extension(file.filename)
     
-    # Create uploads directory if it doesn't exist (use absolute path for Render persistence)
-    # Check if we're on Render (has DISK_MOUNT_PATH env var) or local
-    if os.getenv('DISK_MOUNT_PATH'):
-        upload_folder = os.path.join(os.getenv('DISK_MOUNT_PATH'), 'news_app', 'Frontend', 'static', 'uploads')
-    else:
-        upload_folder = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'Frontend', 'static', 'uploads')
+    if file_ext not in ALLOWED_EXTENSIONS:
+        return jsonify({'error': f'Invalid file type. Allowed: {", ".join(ALLOWED_EXTENSIONS)}'}), 400
     
-    os.makedirs(upload_folder, exist_ok=True)
-    
-    # Generate unique filename
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    unique_filename = f"{timestamp}_{uuid.uuid4().hex[:8]}.{file_ext}"
-    file_path = os.path.join(upload_folder, unique_filename)
-    
-    # Save the file
-    file.save(file_path)
-    
-    # Get file info
-    file_size = os.path.getsize(file_path)
-    
-    # Create database record
-    media = create_media(
-        filename=unique_filename,
-        original_name=file.filename,
-        file_type=file.content_type or f'image/{file_ext}',
-        file_size=file_size,
-        file_path=file_path
-    )
+    # Hash while streaming to disk; identical content is stored once
+    try:
+        sha256, filename, file_path, file_size = store_upload(
+            file.stream, file_ext, max_size=current_app.config['MAX_UPLOAD_SIZE'])
+    except UploadTooLargeError:
+        return _too_large()
     
-    return jsonify({
-        'success': True,
-        'media': media.to_dict()
-    }), 201
+    return _store_media(file.filename, file.content_type or f'image/{file_ext}', sha256, filename, file_path, file_size)
+
+
+@media_bp.route('/api/media/uploads', methods=['POST'])
+def start_chunked_upload():
+    """Start a resumable upload: {filename, size, content_type?, sha256?}"""
+    data = request.get_json(silent=True) or {}
+    original_name = data.get('filename') or ''
+    file_ext = _file_extension(original_name)
+    if file_ext not in ALLOWED_EXTENSIONS:
+        return jsonify({'error': f'Invalid file type. Allowed: {", ".join(ALLOWED_EXTENSIONS)}'}), 400
+    try:
+        state = start_upload(
+            filename=original_name,
+            file_ext=file_ext,
+            content_type=data.get('content_type') or f'image/{file_ext}',
+            size=data.get('size'),
+            max_size=current_app.config['MAX_UPLOAD_SIZE'],
+            sha256=data.get('sha256')
+        )
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status
+    return jsonify(state), 201
+
+
+@media_bp.route('/api/media/uploads/<upload_id>', methods=['GET', 'PUT', 'DELETE'])
+def chunked_upload(upload_id):
+    """Query (GET), append a chunk to (PUT ?offset=N) or abort (DELETE) an upload"""
+    try:
+        if request.method == 'GET':
+            return jsonify(get_upload_state(upload_id))
+        if request.method == 'DELETE':
+            abort_upload(upload_id)
+            return '', 204
+        state = write_chunk(
+            upload_id,
+            offset=request.args.get('offset', 0, type=int),
+            stream=request.stream,
+            length=request.content_length,
+            chunk_sha256=request.headers.get('X-Chunk-SHA256')
+        )
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status
+    return jsonify(state)
+
+
+@media_bp.route('/api/media/uploads/<upload_id>/complete', methods=['POST'])
+def complete_chunked_upload(upload_id):
+    """Verify the assembled file and create its media record"""
+    try:
+        session, sha256, filename, file_path, file_size = finish_upload(upload_id)
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status
+    return _store_media(session['filename'], session['content_type'], sha256, filename, file_path, file_size)
 
 
 @media_bp.route('/api/media/<int:media_id>', methods=['DELETE'])
@@ -89,6 +236,16 @@ def delete_media_api(media_id):
         return jsonify({'error': 'Media not found'}), 404
 
 
+@media_bp.route('/api/media/<int:media_id>/articles')
+def media_articles_api(media_id):
+    """Articles that use a media item (from the reference index)"""
+    articles = get_media_articles(media_id)
+    return jsonify({
+        'articles': [{'id': a.id, 'title': a.title} for a in articles],
+        'count': len(articles)
+    })
+
+
 @media_bp.route('/api/media/count')
 def media_count():
     """Get total count of media files"""
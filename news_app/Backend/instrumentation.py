@@ -0,0 +1,213 @@
+"""Per-request timing: SQL query counts, phase durations and slow logs.
+
+When enabled, every request collects how long it spent in SQLite (``db``),
+Jinja (``tpl``), Flask-Compress (``compress``) and NewsAPI (``newsapi``)
+and returns it in a ``Server-Timing`` header, which browser dev tools show
+next to the request. Queries slower than ``SLOW_QUERY_MS`` and requests
+slower than ``SLOW_REQUEST_MS`` are logged with their statement/parameters
+or phase breakdown.
+
+Timing is switched at runtime with ``set_request_timing()`` (or
+``POST /api/debug/timing``). While it is off the SQLAlchemy listeners are
+removed and the request hooks return after one flag check, so the
+disabled cost is a dictionary lookup per request.
+"""
+from flask import g, has_request_context, request, template_rendered, before_render_template
+from .models.db import db
+from contextlib import contextmanager
+from sqlalchemy import event
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '100'))
+SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS', '1000'))
+# Longest parameter repr written to the slow-query log
+SLOW_QUERY_PARAMS_MAX = 500
+# Server-Timing metric names, in header order
+PHASES = ('db', 'tpl', 'compress', 'newsapi')
+
+
+class RequestTiming:
+    """Durations (ms) and call counts of one request's phases"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.durations = dict.fromkeys(PHASES, 0.0)
+        self.counts = dict.fromkeys(PHASES, 0)
+        self.total = None
+
+    def add(self, phase, ms):
+        self.durations[phase] = self.durations.get(phase, 0.0) + ms
+        self.counts[phase] = self.counts.get(phase, 0) + 1
+
+    def header(self):
+        parts = []
+        for phase, ms in self.durations.items():
+            if self.counts[phase]:
+                desc = f';desc="{self.counts[phase]} queries"' if phase == 'db' else ''
+                parts.append(f'{phase};dur={ms:.1f}{desc}')
+        parts.append(f'total;dur={self.total:.1f}')
+        return ', '.join(parts)
+
+    def summary(self):
+        return ', '.join(f'{phase} {ms:.0f}ms/{self.counts[phase]}'
+                         for phase, ms in self.durations.items() if self.counts[phase])
+
+
+def current_timing():
+    """The running request's timing, or None outside a timed request"""
+    if has_request_context():
+        return g.get('_request_timing')
+    return None
+
+
+@contextmanager
+def timed_phase(phase):
+    """Add the duration of the block to ``phase`` of the current request (no-op when untimed)"""
+    timing = current_timing()
+    if timing is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(phase, (time.perf_counter() - start) * 1000)
+
+
+def _format_params(parameters):
+    text = repr(parameters)
+    if len(text) > SLOW_QUERY_PARAMS_MAX:
+        text = text[:SLOW_QUERY_PARAMS_MAX] + '...'
+    return text
+
+
+def _before_render(sender, template, context, **extra):
+    timing = current_timing()
+    if timing is not None:
+        g._render_start = time.perf_counter()
+
+
+def _rendered(sender, template, context, **extra):
+    timing = current_timing()
+    start = g.pop('_render_start', None) if timing is not None else None
+    if start is not None:
+        timing.add('tpl', (time.perf_counter() - start) * 1000)
+
+
+class Instrumentation:
+    """Timing switch, slow-log thresholds and engine listeners of one app"""
+
+    def __init__(self, app):
+        self.app = app
+        self.enabled = False
+        self.slow_query_ms = SLOW_QUERY_MS
+        self.slow_request_ms = SLOW_REQUEST_MS
+        self._engines = []
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        context._query_start = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, '_query_start', None)
+        if start is None:  # timing was switched on mid-query
+            return
+        ms = (time.perf_counter() - start) * 1000
+        timing = current_timing()
+        if timing is not None:
+            timing.add('db', ms)
+        if ms >= self.slow_query_ms:
+            where = f' [{request.method} {request.path}]' if has_request_context() else ''
+            logger.warning('Slow query %.0fms%s: %s params=%s', ms, where, ' '.join(statement.split()),
+                           _format_params(parameters))
+
+    def enable(self):
+        if self.enabled:
+            return
+        with self.app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        self._engines.append(engine)
+        before_render_template.connect(_before_render, self.app)
+        template_rendered.connect(_rendered, self.app)
+        self.enabled = True
+
+    def disable(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        for engine in self._engines:
+            event.remove(engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.remove(engine, 'after_cursor_execute', self._after_cursor_execute)
+        self._engines = []
+        before_render_template.disconnect(_before_render, self.app)
+        template_rendered.disconnect(_rendered, self.app)
+
+
+def get_instrumentation(app):
+    return app.extensions['instrumentation']
+
+
+def set_request_timing(app, enabled, slow_query_ms=None, slow_request_ms=None):
+    """Switch per-request timing on or off for a running app, optionally changing the thresholds"""
+    instrumentation = get_instrumentation(app)
+    # Convert both thresholds before applying either, so a bad value changes nothing
+    if slow_query_ms is not None:
+        slow_query_ms = float(slow_query_ms)
+    if slow_request_ms is not None:
+        slow_request_ms = float(slow_request_ms)
+    if slow_query_ms is not None:
+        instrumentation.slow_query_ms = slow_query_ms
+    if slow_request_ms is not None:
+        instrumentation.slow_request_ms = slow_request_ms
+    if enabled:
+        instrumentation.enable()
+    else:
+        instrumentation.disable()
+    return instrumentation.enabled
+
+
+def init_instrumentation(app):
+    """Register the timing hooks; timing starts enabled when REQUEST_TIMING=1"""
+    instrumentation = Instrumentation(app)
+    app.extensions['instrumentation'] = instrumentation
+
+    @app.before_request
+    def start_request_timing():
+        if instrumentation.enabled:
+            g._request_timing = RequestTiming()
+
+    @app.after_request
+    def start_compress_timing(response):
+        # Registered after Flask-Compress, so it runs before it
+        timing = g.get('_request_timing')
+        if timing is not None:
+            g._compress_start = time.perf_counter()
+        return response
+
+    def finish_request_timing(response):
+        timing = g.pop('_request_timing', None)
+        if timing is None:
+            return response
+        now = time.perf_counter()
+        compress_start = g.pop('_compress_start', None)
+        if compress_start is not None and response.headers.get('Content-Encoding'):
+            timing.add('compress', (now - compress_start) * 1000)
+        timing.total = (now - timing.start) * 1000
+        response.headers['Server-Timing'] = timing.header()
+        if timing.total >= instrumentation.slow_request_ms:
+            logger.warning('Slow request %s %s %.0fms (%s)', request.method, request.full_path.rstrip('?'),
+                           timing.total, timing.summary() or 'no tracked phases')
+        return response
+
+    # after_request hooks run in reverse registration order: putting this one
+    # first makes it run last, after Flask-Compress has encoded the body
+    app.after_request_funcs.setdefault(None, []).insert(0, finish_request_timing)
+
+    if os.getenv('REQUEST_TIMING', '').lower() in ('1', 'true', 'yes'):
+        instrumentation.enable()
+    return instrumentation
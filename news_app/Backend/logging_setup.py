@@ -0,0 +1,210 @@
+"""Non-blocking structured logging.
+
+Every ``news_app.*`` logger (including ``app.logger``) feeds one
+``QueueHandler``: the calling thread only merges the message arguments
+and appends the record to a bounded in-memory queue. A ``QueueListener``
+thread writes the records to stderr and, with ``LOG_FILE`` set, to a
+size-rotated file, so a slow disk never stalls a request. When the queue
+is full records are dropped (and counted) instead of blocking.
+
+Records are JSON lines (``LOG_FORMAT=text`` for the old console style).
+Records logged while handling a request carry its id (taken from the
+``X-Request-ID`` header or generated, and echoed in the response), method
+and path (plus the trace id of traced requests); ``extra={...}`` fields
+are included as-is.
+
+Repetitive records (same logger, level and message template) are
+sampled: at most ``LOG_SAMPLE_BURST`` per ``LOG_SAMPLE_WINDOW`` seconds.
+The next record of that kind that gets through reports how many were
+suppressed.
+"""
+from flask import g, has_request_context, request
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+import atexit
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import uuid
+
+LOGGER_NAME = 'news_app'
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json').lower()
+LOG_FILE = os.getenv('LOG_FILE', '')
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+# Records waiting for the writer thread; beyond this they are dropped
+LOG_QUEUE_SIZE = 10000
+LOG_SAMPLE_BURST = int(os.getenv('LOG_SAMPLE_BURST', '20'))
+LOG_SAMPLE_WINDOW = 60
+REQUEST_ID_HEADER = 'X-Request-ID'
+_REQUEST_ID_RE = re.compile(r'^[A-Za-z0-9._-]{1,128}$')
+
+# Attributes every LogRecord has; anything else came from ``extra=``
+_STANDARD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+_CONTEXT_ATTRS = ('request_id', 'trace_id', 'method', 'path', 'suppressed')
+
+_listener = None
+_handler = None
+_setup_lock = threading.Lock()
+
+
+class RequestContextFilter(logging.Filter):
+    """Copy the request id, method and path onto records before they are queued"""
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = g.get('request_id')
+            record.method = request.method
+            record.path = request.path
+            record.trace_id = g.get('trace_id')
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Let through at most ``burst`` records per message template per ``window`` seconds"""
+
+    MAX_KEYS = 10000
+
+    def __init__(self, burst=LOG_SAMPLE_BURST, window=LOG_SAMPLE_WINDOW):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.lock = threading.Lock()
+        self.counters = {}
+
+    def filter(self, record):
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self.lock:
+            state = self.counters.get(key)
+            if state is None or now - state[0] >= self.window:
+                if state is None and len(self.counters) >= self.MAX_KEYS:
+                    self.counters.clear()
+                suppressed = state[2] if state else 0
+                state = self.counters[key] = [now, 0, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+            state[1] += 1
+            if state[1] > self.burst:
+                state[2] += 1
+                return False
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks: records are dropped when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Merge args and render the traceback here, where the objects are alive,
+        # but leave the final formatting to the listener's handlers
+        record = logging.makeLogRecord(vars(record))
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg, record.args, record.exc_info = record.message, None, None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class StderrHandler(logging.StreamHandler):
+    """Writes to whatever ``sys.stderr`` is when the record is emitted"""
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+
+    @property
+    def stream(self):
+        return sys.stderr
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        data = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'pid': record.process,
+            'thread': record.threadName,
+        }
+        for name, value in vars(record).items():
+            if name not in _STANDARD_ATTRS and value is not None:
+                data[name] = value
+        if record.exc_text:
+            data['exc'] = record.exc_text
+        return json.dumps(data, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        line = f'[{record.levelname}] {record.getMessage()}'
+        context = ' '.join(f'{name}={getattr(record, name)}' for name in _CONTEXT_ATTRS
+                           if getattr(record, name, None) is not None)
+        if context:
+            line += f' ({context})'
+        if record.exc_text:
+            line += '\n' + record.exc_text
+        return line
+
+
+def _build_handlers():
+    formatter = TextFormatter() if LOG_FORMAT == 'text' else JsonFormatter()
+    handlers = [StderrHandler()]
+    if LOG_FILE:
+        handlers.append(RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT,
+                                            encoding='utf-8'))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+def configure_logging():
+    """Attach the queue handler to the ``news_app`` logger once per process"""
+    global _listener, _handler
+    with _setup_lock:
+        if _handler is not None:
+            return _handler
+        log_queue = queue.Queue(LOG_QUEUE_SIZE)
+        _handler = DroppingQueueHandler(log_queue)
+        _handler.addFilter(SamplingFilter())
+        _handler.addFilter(RequestContextFilter())
+        logger = logging.getLogger(LOGGER_NAME)
+        logger.setLevel(LOG_LEVEL)
+        logger.addHandler(_handler)
+        _listener = QueueListener(log_queue, *_build_handlers(), respect_handler_level=True)
+        _listener.start()
+        # Write what is still queued when the worker exits
+        atexit.register(_listener.stop)
+    return _handler
+
+
+def init_logging(app):
+    """Configure logging and give every request an id"""
+    configure_logging()
+
+    @app.before_request
+    def assign_request_id():
+        supplied = request.headers.get(REQUEST_ID_HEADER, '')
+        g.request_id = supplied if _REQUEST_ID_RE.match(supplied) else uuid.uuid4().hex
+
+    @app.after_request
+    def echo_request_id(response):
+        request_id = g.get('request_id')
+        if request_id:
+            response.headers[REQUEST_ID_HEADER] = request_id
+        return response
@@ -0,0 +1,256 @@
+"""Request, database, NewsAPI and cache metrics in Prometheus text format.
+
+Metrics live in a process-wide registry: per-endpoint request counters and
+latency histograms are recorded by request hooks, and services record
+NewsAPI calls and cache lookups with ``observe_newsapi()`` and
+``record_cache()``. ``GET /metrics`` renders them for Prometheus.
+
+gunicorn workers are separate processes, so with ``METRICS_DIR`` set each
+worker writes a snapshot of its registry to ``<METRICS_DIR>/metrics-<pid>.json``
+at most every ``SNAPSHOT_INTERVAL`` seconds (and when it serves a scrape).
+A scrape sums the counters and histograms of every snapshot, so the totals
+survive worker restarts; gauges are only taken from workers that are still
+alive. Clear the directory when the server is (re)deployed.
+"""
+from flask import Response, request, g
+from .models.db import db
+from bisect import bisect_left
+import json
+import os
+import threading
+import time
+
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+SNAPSHOT_INTERVAL = 5
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metric:
+    """One metric family; samples are keyed by a tuple of label values"""
+
+    def __init__(self, name, kind, help_text, labels=(), buckets=None):
+        self.name = name
+        self.kind = kind
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = buckets
+        self.samples = {}
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+
+    def register(self, name, kind, help_text, labels=(), buckets=None):
+        metric = Metric(name, kind, help_text, labels, buckets)
+        self.metrics[name] = metric
+        return metric
+
+    def inc(self, metric, labels=(), amount=1):
+        with self.lock:
+            metric.samples[labels] = metric.samples.get(labels, 0) + amount
+
+    def set(self, metric, labels=(), value=0):
+        with self.lock:
+            metric.samples[labels] = value
+
+    def observe(self, metric, labels, value):
+        """Add ``value`` to a histogram; a sample is ``[bucket counts..., +Inf count, sum]``"""
+        with self.lock:
+            sample = metric.samples.get(labels)
+            if sample is None:
+                sample = metric.samples[labels] = [0] * (len(metric.buckets) + 1) + [0.0]
+            sample[bisect_left(metric.buckets, value)] += 1
+            sample[-1] += value
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                name: {'kind': m.kind, 'samples': [[list(k), v if not isinstance(v, list) else list(v)]
+                                                   for k, v in m.samples.items()]}
+                for name, m in self.metrics.items()
+            }
+
+
+REGISTRY = MetricsRegistry()
+HTTP_REQUESTS = REGISTRY.register(
+    'http_requests_total', 'counter', 'HTTP requests by endpoint, method and status',
+    ('endpoint', 'method', 'status'))
+HTTP_LATENCY = REGISTRY.register(
+    'http_request_duration_seconds', 'histogram', 'Request latency by endpoint',
+    ('endpoint', 'method'), LATENCY_BUCKETS)
+NEWSAPI_REQUESTS = REGISTRY.register(
+    'newsapi_requests_total', 'counter', 'NewsAPI calls by API endpoint and outcome (HTTP status or "error")',
+    ('endpoint', 'status'))
+NEWSAPI_LATENCY = REGISTRY.register(
+    'newsapi_request_duration_seconds', 'histogram', 'NewsAPI call latency',
+    ('endpoint',), LATENCY_BUCKETS)
+CIRCUIT_STATE = REGISTRY.register(
+    'circuit_breaker_state', 'gauge', 'Upstream circuit breaker state (1 for the current one), summed over live workers',
+    ('breaker', 'state'))
+CIRCUIT_REJECTIONS = REGISTRY.register(
+    'circuit_breaker_rejections_total', 'counter', 'Upstream calls failed fast because the circuit was open',
+    ('breaker',))
+ADMISSION_REJECTIONS = REGISTRY.register(
+    'admission_rejections_total', 'counter', 'Requests refused by admission control, by bucket and reason (rate_limited/shed)',
+    ('bucket', 'reason'))
+NEWSAPI_PREFETCHES = REGISTRY.register(
+    'newsapi_prefetches_total', 'counter',
+    'Next-page prefetches by result (fetched, used by a later request, failed, over_budget)', ('result',))
+CACHE_LOOKUPS = REGISTRY.register(
+    'cache_lookups_total', 'counter', 'Cache lookups by cache and result (hit/miss)', ('cache', 'result'))
+DB_POOL = REGISTRY.register(
+    'db_pool_connections', 'gauge', 'Database connection pool state, summed over live workers', ('state',))
+
+
+def observe_newsapi(endpoint, status, seconds):
+    """Record one NewsAPI call; ``status`` is the HTTP status or 'error'"""
+    REGISTRY.inc(NEWSAPI_REQUESTS, (endpoint, str(status)))
+    REGISTRY.observe(NEWSAPI_LATENCY, (endpoint,), seconds)
+
+
+def record_cache(cache, hit):
+    REGISTRY.inc(CACHE_LOOKUPS, (cache, 'hit' if hit else 'miss'))
+
+
+def _update_pool_gauges():
+    pool = db.engine.pool
+    for state in ('size', 'checkedin', 'checkedout', 'overflow'):
+        method = getattr(pool, state, None)
+        if method is not None:
+            REGISTRY.set(DB_POOL, (state,), method())
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class SnapshotWriter:
+    """Writes this worker's registry to the shared directory now and then"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.last_write = 0.0
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, pid=None):
+        return os.path.join(self.directory, f'metrics-{pid or os.getpid()}.json')
+
+    def due(self):
+        return time.monotonic() - self.last_write >= SNAPSHOT_INTERVAL
+
+    def write(self):
+        self.last_write = time.monotonic()
+        path = self.path()
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'pid': os.getpid(), 'metrics': REGISTRY.snapshot()}, f)
+        os.replace(tmp_path, path)
+
+    def read_all(self):
+        snapshots = []
+        for name in sorted(os.listdir(self.directory)):
+            if not (name.startswith('metrics-') and name.endswith('.json')):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # being replaced; the next scrape picks it up
+        return snapshots
+
+
+def merge_snapshots(snapshots):
+    """Sum samples across processes; gauges only from live processes"""
+    merged = {}
+    for snapshot in snapshots:
+        alive = snapshot['pid'] == os.getpid() or _pid_alive(snapshot['pid'])
+        for name, data in snapshot['metrics'].items():
+            if data['kind'] == 'gauge' and not alive:
+                continue
+            target = merged.setdefault(name, {})
+            for labels, value in data['samples']:
+                key = tuple(labels)
+                if isinstance(value, list):
+                    current = target.get(key)
+                    target[key] = value if current is None else [a + b for a, b in zip(current, value)]
+                else:
+                    target[key] = target.get(key, 0) + value
+    return merged
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _label_text(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_metrics(samples_by_name):
+    """Prometheus text exposition of ``{name: {label values: value}}``"""
+    lines = []
+    for name, metric in REGISTRY.metrics.items():
+        samples = samples_by_name.get(name) or {}
+        lines.append(f'# HELP {name} {metric.help}')
+        lines.append(f'# TYPE {name} {metric.kind}')
+        for labels, value in sorted(samples.items()):
+            if metric.kind == 'histogram':
+                cumulative = 0
+                for bound, count in zip(metric.buckets + ('+Inf',), value[:-1]):
+                    cumulative += count
+                    le = bound if bound == '+Inf' else _number(bound)
+                    lines.append(f'{name}_bucket{_label_text(metric.labels, labels, [("le", le)])} {cumulative}')
+                lines.append(f'{name}_sum{_label_text(metric.labels, labels)} {_number(value[-1])}')
+                lines.append(f'{name}_count{_label_text(metric.labels, labels)} {cumulative}')
+            else:
+                lines.append(f'{name}{_label_text(metric.labels, labels)} {_number(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+def init_metrics(app):
+    """Record request metrics and serve them at /metrics"""
+    writer = SnapshotWriter(METRICS_DIR) if METRICS_DIR else None
+    app.extensions['metrics_writer'] = writer
+
+    @app.before_request
+    def start_metrics_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        start = g.pop('_metrics_start', None)
+        if start is not None:
+            endpoint = request.endpoint or 'unmatched'
+            REGISTRY.inc(HTTP_REQUESTS, (endpoint, request.method, str(response.status_code)))
+            REGISTRY.observe(HTTP_LATENCY, (endpoint, request.method), time.perf_counter() - start)
+        if writer is not None and writer.due():
+            _update_pool_gauges()
+            writer.write()
+        return response
+
+    def metrics():
+        _update_pool_gauges()
+        if writer is None:
+            samples = merge_snapshots([{'pid': os.getpid(), 'metrics': REGISTRY.snapshot()}])
+        else:
+            writer.write()
+            samples = merge_snapshots(writer.read_all())
+        return Response(render_metrics(samples), mimetype='text/plain; version=0.0.4')
+
+    app.add_url_rule('/metrics', 'metrics', metrics)
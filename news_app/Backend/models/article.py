@@ -3,13 +3,17 @@ from datetime import datetime, timezone
 
 class Article(db.Model):
     __tablename__ = 'articles'
+    __table_args__ = (
+        # Category listings filter on category_id and sort by created_at
+        db.Index('ix_articles_category_id_created_at', 'category_id', 'created_at'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
     author = db.Column(db.String(100), nullable=True)
     content = db.Column(db.Text, nullable=False)
     image_url = db.Column(db.String(500), nullable=True)
     category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=True)
-    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), index=True)
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
 
     category = db.relationship('Category', back_populates='articles')
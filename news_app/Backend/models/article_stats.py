@@ -0,0 +1,15 @@
+from .db import db
+
+
+class ArticleStats(db.Model):
+    """Popularity counters for an article, written in batches by the view counter"""
+    __tablename__ = 'article_stats'
+    article_id = db.Column(db.Integer, db.ForeignKey('articles.id'), primary_key=True)
+    views = db.Column(db.Integer, nullable=False, default=0)
+    # HyperLogLog registers estimating distinct visitors
+    visitors_sketch = db.Column(db.LargeBinary, nullable=True)
+    unique_visitors = db.Column(db.Integer, nullable=False, default=0)
+    # log2 of the exponentially decayed view count, anchored at a fixed epoch
+    # so rows can be ranked without re-decaying them
+    trend_score = db.Column(db.Float, nullable=False, index=True)
+    updated_at = db.Column(db.DateTime, nullable=True)
@@ -6,11 +6,12 @@ class Media(db.Model):
     __tablename__ = 'media'
     id = db.Column(db.Integer, primary_key=True)
     filename = db.Column(db.String(255), nullable=False)
-    original_name = db.Column(db.String(255), nullable=False)
-    file_type = db.Column(db.String(50), nullable=False)
+    original_name = db.Column(db.String(255), nullable=False, index=True)
+    file_type = db.Column(db.String(50), nullable=False, index=True)
     file_size = db.Column(db.Integer, nullable=False)  # Size in bytes
     file_path = db.Column(db.String(500), nullable=False)
-    uploaded_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    sha256 = db.Column(db.String(64), nullable=True, unique=True, index=True)  # Content hash, NULL for legacy uploads
+    uploaded_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), index=True)
 
     def get_url(self):
         """Return the static URL for this media file"""
@@ -24,15 +25,22 @@ class Media(db.Model):
             'file_type': self.file_type,
             'file_size': self.file_size,
             'file_path': self.get_url(),  # Return URL, not server path
+            'sha256': self.sha256,
             'uploaded_at': self.uploaded_at.isoformat() if self.uploaded_at else None
         }
 
     @property
     def file_size_formatted(self):
         """Return human-readable file size"""
-        for unit in ['B', 'KB', 'MB', 'GB']:
-            if self.file_size < 1024:
-                return f"{self.file_size:.1f} {unit}"
-            self.file_size /= 1024
-        return f"{self.file_size:.1f} TB"
+        return format_file_size(self.file_size)
+
+
+def format_file_size(size):
+    """Human-readable size; never touches model state"""
+    size = size or 0
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
 
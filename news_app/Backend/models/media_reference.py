@@ -0,0 +1,8 @@
+from .db import db
+
+
+class MediaReference(db.Model):
+    """Reverse index: one row per (media item, article that embeds it)"""
+    __tablename__ = 'media_references'
+    media_id = db.Column(db.Integer, db.ForeignKey('media.id'), primary_key=True)
+    article_id = db.Column(db.Integer, db.ForeignKey('articles.id'), primary_key=True, index=True)
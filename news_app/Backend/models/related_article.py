@@ -0,0 +1,9 @@
+from .db import db
+
+
+class RelatedArticle(db.Model):
+    """Precomputed top-k neighbours of an article by TF-IDF cosine similarity"""
+    __tablename__ = 'related_articles'
+    article_id = db.Column(db.Integer, db.ForeignKey('articles.id'), primary_key=True)
+    related_id = db.Column(db.Integer, db.ForeignKey('articles.id'), primary_key=True, index=True)
+    score = db.Column(db.Float, nullable=False)
@@ -0,0 +1,174 @@
+"""On-demand wall-clock sampling profiler and tracemalloc snapshot diffs.
+
+``start_profile()`` samples the stacks of every thread in this process from
+a background thread for a number of seconds (``sys._current_frames()`` at
+``interval`` spacing, so requests are never instrumented) and writes the
+counts in collapsed-stack format, one ``root;caller;callee count`` line
+per stack, ready for flamegraph.pl or speedscope. The file lands in
+``PROFILE_DIR`` so any worker on the host can serve it afterwards.
+
+``take_memory_snapshot()`` starts tracemalloc if needed and remembers a
+snapshot; ``memory_diff()`` compares the current heap with it and returns
+the allocation sites that grew the most. Tracing costs memory and CPU
+while it is on, so ``stop_memory_tracing()`` turns it off again.
+Snapshots are per process: with several workers, keep hitting the same one.
+"""
+from collections import Counter
+from datetime import datetime, timezone
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'news-profiles'))
+PROFILE_MAX_SECONDS = 120
+DEFAULT_INTERVAL = 0.01
+# Frames kept per allocation traceback while tracemalloc runs
+TRACEMALLOC_FRAMES = 10
+PROFILE_ID_RE = re.compile(r'^[0-9]+-[0-9]+$')
+
+_profile_lock = threading.Lock()
+_running_profile = None
+_memory_baseline = None
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def collapse_stack(frame, root):
+    """Folded stack string of ``frame``, outermost first, under a ``root`` label"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(root)
+    return ';'.join(reversed(labels))
+
+
+def sample_stacks(seconds, interval=DEFAULT_INTERVAL):
+    """Collapsed stack counts of all other threads over ``seconds``; returns (Counter, samples)"""
+    own = threading.get_ident()
+    stacks = Counter()
+    samples = 0
+    names = {}
+    names_at = 0.0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        now = time.monotonic()
+        if now - names_at > 1:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            names_at = now
+        for ident, frame in sys._current_frames().items():
+            if ident != own:
+                stacks[collapse_stack(frame, names.get(ident, f'thread-{ident}'))] += 1
+        samples += 1
+        time.sleep(interval)
+    return stacks, samples
+
+
+def profile_path(profile_id):
+    return os.path.join(PROFILE_DIR, f'{profile_id}.folded')
+
+
+def _run_profile(profile_id, seconds, interval):
+    global _running_profile
+    try:
+        stacks, samples = sample_stacks(seconds, interval)
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = profile_path(profile_id)
+        with open(path + '.tmp', 'w') as f:
+            for stack, count in stacks.most_common():
+                f.write(f'{stack} {count}\n')
+        os.replace(path + '.tmp', path)
+        logger.info('Profile %s: %s samples written to %s', profile_id, samples, path)
+    except Exception as e:
+        logger.error('Profile %s failed: %s', profile_id, e)
+    finally:
+        with _profile_lock:
+            _running_profile = None
+
+
+def start_profile(seconds, interval=DEFAULT_INTERVAL):
+    """Start sampling in the background; returns the profile id, or None if one is running"""
+    global _running_profile
+    if not 0 < seconds <= PROFILE_MAX_SECONDS:
+        raise ValueError(f'seconds must be between 0 and {PROFILE_MAX_SECONDS}')
+    if not 0.001 <= interval <= 1:
+        raise ValueError('interval must be between 1 and 1000 ms')
+    with _profile_lock:
+        if _running_profile is not None:
+            return None
+        profile_id = f'{os.getpid()}-{int(time.time() * 1000)}'
+        _running_profile = profile_id
+    threading.Thread(target=_run_profile, args=(profile_id, seconds, interval),
+                     name='sampling-profiler', daemon=True).start()
+    return profile_id
+
+
+def profile_status(profile_id):
+    """'done', 'running' (in this process) or None when unknown"""
+    if os.path.exists(profile_path(profile_id)):
+        return 'done'
+    if profile_id == _running_profile:
+        return 'running'
+    return None
+
+
+def _memory_stats():
+    traced, peak = tracemalloc.get_traced_memory()
+    return {'traced_kb': round(traced / 1024), 'peak_kb': round(peak / 1024)}
+
+
+def _filtered(snapshot):
+    return snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+        tracemalloc.Filter(False, '<unknown>'),
+    ))
+
+
+def take_memory_snapshot():
+    """Start tracing if needed and keep a snapshot to diff against"""
+    global _memory_baseline
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    snapshot = _filtered(tracemalloc.take_snapshot())
+    _memory_baseline = (snapshot, datetime.now(timezone.utc))
+    return dict(_memory_stats(), taken_at=_memory_baseline[1].isoformat())
+
+
+def memory_diff(limit=20, group_by='lineno'):
+    """Allocation sites that grew most since the last snapshot; None without one"""
+    if _memory_baseline is None or not tracemalloc.is_tracing():
+        return None
+    baseline, taken_at = _memory_baseline
+    current = _filtered(tracemalloc.take_snapshot())
+    sites = []
+    for stat in current.compare_to(baseline, group_by)[:limit]:
+        frame = stat.traceback[0]
+        site = {
+            'site': f'{frame.filename}:{frame.lineno}',
+            'size_diff_kb': round(stat.size_diff / 1024, 1),
+            'count_diff': stat.count_diff,
+            'size_kb': round(stat.size / 1024, 1),
+        }
+        if group_by == 'traceback':
+            site['traceback'] = [f'{f.filename}:{f.lineno}' for f in stat.traceback]
+        sites.append(site)
+    return dict(_memory_stats(), since=taken_at.isoformat(), sites=sites)
+
+
+def stop_memory_tracing():
+    global _memory_baseline
+    _memory_baseline = None
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
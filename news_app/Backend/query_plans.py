@@ -0,0 +1,151 @@
+"""EXPLAIN QUERY PLAN capture for the statements the services run.
+
+With ``QUERY_PLAN_LOG=<path>`` set, the first execution of every distinct
+SELECT/UPDATE/DELETE is explained on the same SQLite connection and
+appended to ``<path>`` as one JSON line: the statement, its plan and the
+service function that issued it. ``flask query-plans`` then lists the
+statements whose plan scans a whole table, sorts/groups through a
+temporary B-tree or builds an automatic index, which is how an indexed
+lookup silently degrades.
+
+Tests use ``capture_query_plans()`` and ``assert_uses_index()`` to pin a
+service call to the index it is expected to use.
+"""
+from .models.db import db
+from contextlib import contextmanager
+from sqlalchemy import event
+import json
+import logging
+import os
+import re
+import sys
+import threading
+
+logger = logging.getLogger(__name__)
+
+QUERY_PLAN_LOG = os.getenv('QUERY_PLAN_LOG', '')
+EXPLAINED_STATEMENTS = ('SELECT', 'UPDATE', 'DELETE', 'WITH')
+_SERVICES_DIR = os.path.join(os.path.dirname(__file__), 'services') + os.sep
+_PACKAGE_DIR = os.path.dirname(os.path.dirname(__file__)) + os.sep
+
+
+def plan_problems(plan):
+    """Plan lines that read a whole table, build a temporary B-tree or an automatic index"""
+    problems = []
+    for line in plan:
+        if line.startswith('SCAN ') and 'USING' not in line and 'CONSTANT ROW' not in line:
+            problems.append(line)
+        elif 'TEMP B-TREE' in line or 'AUTOMATIC' in line:
+            problems.append(line)
+    return problems
+
+
+def _caller():
+    """``module.function`` of the service (or else app code) that issued the statement"""
+    fallback = None
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_SERVICES_DIR):
+            return f'{os.path.basename(filename)[:-3]}.{frame.f_code.co_name}'
+        if fallback is None and filename.startswith(_PACKAGE_DIR) and filename != __file__:
+            fallback = f'{os.path.basename(filename)[:-3]}.{frame.f_code.co_name}'
+        frame = frame.f_back
+    return fallback or 'unknown'
+
+
+class QueryPlanRecorder:
+    """Explains each distinct statement once; optionally appends the plans to a JSON-lines file.
+
+    With ``thread_id`` only statements run on that thread are recorded.
+    """
+
+    def __init__(self, path=None, thread_id=None):
+        self.path = path
+        self.thread_id = thread_id
+        self.plans = {}
+        self.lock = threading.Lock()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self.thread_id is not None and threading.get_ident() != self.thread_id:
+            return
+        if statement in self.plans or not statement.lstrip().upper().startswith(EXPLAINED_STATEMENTS):
+            return
+        params = (parameters[0] if parameters else ()) if executemany else parameters
+        try:
+            rows = cursor.connection.execute('EXPLAIN QUERY PLAN ' + statement, params or ()).fetchall()
+        except Exception as e:
+            logger.warning('Could not explain statement: %s', e)
+            return
+        plan = [row[3] for row in rows]
+        entry = {'statement': ' '.join(statement.split()), 'plan': plan,
+                 'problems': plan_problems(plan), 'caller': _caller()}
+        with self.lock:
+            if statement in self.plans:
+                return
+            self.plans[statement] = entry
+            if self.path:
+                with open(self.path, 'a') as f:
+                    f.write(json.dumps(entry) + '\n')
+
+    def attach(self, engine):
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def detach(self, engine):
+        event.remove(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def format(self):
+        return '\n'.join(format_entry(entry) for entry in self.plans.values())
+
+
+def format_entry(entry):
+    lines = [f"{entry['caller']}: {entry['statement']}"]
+    lines.extend(f'    {line}' for line in entry['plan'])
+    return '\n'.join(lines)
+
+
+def read_plan_log(path):
+    """Entries of a QUERY_PLAN_LOG file, one per distinct statement"""
+    entries = {}
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                entries[entry['statement']] = entry
+    return list(entries.values())
+
+
+@contextmanager
+def capture_query_plans():
+    """Record the plans of the statements this thread runs inside the block (needs an app context)"""
+    # Background workers share the engine; their statements are not the caller's
+    recorder = QueryPlanRecorder(thread_id=threading.get_ident())
+    engine = db.engine
+    recorder.attach(engine)
+    try:
+        yield recorder
+    finally:
+        recorder.detach(engine)
+
+
+def assert_uses_index(index_name, func, *args, **kwargs):
+    """Call ``func`` and fail unless one of its statements is planned with ``index_name``"""
+    with capture_query_plans() as recorder:
+        result = func(*args, **kwargs)
+    pattern = re.compile(rf'INDEX {re.escape(index_name)}\b')
+    if not any(pattern.search(line) for entry in recorder.plans.values() for line in entry['plan']):
+        name = getattr(func, '__name__', repr(func))
+        raise AssertionError(f'{name} did not use index {index_name}; plans:\n{recorder.format()}')
+    return result
+
+
+def init_query_plans(app):
+    """Start recording plans when QUERY_PLAN_LOG is set"""
+    if not QUERY_PLAN_LOG:
+        return None
+    recorder = QueryPlanRecorder(QUERY_PLAN_LOG)
+    with app.app_context():
+        recorder.attach(db.engine)
+    app.extensions['query_plans'] = recorder
+    logger.info('Recording query plans to %s', QUERY_PLAN_LOG)
+    return recorder
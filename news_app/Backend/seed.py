@@ -1,12 +1,15 @@
 from .models.db import db
 from .models.article import Article
 from .models.category import Category
-from .services.category_service import create_category, list_categories
-from .services.article_service import create_article, list_articles
+from .services.category_service import create_category, list_categories, invalidate_category_directory
+from .services.article_service import list_articles, bulk_create_articles
 from .services.media_service import list_media
 from flask import Flask
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 # Define standard categories that should always exist
 STANDARD_CATEGORIES = [
     ('Technology', 'Latest technology news and updates'),
@@ -70,11 +73,11 @@ def should_seed_data():
     
     if database_seeded:
         # Already seeded on first deployment, don't reseed
-        print('[INFO] Production mode: DATABASE_SEEDED=true, skipping seeding')
+        logger.info('Production mode: DATABASE_SEEDED=true, skipping seeding')
         return False
     else:
         # First deployment, allow initial seeding
-        print('[INFO] Production mode: First deployment, seeding initial data')
+        logger.info('Production mode: First deployment, seeding initial data')
         return True
 
 
@@ -98,11 +101,11 @@ def verify_seed_data():
         
         # Database has some data - user may have deleted some items
         # We respect their deletions and don't auto-reseed
-        print(f'[INFO] Database has {len(articles)} articles and {len(categories)} categories (user deletions respected)')
+        logger.info('Database has %s articles and %s categories (user deletions respected)', len(articles), len(categories))
         return True, len(articles), len(categories)
         
     except Exception as e:
-        print(f'[ERROR] Error verifying seed data: {e}')
+        logger.error('Error verifying seed data: %s', e)
         return False, 0, 0
 
 
@@ -121,9 +124,9 @@ def ensure_categories_exist(categories_to_create):
             try:
                 cat = create_category(name, desc)
                 cat_map[name] = cat
-                print(f'[INFO] Created initial category: {name}')
+                logger.info('Created initial category: %s', name)
             except Exception as e:
-                print(f'[ERROR] Failed to create category {name}: {e}')
+                logger.error('Failed to create category %s: %s', name, e)
     
     return cat_map
 
@@ -149,7 +152,7 @@ def seed_data(app=None, force=False):
     with app.app_context():
         # Check if we should seed in this environment
         if not should_seed_data():
-            print('[INFO] Seeding disabled for this environment')
+            logger.info('Seeding disabled for this environment')
             return True
         
         try:
@@ -158,11 +161,12 @@ def seed_data(app=None, force=False):
             existing_articles = list_articles()
             
             if force:
-                print('[INFO] Force seeding - clearing existing data...')
+                logger.info('Force seeding - clearing existing data...')
                 # Delete all existing articles and categories
                 Article.query.delete()
                 Category.query.delete()
                 db.session.commit()
+                invalidate_category_directory()
                 existing_cats = []
                 existing_articles = []
             
@@ -170,11 +174,11 @@ def seed_data(app=None, force=False):
             is_valid, article_count, category_count = verify_seed_data()
             
             if is_valid and existing_cats and existing_articles:
-                print(f'[INFO] Database already properly seeded. Articles: {article_count}, Categories: {category_count}')
+                logger.info('Database already properly seeded. Articles: %s, Categories: %s', article_count, category_count)
                 return True
             
             # If we get here, database is empty and needs initial seeding
-            print('[INFO] Database is empty. Seeding initial data...')
+            logger.info('Database is empty. Seeding initial data...')
             
             # Ensure upload directory exists
             upload_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), '..', 'Frontend', 'static', 'uploads')
@@ -190,35 +194,42 @@ def seed_data(app=None, force=False):
             # Create sample articles (only if none exist)
             current_article_count = Article.query.count()
             if current_article_count == 0:
-                print('[INFO] Creating initial sample articles...')
+                logger.info('Creating initial sample articles...')
                 
+                rows = []
                 for title, content, cat_name, author in STANDARD_ARTICLES:
                     cat = cat_map.get(cat_name)
-                    try:
-                        create_article(title, content, cat.id if cat else None, author)
-                        print(f'[INFO] Created article: {title}')
-                    except Exception as e:
-                        print(f'[ERROR] Failed to create article {title}: {e}')
+                    rows.append({'title': title, 'content': content,
+                                 'category_id': cat.id if cat else None, 'author': author})
+                try:
+                    report = bulk_create_articles(rows)
+                    for result, row in zip(report['results'], rows):
+                        if result['status'] == 'created':
+                            logger.info('Created article: %s', row['title'])
+                        else:
+                            logger.error('Failed to create article %s: %s', row['title'], result['error'])
+                except Exception as e:
+                    logger.error('Failed to create sample articles: %s', e)
             else:
-                print(f'[INFO] Database has {current_article_count} articles (user deletions respected)')
+                logger.info('Database has %s articles (user deletions respected)', current_article_count)
             
             # Commit changes to ensure persistence
             try:
                 db.session.commit()
             except Exception as commit_error:
                 db.session.rollback()
-                print(f'[WARNING] Commit warning: {commit_error}')
+                logger.warning('Commit warning: %s', commit_error)
             
             # Final verification
             final_articles = Article.query.count()
             final_categories = Category.query.count()
             
-            print(f'[SUCCESS] Database initialized! Articles: {final_articles}, Categories: {final_categories}')
+            logger.info('Database initialized! Articles: %s, Categories: %s', final_articles, final_categories)
             
             return True
             
         except Exception as e:
-            print(f'[ERROR] Error seeding database: {e}')
+            logger.error('Error seeding database: %s', e)
             import traceback
             traceback.print_exc()
             return False
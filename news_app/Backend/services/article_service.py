@@ -1,9 +1,22 @@
 from ..models.article import Article
+from ..models.category import Category
 from ..models.db import db
+from ..tracing import traced
+from .category_service import invalidate_category_directory
+from .media_reference_service import index_article, index_articles, drop_references, renumber_article_references
+from .view_service import drop_article_stats, renumber_article_stats, invalidate_trending
+from .related_service import (
+    drop_related, refresh_article, rebuild_related_articles, renumber_related_articles, schedule_related_update
+)
 from datetime import datetime, timezone
-from sqlalchemy import func
+from sqlalchemy import func, insert
+import json
 
+# Rows per executemany() call when bulk importing
+BULK_CHUNK_SIZE = 500
 
+
+@traced()
 def list_articles(page=1, per_page=12):
     """List articles with optional pagination"""
     if page and per_page:
@@ -25,6 +38,7 @@ def list_articles(page=1, per_page=12):
         return Article.query.order_by(Article.created_at.desc()).all()
 
 
+@traced()
 def list_articles_by_category(category_id, page=1, per_page=12):
     """List articles filtered by category ID with optional pagination"""
     if category_id:
@@ -46,63 +60,257 @@ def list_articles_by_category(category_id, page=1, per_page=12):
         return query.order_by(Article.created_at.desc()).all()
 
 
+@traced()
 def count_articles():
     """Get total article count"""
     return Article.query.count()
 
 
+@traced()
 def count_articles_today():
     """Count articles created today"""
-    today = datetime.now().date()
-    return Article.query.filter(func.date(Article.created_at) == today).count()
+    from datetime import timedelta
+    # A range on the column (not date(created_at)) can use ix_articles_created_at
+    start = datetime.combine(datetime.now().date(), datetime.min.time())
+    return Article.query.filter(Article.created_at >= start, Article.created_at < start + timedelta(days=1)).count()
 
 
+@traced()
 def count_articles_this_week():
     """Count articles created this week"""
     from datetime import timedelta
     week_ago = datetime.now() - timedelta(days=7)
     return Article.query.filter(Article.created_at >= week_ago).count()
 
+@traced()
 def get_article(article_id):
     return db.session.get(Article, article_id)
 
 def create_article(title, content, category_id=None, image_url=None, author=None):
     a = Article(title=title, author=author, content=content, category_id=category_id, image_url=image_url)
     db.session.add(a)
+    db.session.flush()
+    index_article(a)
     db.session.commit()
+    invalidate_category_directory()
+    schedule_related_update(refresh_article, a.id)
     return a
 
 def update_article(article_id, title, content, category_id=None, image_url=None, author=None):
     a = get_article(article_id)
     if not a:
         return None
+    category_changed = str(a.category_id or '') != str(category_id or '')
     a.title = title
     a.author = author
     a.content = content
     a.category_id = category_id
     a.image_url = image_url
+    index_article(a)
     db.session.commit()
+    if category_changed:
+        invalidate_category_directory()
+    schedule_related_update(refresh_article, a.id)
     return a
 
 def reorder_article_ids():
-    """Reassign article IDs in ascending order starting from 1 to eliminate gaps"""
+    """Reassign article IDs in ascending order starting from 1 to eliminate gaps.
+
+    Returns ``{old_id: new_id}`` for the articles that moved.
+    """
     articles = Article.query.order_by(Article.id).all()
+    id_changes = []
     for index, article in enumerate(articles, start=1):
+        if article.id != index:
+            id_changes.append((article.id, index))
         article.id = index
+    db.session.flush()
+    renumber_article_references(id_changes)
+    renumber_related_articles(id_changes)
+    renumber_article_stats(id_changes)
     db.session.commit()
+    return dict(id_changes)
 
 def delete_article(article_id):
     a = get_article(article_id)
     if not a:
         return False
+    drop_references(article_ids=[a.id])
+    related_owners = drop_related(a.id)
+    drop_article_stats(a.id)
     db.session.delete(a)
     db.session.commit()
-    reorder_article_ids()
+    invalidate_category_directory()
+    id_map = reorder_article_ids()
+    invalidate_trending()
+    for owner in related_owners:
+        schedule_related_update(refresh_article, id_map.get(owner, owner))
     return True
 
+@traced()
 def get_articles_by_ids(article_ids):
     """Get articles filtered by a list of IDs"""
     if not article_ids:
         return []
     return Article.query.filter(Article.id.in_(article_ids)).order_by(Article.created_at.desc()).all()
 
+
+def iter_article_payload(lines):
+    """Yield article dicts from NDJSON lines or a JSON array.
+
+    ``lines`` is any iterable of str/bytes lines (a file or a request stream).
+    A payload starting with ``[`` is parsed as one JSON array; anything else
+    is treated as NDJSON and parsed line by line so it never sits in memory
+    twice. Unparseable lines are yielded as ``ValueError`` instances so the
+    caller can report them against the right row.
+    """
+    lines = iter(lines)
+    for first in lines:
+        if isinstance(first, bytes):
+            first = first.decode('utf-8')
+        if first.strip():
+            break
+    else:
+        return
+
+    if first.lstrip().startswith('['):
+        rest = ''.join(l.decode('utf-8') if isinstance(l, bytes) else l for l in lines)
+        try:
+            rows = json.loads(first + rest)
+        except ValueError as e:
+            yield ValueError(f'Invalid JSON array: {e}')
+            return
+        for row in rows:
+            yield row
+        return
+
+    for line in _chain_first(first, lines):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield ValueError(f'Invalid JSON: {e}')
+
+
+def _chain_first(first, rest):
+    yield first
+    yield from rest
+
+
+def _category_lookup():
+    """Map category ids and names to ids with a single query"""
+    lookup = {}
+    for cat_id, name in db.session.query(Category.id, Category.name):
+        lookup[cat_id] = cat_id
+        lookup[str(cat_id)] = cat_id
+        lookup[name] = cat_id
+    return lookup
+
+
+def _validate_bulk_row(row, categories):
+    """Return (values, error) for one imported article row"""
+    if isinstance(row, ValueError):
+        return None, str(row)
+    if not isinstance(row, dict):
+        return None, 'Row must be a JSON object'
+    for field in ('title', 'content', 'author', 'image_url'):
+        if row.get(field) is not None and not isinstance(row[field], str):
+            return None, f'{field} must be a string'
+
+    title = (row.get('title') or '').strip()
+    content = row.get('content')
+    if not title:
+        return None, 'title is required'
+    if len(title) > 255:
+        return None, 'title is longer than 255 characters'
+    if not content:
+        return None, 'content is required'
+
+    category_id = None
+    category_ref = row.get('category_id', row.get('category'))
+    if category_ref not in (None, ''):
+        if isinstance(category_ref, bool) or not isinstance(category_ref, (int, str)):
+            return None, 'category must be a category id or name'
+        category_id = categories.get(category_ref)
+        if category_id is None:
+            return None, f'Unknown category: {category_ref}'
+
+    now = datetime.now(timezone.utc)
+    return {
+        'title': title,
+        'author': row.get('author') or None,
+        'content': content,
+        'image_url': row.get('image_url') or None,
+        'category_id': category_id,
+        'created_at': now,
+        'updated_at': now
+    }, None
+
+
+def _insert_chunk(stmt, rows):
+    """executemany one chunk, index its media references and return the new ids in row order"""
+    result = db.session.execute(stmt.returning(Article.__table__.c.id, sort_by_parameter_order=True), rows)
+    ids = result.scalars().all()
+    index_articles((article_id, values['image_url'], values['content'])
+                   for article_id, values in zip(ids, rows))
+    return ids
+
+
+def bulk_create_articles(rows, chunk_size=BULK_CHUNK_SIZE):
+    """Insert many articles in one transaction.
+
+    Categories are resolved with a single lookup (by id or name), valid rows
+    are inserted ``chunk_size`` at a time with executemany, and the whole
+    import is committed once at the end. Invalid rows are skipped and
+    reported; a database error rolls back the entire import.
+
+    Returns a dict with ``created``, ``failed`` and a per-row ``results`` list
+    (rows are only marked ``created``, with their new ``id``, once the import
+    has committed).
+    """
+    categories = _category_lookup()
+    stmt = insert(Article.__table__)
+    results = []
+    pending = []
+    inserted = []  # (result, new id) of every row in the transaction
+
+    def flush():
+        ids = _insert_chunk(stmt, [values for _, values in pending])
+        inserted.extend(zip((result for result, _ in pending), ids))
+        pending.clear()
+
+    try:
+        for index, row in enumerate(rows, start=1):
+            values, error = _validate_bulk_row(row, categories)
+            result = {'row': index}
+            results.append(result)
+            if error:
+                result.update(status='error', error=error)
+                continue
+            pending.append((result, values))
+            if len(pending) >= chunk_size:
+                flush()
+        if pending:
+            flush()
+        db.session.commit()
+        invalidate_category_directory()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    for result, article_id in inserted:
+        result.update(status='created', id=article_id)
+    created = len(inserted)
+    if created:
+        # Cheaper than refreshing each new article against the corpus one by one
+        schedule_related_update(rebuild_related_articles)
+
+    return {
+        'created': created,
+        'failed': len(results) - created,
+        'results': results
+    }
+
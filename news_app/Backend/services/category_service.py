@@ -1,6 +1,97 @@
+from flask import current_app
 from ..models.category import Category
 from ..models.article import Article
 from ..models.db import db
+from ..metrics import record_cache
+from ..tracing import traced
+from collections import Counter, namedtuple
+from sqlalchemy import func
+import re
+import threading
+import time
+
+# Safety net for writes made by other processes (CLI imports, other workers)
+CATEGORY_DIRECTORY_TTL = 300
+
+_directory_lock = threading.Lock()
+
+
+class CategoryEntry(namedtuple('CategoryEntry', 'id name description slug article_count')):
+    """Read-only category snapshot held by the directory (safe to share across requests)
+
+    ``slug`` is None when the name has no usable slug: it slugifies to nothing
+    (e.g. non-Latin names), to digits only (read as an id) or to the same slug
+    as another category. Link such categories by id.
+    """
+    __slots__ = ()
+
+    def to_dict(self):
+        return {'id': self.id, 'name': self.name, 'description': self.description,
+                'slug': self.slug, 'article_count': self.article_count}
+
+
+class CategoryDirectory:
+    """All categories with article counts, plus id/slug/name lookup maps"""
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.by_id = {c.id: c for c in entries}
+        self.by_slug = {c.slug: c for c in entries if c.slug}
+        self.by_name = {c.name.lower(): c for c in entries}
+        self.built_at = time.monotonic()
+
+    def resolve(self, value):
+        """Find a category by id, then slug, then case-insensitive name; None if unknown"""
+        value = (value or '').strip()
+        if not value:
+            return None
+        if value.isdigit() and int(value) in self.by_id:
+            return self.by_id[int(value)]
+        return self.by_slug.get(slugify(value)) or self.by_name.get(value.lower())
+
+
+def slugify(name):
+    return re.sub(r'[^a-z0-9]+', '-', (name or '').lower()).strip('-')
+
+
+def _build_directory():
+    rows = db.session.query(Category.id, Category.name, Category.description, func.count(Article.id))\
+        .outerjoin(Article, Article.category_id == Category.id)\
+        .group_by(Category.id).order_by(Category.id).all()
+    slugs = {cid: slugify(name) for cid, name, _, _ in rows}
+    shared = Counter(slugs.values())
+    return CategoryDirectory([
+        CategoryEntry(cid, name, description, _usable_slug(slugs[cid], shared), count)
+        for cid, name, description, count in rows
+    ])
+
+
+def _usable_slug(slug, shared):
+    if not slug or slug.isdigit() or shared[slug] > 1:
+        return None
+    return slug
+
+
+@traced()
+def get_category_directory():
+    """Process-level category directory, rebuilt with one GROUP BY after a write"""
+    directory = current_app.extensions.get('category_directory')
+    if directory is None or time.monotonic() - directory.built_at > CATEGORY_DIRECTORY_TTL:
+        with _directory_lock:
+            directory = current_app.extensions.get('category_directory')
+            if directory is None or time.monotonic() - directory.built_at > CATEGORY_DIRECTORY_TTL:
+                record_cache('category_directory', False)
+                directory = _build_directory()
+                current_app.extensions['category_directory'] = directory
+                return directory
+    record_cache('category_directory', True)
+    return directory
+
+
+def invalidate_category_directory():
+    """Drop the cached directory; call after committing category or article writes"""
+    current_app.extensions.pop('category_directory', None)
+
 
 def list_categories():
     return Category.query.order_by(Category.id).all()
@@ -12,6 +103,7 @@ def create_category(name, description=None):
     c = Category(name=name, description=description)
     db.session.add(c)
     db.session.commit()
+    invalidate_category_directory()
     return c
 
 def update_category(cat_id, name, description=None):
@@ -21,6 +113,7 @@ def update_category(cat_id, name, description=None):
     c.name = name
     c.description = description
     db.session.commit()
+    invalidate_category_directory()
     return c
 
 def reorder_category_ids():
@@ -44,6 +137,7 @@ def reorder_category_ids():
         category.id = index
     
     db.session.commit()
+    invalidate_category_directory()
 
 def delete_category(cat_id):
     c = get_category(cat_id)
@@ -51,6 +145,7 @@ def delete_category(cat_id):
         return False
     db.session.delete(c)
     db.session.commit()
+    invalidate_category_directory()
     reorder_category_ids()
     return True
 
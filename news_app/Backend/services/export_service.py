@@ -0,0 +1,114 @@
+from ..models.article import Article
+from ..models.category import Category
+from ..models.media import Media
+from ..models.db import db
+from datetime import datetime
+from sqlalchemy import select
+import csv
+import io
+import json
+import zlib
+
+# Rows fetched per keyset query while exporting
+EXPORT_CHUNK_SIZE = 1000
+
+# Encoded bytes buffered before a chunk is handed to the response
+WRITE_BUFFER_SIZE = 64 * 1024
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+
+EXPORT_RESOURCES = {
+    'articles': Article.__table__,
+    'categories': Category.__table__,
+    'media': Media.__table__,
+}
+
+
+def export_columns(resource):
+    """Column names exported for a resource, in table order"""
+    return [c.name for c in EXPORT_RESOURCES[resource].columns]
+
+
+def _serialize(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def iter_export_rows(resource, after_id=0, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield rows of a table as dicts, ordered by id, starting after ``after_id``.
+
+    Rows are read with keyset pagination (``id > last ORDER BY id LIMIT n``),
+    so memory stays constant, no read transaction is held between chunks and
+    an interrupted export can resume from the last id it wrote.
+    """
+    table = EXPORT_RESOURCES[resource]
+    columns = export_columns(resource)
+    last_id = after_id or 0
+    while True:
+        stmt = select(table).where(table.c.id > last_id).order_by(table.c.id).limit(chunk_size)
+        rows = db.session.execute(stmt).all()
+        db.session.commit()
+        if not rows:
+            return
+        for row in rows:
+            yield {name: _serialize(value) for name, value in zip(columns, row)}
+        last_id = rows[-1][0]
+        if len(rows) < chunk_size:
+            return
+
+
+def iter_ndjson(rows):
+    """Encode rows as newline-delimited JSON"""
+    buffer = []
+    size = 0
+    for row in rows:
+        line = json.dumps(row, ensure_ascii=False) + '\n'
+        buffer.append(line)
+        size += len(line)
+        if size >= WRITE_BUFFER_SIZE:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def iter_csv(rows, columns, header=True):
+    """Encode rows as CSV, optionally preceded by a header line"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns)
+    if header:
+        writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= WRITE_BUFFER_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_gzip(chunks, level=6):
+    """Gzip-compress a stream of text chunks incrementally"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def iter_export(resource, fmt='ndjson', after_id=0, compress=False, chunk_size=EXPORT_CHUNK_SIZE):
+    """Stream an export of ``resource`` as encoded chunks (bytes if compressed)"""
+    if resource not in EXPORT_RESOURCES:
+        raise ValueError(f'Unknown resource: {resource}')
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f'Unknown format: {fmt}')
+    rows = iter_export_rows(resource, after_id=after_id, chunk_size=chunk_size)
+    if fmt == 'csv':
+        # A resumed export is appended to an existing file, so skip the header
+        chunks = iter_csv(rows, export_columns(resource), header=not after_id)
+    else:
+        chunks = iter_ndjson(rows)
+    return iter_gzip(chunks) if compress else chunks
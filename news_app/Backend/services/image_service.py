@@ -0,0 +1,195 @@
+from concurrent.futures import ThreadPoolExecutor
+from flask import after_this_request, g, has_request_context, request
+from markupsafe import Markup, escape
+from .media_service import get_upload_folder
+import base64
+import io
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; without it images are served as uploaded
+    Image = None
+
+# Widths (px) of the resized variants generated for each upload
+DERIVATIVE_WIDTHS = (320, 640, 1024, 1600)
+DERIVATIVE_QUALITY = 80
+PLACEHOLDER_WIDTH = 16
+DERIVED_DIRNAME = 'derived'
+UPLOADS_URL_PREFIX = '/static/uploads/'
+
+# Formats Pillow can resize; animated GIFs are left untouched
+RESIZABLE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp', 'bmp'}
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='image-derivatives')
+_manifest_cache = {}
+
+
+def get_derived_folder():
+    return os.path.join(get_upload_folder(), DERIVED_DIRNAME)
+
+
+def _stem(filename):
+    return filename.rsplit('.', 1)[0]
+
+
+def _manifest_path(filename):
+    return os.path.join(get_derived_folder(), _stem(filename) + '.json')
+
+
+def _save_variant(img, path, fmt):
+    # Re-encoding without an exif= argument drops EXIF/GPS metadata
+    if fmt == 'JPEG':
+        img.convert('RGB').save(path, 'JPEG', quality=DERIVATIVE_QUALITY, optimize=True, progressive=True)
+    else:
+        img.save(path, 'WEBP', quality=DERIVATIVE_QUALITY, method=4)
+
+
+def _placeholder_data_uri(img):
+    height = max(1, round(img.height * PLACEHOLDER_WIDTH / img.width))
+    tiny = img.resize((PLACEHOLDER_WIDTH, height), Image.LANCZOS)
+    buf = io.BytesIO()
+    tiny.save(buf, 'WEBP', quality=30)
+    return 'data:image/webp;base64,' + base64.b64encode(buf.getvalue()).decode('ascii')
+
+
+def build_derivatives(file_path):
+    """Write resized WebP/JPEG variants and a placeholder for one upload.
+
+    Variants go to ``uploads/derived/<stem>-<width>.<ext>`` and are described
+    by ``uploads/derived/<stem>.json``, which the template helper reads.
+    Returns the manifest dict, or None if the file cannot be processed.
+    """
+    filename = os.path.basename(file_path)
+    ext = filename.rsplit('.', 1)[-1].lower()
+    if Image is None or ext not in RESIZABLE_EXTENSIONS or not os.path.exists(file_path):
+        return None
+
+    derived_folder = get_derived_folder()
+    stem = _stem(filename)
+
+    with Image.open(file_path) as source:
+        os.makedirs(derived_folder, exist_ok=True)
+        img = ImageOps.exif_transpose(source)
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA' if 'transparency' in img.info else 'RGB')
+
+        manifest = {'width': img.width, 'height': img.height, 'webp': [], 'jpeg': []}
+        widths = [w for w in DERIVATIVE_WIDTHS if w < img.width] or [img.width]
+        for width in widths:
+            height = max(1, round(img.height * width / img.width))
+            resized = img if width == img.width else img.resize((width, height), Image.LANCZOS)
+            for fmt, key in (('WEBP', 'webp'), ('JPEG', 'jpeg')):
+                variant = f'{stem}-{width}.{"jpg" if key == "jpeg" else key}'
+                _save_variant(resized, os.path.join(derived_folder, variant), fmt)
+                manifest[key].append([width, variant])
+        manifest['placeholder'] = _placeholder_data_uri(img)
+
+    tmp_path = _manifest_path(filename) + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, _manifest_path(filename))
+    return manifest
+
+
+def _build_derivatives_safely(file_path):
+    try:
+        build_derivatives(file_path)
+    except Exception as e:
+        logger.error('Failed to build image derivatives for %s: %s', file_path, e)
+
+
+def schedule_derivatives(file_path):
+    """Build derivatives in the background worker pool"""
+    if Image is None:
+        return None
+    return _executor.submit(_build_derivatives_safely, file_path)
+
+
+def remove_derivatives(filename):
+    """Delete the variants and manifest of an upload"""
+    manifest_path = _manifest_path(filename)
+    _manifest_cache.pop(filename, None)
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return
+    for key in ('webp', 'jpeg'):
+        for _, variant in manifest.get(key, []):
+            try:
+                os.remove(os.path.join(get_derived_folder(), variant))
+            except OSError:
+                pass
+    try:
+        os.remove(manifest_path)
+    except OSError:
+        pass
+
+
+def get_derivatives(filename):
+    """Return the manifest for an upload, cached until the file changes"""
+    path = _manifest_path(filename)
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return None
+    cached = _manifest_cache.get(filename)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    _manifest_cache[filename] = (mtime, manifest)
+    return manifest
+
+
+def _vary_on_accept(response):
+    response.vary.add('Accept')
+    return response
+
+
+def image_attrs(url, sizes='100vw', eager=False):
+    """Template helper: ``<img {{ image_attrs(url, sizes) }}>``.
+
+    Emits ``src``, and for uploads with derivatives a ``srcset``/``sizes``
+    pair (WebP when the browser advertises it, JPEG otherwise; the page is
+    then sent with ``Vary: Accept`` so caches keep the two apart) and a
+    blurred placeholder background. Images are lazy-loaded unless ``eager``
+    is set (use it for above-the-fold heroes).
+    """
+    attrs = [f'src="{escape(url)}"']
+    if eager:
+        attrs.append('fetchpriority="high"')
+    else:
+        attrs.append('loading="lazy"')
+    attrs.append('decoding="async"')
+
+    manifest = None
+    if url and UPLOADS_URL_PREFIX in url:
+        filename = url.split(UPLOADS_URL_PREFIX, 1)[1].split('?', 1)[0]
+        if filename and '/' not in filename:
+            manifest = get_derivatives(filename)
+
+    if manifest:
+        fmt = 'jpeg'
+        # Match image/webp literally; a */* wildcard says nothing about support
+        if has_request_context():
+            if any(v == 'image/webp' for v, _ in request.accept_mimetypes):
+                fmt = 'webp'
+            if not g.get('_vary_accept'):
+                g._vary_accept = True
+                after_this_request(_vary_on_accept)
+        base = UPLOADS_URL_PREFIX + DERIVED_DIRNAME + '/'
+        srcset = ', '.join(f'{base}{variant} {width}w' for width, variant in manifest[fmt])
+        attrs.append(f'srcset="{escape(srcset)}"')
+        attrs.append(f'sizes="{escape(sizes)}"')
+        if manifest.get('placeholder'):
+            attrs.append(f'style="background-size:cover;background-image:url({manifest["placeholder"]})"')
+    return Markup(' '.join(attrs))
@@ -0,0 +1,168 @@
+"""Reconciliation of the uploads folder with the ``media`` table.
+
+``collect_garbage()`` runs four incremental passes, each touching at most
+``batch_size`` names or rows per query:
+
+* expired resumable-upload sessions (``uploads/.partial``)
+* leftovers of crashed requests: ``.upload-*.part`` temp files and
+  ``.trash-*`` files whose background delete never ran
+* upload files no media row references, and derivatives whose source
+  upload is gone
+* media rows whose file is missing (reported, deleted with ``prune_rows``)
+
+Files younger than ``min_age_seconds`` are never touched, so uploads that
+are still being written or waiting for their row are safe. Orphans are
+deleted, or moved to ``uploads/.quarantine`` with ``quarantine=True``
+(under a unique name, as an upload and a derivative can share a basename
+and the same name can be orphaned again later).
+"""
+from ..models.db import db
+from ..models.media import Media
+from .image_service import get_derived_folder, DERIVED_DIRNAME
+from .media_reference_service import drop_references
+from .media_service import get_upload_folder, UPLOAD_TMP_PREFIX, TRASH_PREFIX
+from .upload_service import expire_stale_uploads
+import logging
+import os
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+GC_BATCH_SIZE = 500
+# Grace period before an unreferenced file counts as an orphan
+GC_MIN_AGE = 3600
+# Resumable upload sessions idle for longer than this are discarded
+UPLOAD_SESSION_MAX_AGE = 24 * 3600
+QUARANTINE_DIRNAME = '.quarantine'
+
+
+class _Sweep:
+    """Applies the chosen action to orphan files and tallies the result"""
+
+    def __init__(self, quarantine, dry_run):
+        self.quarantine = quarantine
+        self.dry_run = dry_run
+        self.files = 0
+        self.bytes = 0
+        self.quarantined_bytes = 0
+
+    def remove(self, path, keep_copy=True):
+        keep = self.quarantine and keep_copy
+        try:
+            size = os.path.getsize(path)
+            if not self.dry_run:
+                if keep:
+                    quarantine_folder = os.path.join(get_upload_folder(), QUARANTINE_DIRNAME)
+                    os.makedirs(quarantine_folder, exist_ok=True)
+                    stem, ext = os.path.splitext(os.path.basename(path))
+                    os.replace(path, os.path.join(quarantine_folder, f'{stem}-{uuid.uuid4().hex[:8]}{ext}'))
+                else:
+                    os.remove(path)
+        except OSError as e:
+            logger.error('Could not remove %s: %s', path, e)
+            return
+        self.files += 1
+        if keep:
+            self.quarantined_bytes += size
+        else:
+            self.bytes += size
+
+
+def _old_files(folder, cutoff):
+    """``(name, path)`` of regular files in ``folder`` last modified before ``cutoff``"""
+    if not os.path.isdir(folder):
+        return
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.is_file(follow_symlinks=False) and entry.stat().st_mtime < cutoff:
+                yield entry.name, entry.path
+
+
+def _referenced(filenames):
+    """The subset of ``filenames`` that media rows point to"""
+    rows = db.session.query(Media.filename).filter(Media.filename.in_(filenames)).all()
+    return {filename for filename, in rows}
+
+
+def sweep_orphan_files(sweep, cutoff, batch_size=GC_BATCH_SIZE):
+    """Remove crash leftovers and uploads without a media row"""
+    batch = []
+
+    def flush():
+        referenced = _referenced([name for name, _ in batch])
+        for name, path in batch:
+            if name not in referenced:
+                sweep.remove(path)
+        batch.clear()
+
+    for name, path in _old_files(get_upload_folder(), cutoff):
+        if name.startswith((UPLOAD_TMP_PREFIX, TRASH_PREFIX)):
+            # Never a valid upload: a crashed request or a lost background delete
+            sweep.remove(path, keep_copy=False)
+        elif not name.startswith('.'):
+            batch.append((name, path))
+            if len(batch) >= batch_size:
+                flush()
+    if batch:
+        flush()
+
+
+def sweep_orphan_derivatives(sweep, cutoff):
+    """Remove derivative sets whose source upload no longer exists"""
+    upload_folder = get_upload_folder()
+    if not os.path.isdir(upload_folder):
+        return
+    with os.scandir(upload_folder) as entries:
+        stems = {entry.name.rsplit('.', 1)[0] for entry in entries
+                 if not entry.name.startswith('.') and entry.name != DERIVED_DIRNAME}
+    for name, path in _old_files(get_derived_folder(), cutoff):
+        # "<stem>.json" manifests and "<stem>-<width>.<ext>" variants
+        stem = name[:-len('.json')] if name.endswith('.json') else name.rsplit('-', 1)[0]
+        if stem not in stems:
+            sweep.remove(path, keep_copy=False)
+
+
+def sweep_missing_files(prune_rows=False, dry_run=False, batch_size=GC_BATCH_SIZE):
+    """Find media rows whose file is gone, in id order; returns their ids"""
+    upload_folder = get_upload_folder()
+    missing_ids = []
+    last_id = 0
+    while True:
+        rows = db.session.query(Media.id, Media.filename).filter(Media.id > last_id)\
+            .order_by(Media.id).limit(batch_size).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        missing = [media_id for media_id, filename in rows
+                   if not os.path.exists(os.path.join(upload_folder, filename))]
+        if missing and prune_rows and not dry_run:
+            drop_references(media_ids=missing)
+            Media.query.filter(Media.id.in_(missing)).delete(synchronize_session=False)
+            db.session.commit()
+        missing_ids.extend(missing)
+    return missing_ids
+
+
+def collect_garbage(quarantine=False, prune_rows=False, dry_run=False,
+                    min_age_seconds=GC_MIN_AGE, batch_size=GC_BATCH_SIZE,
+                    upload_max_age_seconds=UPLOAD_SESSION_MAX_AGE):
+    """Reconcile uploads and media rows; returns a report of what was reclaimed"""
+    cutoff = time.time() - min_age_seconds
+    sweep = _Sweep(quarantine, dry_run)
+
+    stale_upload_bytes = 0 if dry_run else expire_stale_uploads(upload_max_age_seconds)
+    sweep_orphan_files(sweep, cutoff, batch_size)
+    sweep_orphan_derivatives(sweep, cutoff)
+    missing_ids = sweep_missing_files(prune_rows, dry_run, batch_size)
+
+    return {
+        'orphan_files': sweep.files,
+        'reclaimed_bytes': sweep.bytes + stale_upload_bytes,
+        'stale_upload_bytes': stale_upload_bytes,
+        'quarantined_bytes': sweep.quarantined_bytes,
+        'missing_files': len(missing_ids),
+        'missing_media_ids': missing_ids,
+        'rows_pruned': len(missing_ids) if prune_rows and not dry_run else 0,
+        'dry_run': dry_run
+    }
@@ -0,0 +1,108 @@
+"""Reverse index from media items to the articles that use them.
+
+Articles point at uploads through free-text ``image_url`` and ``content``
+fields. The ``media_references`` table records each (media, article) pair
+when an article is written, so "is this file used, and where" is an
+indexed lookup instead of a scan over every article.
+"""
+from ..models.article import Article
+from ..models.db import db
+from ..models.media import Media
+from ..models.media_reference import MediaReference
+from sqlalchemy import bindparam, delete, func, insert, update
+import re
+
+# Upload URLs, relative or absolute; paths into subfolders (derived/...) never match
+_UPLOAD_URL_RE = re.compile(r'/static/uploads/([A-Za-z0-9_.-]+)(?![A-Za-z0-9_./-])')
+
+REINDEX_BATCH_SIZE = 500
+
+
+def extract_upload_filenames(*texts):
+    """Filenames of every upload referenced in the given strings"""
+    filenames = set()
+    for text in texts:
+        if text:
+            filenames.update(_UPLOAD_URL_RE.findall(text))
+    return filenames
+
+
+def index_articles(articles):
+    """Replace the references of ``articles``: iterable of ``(article_id, image_url, content)``.
+
+    Does not commit; callers do so as part of their own transaction.
+    """
+    filenames_by_article = {
+        article_id: extract_upload_filenames(image_url, content)
+        for article_id, image_url, content in articles
+    }
+    if not filenames_by_article:
+        return
+    db.session.execute(delete(MediaReference).where(MediaReference.article_id.in_(filenames_by_article)))
+
+    wanted = set().union(*filenames_by_article.values())
+    if not wanted:
+        return
+    media_ids = dict(db.session.query(Media.filename, Media.id).filter(Media.filename.in_(wanted)).all())
+    rows = [
+        {'media_id': media_ids[filename], 'article_id': article_id}
+        for article_id, filenames in filenames_by_article.items()
+        for filename in filenames if filename in media_ids
+    ]
+    if rows:
+        db.session.execute(insert(MediaReference), rows)
+
+
+def index_article(article):
+    """Refresh the references of one (flushed) article"""
+    index_articles([(article.id, article.image_url, article.content)])
+
+
+def drop_references(media_ids=(), article_ids=()):
+    """Remove the references of deleted media items or articles (no commit)"""
+    if media_ids:
+        db.session.execute(delete(MediaReference).where(MediaReference.media_id.in_(media_ids)))
+    if article_ids:
+        db.session.execute(delete(MediaReference).where(MediaReference.article_id.in_(article_ids)))
+
+
+def renumber_article_references(id_changes):
+    """Follow article id changes ``[(old_id, new_id), ...]`` (applied in order)"""
+    if id_changes:
+        table = MediaReference.__table__
+        db.session.execute(
+            update(table).where(table.c.article_id == bindparam('old_id')).values(article_id=bindparam('new_id')),
+            [{'old_id': old_id, 'new_id': new_id} for old_id, new_id in id_changes]
+        )
+
+
+def rebuild_media_references(batch_size=REINDEX_BATCH_SIZE):
+    """Re-index every article in id order; returns the number of references"""
+    db.session.execute(delete(MediaReference))
+    last_id = 0
+    while True:
+        rows = db.session.query(Article.id, Article.image_url, Article.content)\
+            .filter(Article.id > last_id).order_by(Article.id).limit(batch_size).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        index_articles(rows)
+    db.session.commit()
+    return db.session.query(func.count()).select_from(MediaReference).scalar()
+
+
+def get_media_articles(media_id):
+    """Articles that use a media item, newest first"""
+    return Article.query.join(MediaReference, MediaReference.article_id == Article.id)\
+        .filter(MediaReference.media_id == media_id)\
+        .order_by(Article.created_at.desc()).all()
+
+
+def count_media_usages(media_ids):
+    """``{media_id: article count}`` for the given ids (missing ids are unused)"""
+    if not media_ids:
+        return {}
+    rows = db.session.query(MediaReference.media_id, func.count())\
+        .filter(MediaReference.media_id.in_(media_ids))\
+        .group_by(MediaReference.media_id).all()
+    return dict(rows)
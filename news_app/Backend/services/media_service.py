@@ -1,6 +1,83 @@
-from ..models.media import Media
+from flask import current_app
+from ..models.media import Media, format_file_size
 from ..models.db import db
+from .media_reference_service import drop_references
+from sqlalchemy import func, tuple_
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import logging
 import os
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Bytes read from the upload stream per hashing/write step
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Media library page sizes
+MEDIA_PAGE_SIZE = 50
+MEDIA_PAGE_SIZE_MAX = 200
+
+# In-progress single-request uploads are written to "<UPLOAD_TMP_PREFIX><uuid>.part"
+UPLOAD_TMP_PREFIX = '.upload-'
+
+# Deleted uploads are renamed to "<TRASH_PREFIX><uuid>-<filename>" before unlinking
+TRASH_PREFIX = '.trash-'
+
+class UploadTooLargeError(ValueError):
+    """Raised by ``store_upload`` once a stream goes past ``max_size`` bytes"""
+
+
+_delete_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='media-delete')
+
+
+def get_upload_folder():
+    """Absolute path of the uploads directory (on the Render disk when mounted)"""
+    if os.getenv('DISK_MOUNT_PATH'):
+        return os.path.join(os.getenv('DISK_MOUNT_PATH'), 'news_app', 'Frontend', 'static', 'uploads')
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'Frontend', 'static', 'uploads')
+
+
+def store_upload(stream, file_ext, max_size=None):
+    """Stream an upload to disk under its SHA-256 name, hashing as it is written.
+
+    The bytes are written once to a temporary file in the uploads folder and
+    renamed to ``<sha256>.<ext>`` afterwards, so identical content always maps
+    to the same file. Reading stops with ``UploadTooLargeError`` as soon as
+    the stream goes past ``max_size``, whatever the request declared.
+    Returns ``(sha256, filename, file_path, file_size)``.
+    """
+    upload_folder = get_upload_folder()
+    os.makedirs(upload_folder, exist_ok=True)
+
+    digest = hashlib.sha256()
+    size = 0
+    tmp_path = os.path.join(upload_folder, f'{UPLOAD_TMP_PREFIX}{uuid.uuid4().hex}.part')
+    try:
+        with open(tmp_path, 'wb') as out:
+            while True:
+                chunk = stream.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+                if max_size is not None and size > max_size:
+                    raise UploadTooLargeError(f'Upload is larger than the {max_size} byte limit')
+        sha256 = digest.hexdigest()
+        filename = f'{sha256}.{file_ext}'
+        file_path = os.path.join(upload_folder, filename)
+        if os.path.exists(file_path):
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return sha256, filename, file_path, size
 
 
 def list_media():
@@ -8,50 +85,210 @@ def list_media():
     return Media.query.order_by(Media.uploaded_at.desc()).all()
 
 
+def _media_order(file_type, since, until, name_prefix):
+    """``(column, descending)`` a filtered page is sorted by, ties broken by id.
+
+    Sorting by the column of the filter lets SQLite walk that filter's index
+    in order; ordering a range match by id would sort every matching row.
+    """
+    if since or until:
+        return Media.uploaded_at, True
+    if name_prefix:
+        return Media.original_name, False
+    if file_type:
+        return Media.file_type, True
+    return None, True
+
+
+def _encode_cursor(column, item):
+    if column is None:
+        return item.id
+    value = getattr(item, column.key)
+    return f'{value.isoformat() if isinstance(value, datetime) else value}|{item.id}'
+
+
+def _decode_cursor(column, cursor):
+    """``(value, id)`` after which the page starts; None for a missing or malformed cursor"""
+    value, _, last_id = str(cursor or '').rpartition('|')
+    if not last_id.isdigit() or (column is None) != (value == ''):
+        return None
+    if column is not None and column.key == 'uploaded_at':
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return value, int(last_id)
+
+
+def list_media_page(cursor=None, limit=MEDIA_PAGE_SIZE, file_type=None, since=None, until=None, name_prefix=None):
+    """One page of the media library.
+
+    Uses keyset pagination (``cursor`` is the ``next_cursor`` of the previous
+    page), so deep pages cost the same as the first. Filters:
+    ``file_type`` (exact MIME type, or a prefix ending in ``/`` such as
+    ``image/``), ``since``/``until`` upload datetimes and ``name_prefix``
+    on the original filename, each backed by an index. Unfiltered pages are
+    newest first and their cursor is an id. Filtered pages follow the index
+    of one filtered column, so their order depends on the filter: newest
+    upload first for ``since``/``until``, else filename A-Z for
+    ``name_prefix``, else MIME type Z-A for ``file_type``. Their cursors are
+    ``"<value>|<id>"`` strings. Pass the same filters with the cursor.
+    Returns ``{'items': [...], 'next_cursor': cursor or None}``.
+    """
+    limit = max(1, min(limit or MEDIA_PAGE_SIZE, MEDIA_PAGE_SIZE_MAX))
+    column, descending = _media_order(file_type, since, until, name_prefix)
+    query = Media.query
+    position = _decode_cursor(column, cursor)
+    if position is not None:
+        value, last_id = position
+        if column is None:
+            query = query.filter(Media.id < last_id)
+        else:
+            # Row-value comparison, which SQLite seeks in the (column, rowid) index
+            after = tuple_(column, Media.id) < tuple_(value, last_id) if descending \
+                else tuple_(column, Media.id) > tuple_(value, last_id)
+            query = query.filter(after)
+    if file_type:
+        if file_type.endswith('/'):
+            query = query.filter(Media.file_type >= file_type, Media.file_type < file_type[:-1] + '0')
+        else:
+            query = query.filter(Media.file_type == file_type)
+    if since:
+        query = query.filter(Media.uploaded_at >= since)
+    if until:
+        query = query.filter(Media.uploaded_at < until)
+    if name_prefix:
+        # Range scan instead of LIKE so SQLite can use the original_name index
+        query = query.filter(Media.original_name >= name_prefix, Media.original_name < name_prefix + '\U0010ffff')
+    order = [Media.id.desc() if descending else Media.id.asc()]
+    if column is not None:
+        order.insert(0, column.desc() if descending else column.asc())
+    items = query.order_by(*order).limit(limit + 1).all()
+    next_cursor = _encode_cursor(column, items[limit - 1]) if len(items) > limit else None
+    return {'items': items[:limit], 'next_cursor': next_cursor}
+
+
+def media_usage_totals():
+    """Count and disk usage of the library, overall and per file type, in one query"""
+    rows = db.session.query(
+        Media.file_type, func.count(Media.id), func.coalesce(func.sum(Media.file_size), 0)
+    ).group_by(Media.file_type).all()
+    by_type = {
+        file_type: {'count': count, 'bytes': total, 'formatted': format_file_size(total)}
+        for file_type, count, total in rows
+    }
+    total_bytes = sum(t['bytes'] for t in by_type.values())
+    return {
+        'count': sum(t['count'] for t in by_type.values()),
+        'bytes': total_bytes,
+        'formatted': format_file_size(total_bytes),
+        'by_type': by_type
+    }
+
+
 def get_media(media_id):
     """Get a single media file by ID"""
     return Media.query.get(media_id)
 
 
-def create_media(filename, original_name, file_type, file_size, file_path):
+def create_media(filename, original_name, file_type, file_size, file_path, sha256=None):
     """Create a new media record"""
     media = Media(
         filename=filename,
         original_name=original_name,
         file_type=file_type,
         file_size=file_size,
-        file_path=file_path
+        file_path=file_path,
+        sha256=sha256
     )
     db.session.add(media)
     db.session.commit()
     return media
 
 
+def get_media_by_hash(sha256):
+    """Get media by content hash (uses the unique sha256 index)"""
+    return Media.query.filter_by(sha256=sha256).first()
+
+
+def create_or_get_media(filename, original_name, file_type, file_size, file_path, sha256):
+    """Return ``(media, created)``, reusing the existing record for known content"""
+    existing = get_media_by_hash(sha256)
+    if not existing:
+        try:
+            return create_media(filename, original_name, file_type, file_size, file_path, sha256), True
+        except IntegrityError:
+            # A concurrent upload of the same content won the race
+            db.session.rollback()
+            existing = get_media_by_hash(sha256)
+    # Same bytes under another extension: keep only the stored copy
+    if existing.filename != filename and os.path.exists(file_path):
+        os.remove(file_path)
+    return existing, False
+
+
 def delete_media(media_id):
-    """Delete a media file and its database record"""
+    """Delete a media record; its files are removed in the background.
+
+    The upload is first renamed out of the served folder (a cheap atomic
+    rename) while the row still exists, so a re-upload of the same content
+    from then on writes a fresh file rather than reusing the one being
+    deleted. Then the row goes, and a worker thread unlinks the trashed file
+    and the derivatives (unless the content was uploaded again meanwhile).
+    Anything left behind by a crash is collected by ``flask gc-media``.
+    """
     media = get_media(media_id)
     if not media:
         return False
-    
-    # Delete the physical file
+    filename = media.filename
+
+    trash_path = None
+    file_path = os.path.join(get_upload_folder(), filename)
     try:
-        file_path = media.file_path
-        # If on Render, check the DISK_MOUNT_PATH
-        if os.getenv('DISK_MOUNT_PATH') and not os.path.isabs(file_path):
-            # file_path might be relative, reconstruct with mount path
-            file_path = os.path.join(os.getenv('DISK_MOUNT_PATH'), 'news_app', 'Frontend', 'static', 'uploads', media.filename)
-        
         if os.path.exists(file_path):
-            os.remove(file_path)
-    except OSError:
-        pass  # File might already be deleted
-    
-    # Delete the database record
-    db.session.delete(media)
-    db.session.commit()
+            trash_path = move_to_trash(file_path)
+    except OSError as e:
+        logger.error('Could not remove %s: %s', filename, e)
+
+    try:
+        drop_references(media_ids=[media.id])
+        db.session.delete(media)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        if trash_path and not os.path.exists(file_path):
+            os.replace(trash_path, file_path)
+        raise
+    schedule_file_removal(current_app._get_current_object(), trash_path, filename)
     return True
 
 
+def move_to_trash(path):
+    """Rename a file to a hidden trash name next to it and return the new path"""
+    trash_path = os.path.join(os.path.dirname(path), f'{TRASH_PREFIX}{uuid.uuid4().hex}-{os.path.basename(path)}')
+    os.replace(path, trash_path)
+    return trash_path
+
+
+def _remove_files(app, trash_path, filename):
+    from .image_service import remove_derivatives
+    try:
+        if trash_path:
+            os.remove(trash_path)
+        with app.app_context():
+            # Derivatives are named after the content, which may be back by now
+            reuploaded = get_media_by_filename(filename) is not None
+        if not reuploaded:
+            remove_derivatives(filename)
+    except OSError as e:
+        logger.error('Could not remove files of %s: %s', filename, e)
+
+
+def schedule_file_removal(app, trash_path, filename):
+    """Unlink a trashed upload and its derivatives off the request thread"""
+    return _delete_executor.submit(_remove_files, app, trash_path, filename)
+
+
 def get_media_by_filename(filename):
     """Get media by filename"""
     return Media.query.filter_by(filename=filename).first()
@@ -1,9 +1,58 @@
+from ..circuit_breaker import CircuitBreaker, CircuitOpenError
+from ..instrumentation import timed_phase
+from ..metrics import observe_newsapi
+from ..tracing import KIND_CLIENT, span, traced
 import requests
 import os
+import time
 from datetime import datetime, timedelta
 
 API_KEY = os.getenv('NEWS_API_KEY', '7ee335fefcc3490982cb790ed9f85c8a')
 BASE_URL = 'https://newsapi.org/v2'
+# (connect, read) seconds; a single sync worker is blocked for as long as a call waits
+REQUEST_TIMEOUT = (3.05, float(os.getenv('NEWSAPI_TIMEOUT', '5')))
+
+# Consecutive failures (errors, timeouts, 429 and 5xx) that open the circuit,
+# and the seconds it stays open before a probe call is let through
+newsapi_breaker = CircuitBreaker(
+    'newsapi',
+    failure_threshold=int(os.getenv('NEWSAPI_BREAKER_FAILURES', '5')),
+    reset_timeout=float(os.getenv('NEWSAPI_BREAKER_RESET', '30')),
+)
+
+
+def _is_upstream_failure(status):
+    return status == 429 or status >= 500
+
+
+def _get(endpoint, params):
+    """GET a NewsAPI endpoint through the circuit breaker, recording its latency and outcome"""
+    newsapi_breaker.before_call()
+    start = time.perf_counter()
+    status = 'error'
+    url = f'{BASE_URL}/{endpoint}'
+    try:
+        with timed_phase('newsapi'), span(f'GET newsapi /{endpoint}', KIND_CLIENT, **{'http.url': url}) as client_span:
+            r = requests.get(url, params=params, timeout=REQUEST_TIMEOUT)
+            if client_span is not None:
+                client_span.set_attribute('http.status_code', r.status_code)
+        status = r.status_code
+        return r
+    finally:
+        observe_newsapi(endpoint, status, time.perf_counter() - start)
+        if status == 'error' or _is_upstream_failure(status):
+            newsapi_breaker.record_failure()
+        else:
+            newsapi_breaker.record_success()
+
+
+def _error(e, key='articles'):
+    """Error payload for a failed call; open circuits say when to retry"""
+    data = {'status': 'error', 'message': str(e), key: []}
+    if isinstance(e, CircuitOpenError):
+        data['retry_after'] = round(e.retry_after)
+    return data
+
 
 def _transform_article(article):
     """Transform NewsAPI article to standard format"""
@@ -18,6 +67,7 @@ def _transform_article(article):
         'content': article.get('content', '')
     }
 
+@traced()
 def top_headlines(country='us', category=None, page=1, page_size=10):
     """Fetch top headlines from NewsAPI"""
     params = {
@@ -31,7 +81,7 @@ def top_headlines(country='us', category=None, page=1, page_size=10):
         params['category'] = category
     
     try:
-        r = requests.get(f'{BASE_URL}/top-headlines', params=params, timeout=10)
+        r = _get('top-headlines', params)
         r.raise_for_status()
         data = r.json()
         
@@ -43,8 +93,9 @@ def top_headlines(country='us', category=None, page=1, page_size=10):
             }
         return {'status': 'error', 'message': data.get('message', 'Unknown error'), 'articles': []}
     except requests.exceptions.RequestException as e:
-        return {'status': 'error', 'message': str(e), 'articles': []}
+        return _error(e)
 
+@traced()
 def search_news(query, from_date=None, to_date=None, sort_by='publishedAt', page=1, page_size=10):
     """Search for news articles by keyword"""
     params = {
@@ -61,7 +112,7 @@ def search_news(query, from_date=None, to_date=None, sort_by='publishedAt', page
         params['to'] = to_date
     
     try:
-        r = requests.get(f'{BASE_URL}/everything', params=params, timeout=10)
+        r = _get('everything', params)
         r.raise_for_status()
         data = r.json()
         
@@ -73,14 +124,15 @@ def search_news(query, from_date=None, to_date=None, sort_by='publishedAt', page
             }
         return {'status': 'error', 'message': data.get('message', 'Unknown error'), 'articles': []}
     except requests.exceptions.RequestException as e:
-        return {'status': 'error', 'message': str(e), 'articles': []}
+        return _error(e)
 
+@traced()
 def get_sources():
     """Get available news sources"""
     params = {'apiKey': API_KEY}
     
     try:
-        r = requests.get(f'{BASE_URL}/sources', params=params, timeout=10)
+        r = _get('sources', params)
         r.raise_for_status()
         data = r.json()
         
@@ -91,5 +143,5 @@ def get_sources():
             }
         return {'status': 'error', 'message': data.get('message', 'Unknown error'), 'sources': []}
     except requests.exceptions.RequestException as e:
-        return {'status': 'error', 'message': str(e), 'sources': []}
+        return _error(e, 'sources')
 
@@ -0,0 +1,280 @@
+"""Related articles from precomputed TF-IDF neighbours.
+
+Each article's title and content are tokenised into a sparse term vector
+held in an in-memory inverted index (term -> article ids). Cosine
+similarity only visits articles that share a term with the query, so
+refreshing one article's neighbours costs its postings, not a pass over
+every document pair.
+
+Writes are handled on a single background thread: the article's vector is
+replaced, its top-k neighbours are rewritten in ``related_articles`` and
+it is offered to the lists of its closest matches. Deletes remove their
+rows in the request and refresh the lists that lost an entry. Article
+pages read the stored rows with one indexed query. ``flask rebuild-related`` recomputes
+everything, which also corrects the small drift from IDF weights shifting
+as the corpus grows.
+"""
+from flask import current_app
+from ..models.article import Article
+from ..models.db import db
+from ..models.related_article import RelatedArticle
+from ..metrics import record_cache
+from ..tracing import traced
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import bindparam, delete, insert, update
+import heapq
+import logging
+import math
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+RELATED_TOP_K = 5
+# Pairs scoring below this are not worth recommending
+RELATED_MIN_SCORE = 0.05
+# Title words count this many times as often as body words
+TITLE_WEIGHT = 3
+# Rebuild the in-memory index from the database after this long, to pick
+# up writes made by other processes
+INDEX_MAX_AGE = 600
+REBUILD_BATCH_SIZE = 500
+# Terms found in more than this share of articles say little about
+# similarity but have postings as long as the corpus; neighbour search skips
+# them once the corpus is large enough for the share to be meaningful
+MAX_TERM_SHARE = 0.1
+MIN_DOCS_FOR_TERM_PRUNING = 200
+
+_TAG_RE = re.compile(r'<[^>]+>')
+_TOKEN_RE = re.compile(r'[a-z0-9]{3,}')
+_STOPWORDS = frozenset('''
+    the and for are but not you all any can had her was one our out has him his how its may new now
+    see two who did get let put say she too use that with this from they will would there their what
+    about which when your have more been were into than them then also some could other these only
+    over such after most very just where those while being because does should each
+'''.split())
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='related-articles')
+
+
+def tokenize(title, content):
+    """Term counts for an article; title terms are boosted"""
+    counts = Counter()
+    for text, weight in ((title, TITLE_WEIGHT), (content, 1)):
+        for token in _TOKEN_RE.findall(_TAG_RE.sub(' ', text or '').lower()):
+            if token not in _STOPWORDS:
+                counts[token] += weight
+    return counts
+
+
+class TfidfIndex:
+    """Sparse TF-IDF vectors with an inverted index for cosine neighbour search"""
+
+    def __init__(self):
+        self.docs = {}
+        self.postings = defaultdict(set)
+        self._vectors = {}
+        self._norms = {}
+        self.built_at = time.monotonic()
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add(self, doc_id, counts):
+        self.remove(doc_id)
+        self.docs[doc_id] = counts
+        for term in counts:
+            self.postings[term].add(doc_id)
+        self._clear_cache()
+
+    def remove(self, doc_id):
+        counts = self.docs.pop(doc_id, None)
+        if counts is None:
+            return
+        for term in counts:
+            posting = self.postings[term]
+            posting.discard(doc_id)
+            if not posting:
+                del self.postings[term]
+        self._clear_cache()
+
+    def _clear_cache(self):
+        # IDF weights depend on the corpus size, so every vector changes
+        self._vectors.clear()
+        self._norms.clear()
+
+    def _idf(self, term):
+        return math.log((1 + len(self.docs)) / (1 + len(self.postings[term]))) + 1
+
+    def _max_postings(self):
+        if len(self.docs) < MIN_DOCS_FOR_TERM_PRUNING:
+            return None
+        return len(self.docs) * MAX_TERM_SHARE
+
+    def _weights(self, doc_id):
+        """Weights of the terms that are scored; pruned terms stay out of the norm too"""
+        weights = self._vectors.get(doc_id)
+        if weights is None:
+            max_postings = self._max_postings()
+            weights = {term: (1 + math.log(tf)) * self._idf(term) for term, tf in self.docs[doc_id].items()
+                       if max_postings is None or len(self.postings[term]) <= max_postings}
+            self._vectors[doc_id] = weights
+        return weights
+
+    def _norm(self, doc_id):
+        norm = self._norms.get(doc_id)
+        if norm is None:
+            norm = math.sqrt(sum(w * w for w in self._weights(doc_id).values())) or 1.0
+            self._norms[doc_id] = norm
+        return norm
+
+    def neighbours(self, doc_id, k=RELATED_TOP_K, min_score=RELATED_MIN_SCORE):
+        """``[(other_id, cosine), ...]`` of the ``k`` most similar documents"""
+        if doc_id not in self.docs:
+            return []
+        dots = defaultdict(float)
+        for term, weight in self._weights(doc_id).items():
+            for other in self.postings[term]:
+                if other != doc_id:
+                    dots[other] += weight * self._weights(other)[term]
+        norm = self._norm(doc_id)
+        scored = ((other, dot / (norm * self._norm(other))) for other, dot in dots.items())
+        return heapq.nlargest(k, (pair for pair in scored if pair[1] >= min_score), key=lambda pair: pair[1])
+
+
+def _load_index():
+    index = TfidfIndex()
+    last_id = 0
+    while True:
+        rows = db.session.query(Article.id, Article.title, Article.content)\
+            .filter(Article.id > last_id).order_by(Article.id).limit(REBUILD_BATCH_SIZE).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        for article_id, title, content in rows:
+            index.add(article_id, tokenize(title, content))
+    return index
+
+
+def get_index():
+    """The app's TF-IDF index, loaded from the database when missing or old"""
+    index = current_app.extensions.get('related_index')
+    fresh = index is not None and time.monotonic() - index.built_at <= INDEX_MAX_AGE
+    record_cache('related_index', fresh)
+    if not fresh:
+        index = _load_index()
+        current_app.extensions['related_index'] = index
+    return index
+
+
+def _store_neighbours(article_id, neighbours):
+    db.session.execute(delete(RelatedArticle).where(RelatedArticle.article_id == article_id))
+    if neighbours:
+        db.session.execute(insert(RelatedArticle), [
+            {'article_id': article_id, 'related_id': other, 'score': score} for other, score in neighbours
+        ])
+
+
+def _offer(article_id, candidates, k=RELATED_TOP_K):
+    """Insert ``article_id`` into the lists of ``candidates`` where it now ranks in the top k"""
+    if not candidates:
+        return
+    current = defaultdict(list)
+    rows = db.session.query(RelatedArticle.article_id, RelatedArticle.related_id, RelatedArticle.score)\
+        .filter(RelatedArticle.article_id.in_([other for other, _ in candidates])).all()
+    for owner, related_id, score in rows:
+        if related_id != article_id:
+            current[owner].append((related_id, score))
+    for other, score in candidates:
+        entries = current[other] + [(article_id, score)]
+        _store_neighbours(other, heapq.nlargest(k, entries, key=lambda pair: pair[1]))
+
+
+def refresh_article(article_id):
+    """Recompute one article's neighbours after it was created or edited"""
+    index = get_index()
+    article = db.session.get(Article, article_id)
+    if article is None:
+        return
+    index.add(article_id, tokenize(article.title, article.content))
+
+    # Lists that contained this article may no longer rank it
+    previous = {owner for owner, in db.session.query(RelatedArticle.article_id)
+                .filter(RelatedArticle.related_id == article_id)}
+    neighbours = index.neighbours(article_id)
+    _store_neighbours(article_id, neighbours)
+    for owner in previous:
+        _store_neighbours(owner, index.neighbours(owner))
+    _offer(article_id, [pair for pair in neighbours if pair[0] not in previous])
+    db.session.commit()
+
+
+def drop_related(article_id):
+    """Remove a deleted article's rows (no commit); returns the ids whose lists lost it.
+
+    Runs inside the delete transaction, before ids are renumbered; the
+    returned lists should be refreshed afterwards.
+    """
+    owners = {owner for owner, in db.session.query(RelatedArticle.article_id)
+              .filter(RelatedArticle.related_id == article_id)}
+    db.session.execute(delete(RelatedArticle).where(
+        (RelatedArticle.article_id == article_id) | (RelatedArticle.related_id == article_id)))
+    # The worker reloads the index instead of sharing it with this thread
+    current_app.extensions.pop('related_index', None)
+    return owners
+
+
+def renumber_related_articles(id_changes):
+    """Follow article id changes ``[(old_id, new_id), ...]`` (applied in order; no commit)"""
+    if not id_changes:
+        return
+    table = RelatedArticle.__table__
+    params = [{'old_id': old_id, 'new_id': new_id} for old_id, new_id in id_changes]
+    for column in (table.c.article_id, table.c.related_id):
+        db.session.execute(
+            update(table).where(column == bindparam('old_id')).values({column.name: bindparam('new_id')}),
+            params
+        )
+
+
+def rebuild_related_articles():
+    """Recompute every article's neighbours; returns the number of pairs stored"""
+    index = _load_index()
+    current_app.extensions['related_index'] = index
+    # End the read transaction: its shared lock would keep writers from
+    # committing while the neighbours are computed
+    db.session.commit()
+    rows = [{'article_id': article_id, 'related_id': other, 'score': score}
+            for article_id in list(index.docs) for other, score in index.neighbours(article_id)]
+    # Only the swap holds the write lock
+    db.session.execute(delete(RelatedArticle))
+    for start in range(0, len(rows), REBUILD_BATCH_SIZE):
+        db.session.execute(insert(RelatedArticle), rows[start:start + REBUILD_BATCH_SIZE])
+    db.session.commit()
+    return len(rows)
+
+
+def _run_in_app(app, func, *args):
+    with app.app_context():
+        try:
+            func(*args)
+        except Exception as e:
+            db.session.rollback()
+            logger.error('Related articles update failed: %s', e)
+
+
+def schedule_related_update(func, *args):
+    """Run ``refresh_article``/``rebuild_related_articles`` off the request thread.
+
+    A single worker serialises all index changes, so the index needs no locks.
+    """
+    return _executor.submit(_run_in_app, current_app._get_current_object(), func, *args)
+
+
+@traced()
+def get_related_articles(article_id, limit=RELATED_TOP_K):
+    """Stored neighbours of an article, most similar first"""
+    return Article.query.join(RelatedArticle, RelatedArticle.related_id == Article.id)\
+        .filter(RelatedArticle.article_id == article_id)\
+        .order_by(RelatedArticle.score.desc()).limit(limit).all()
@@ -0,0 +1,198 @@
+"""Resumable chunked uploads.
+
+Protocol:
+    POST /api/media/uploads               start a session -> upload_id, offset
+    PUT  /api/media/uploads/<id>?offset=N append one chunk of raw bytes
+    GET  /api/media/uploads/<id>          current offset, to resume after a drop
+    POST /api/media/uploads/<id>/complete verify, store and create the media row
+
+Chunks are copied straight from the request body into a ``.part`` file in
+the uploads folder, so each byte is written to disk once. The number of
+bytes received is the size of that file, which keeps sessions resumable
+across worker restarts without any extra bookkeeping.
+"""
+from .media_service import get_upload_folder, UPLOAD_CHUNK_SIZE
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+
+PARTIAL_DIRNAME = '.partial'
+
+# Suggested chunk size sent to clients when a session starts
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+_UPLOAD_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+class UploadError(Exception):
+    """Raised for invalid upload requests; ``status`` is the HTTP status code"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _partial_folder():
+    return os.path.join(get_upload_folder(), PARTIAL_DIRNAME)
+
+
+def _paths(upload_id):
+    if not _UPLOAD_ID_RE.match(upload_id or ''):
+        raise UploadError('Upload not found', 404)
+    base = os.path.join(_partial_folder(), upload_id)
+    return base + '.part', base + '.json'
+
+
+def _load_session(upload_id):
+    data_path, meta_path = _paths(upload_id)
+    try:
+        with open(meta_path) as f:
+            session = json.load(f)
+    except (OSError, ValueError):
+        raise UploadError('Upload not found', 404)
+    session['offset'] = os.path.getsize(data_path) if os.path.exists(data_path) else 0
+    return session
+
+
+def start_upload(filename, file_ext, content_type, size, max_size, sha256=None):
+    """Create an upload session and return its public state"""
+    if not isinstance(size, int) or isinstance(size, bool) or size <= 0:
+        raise UploadError('size must be a positive integer')
+    if size > max_size:
+        raise UploadError(f'File is larger than the {max_size} byte limit', 413)
+    if sha256 is not None and not re.match(r'^[0-9a-f]{64}$', sha256):
+        raise UploadError('sha256 must be a hex digest')
+
+    os.makedirs(_partial_folder(), exist_ok=True)
+    upload_id = uuid.uuid4().hex
+    data_path, meta_path = _paths(upload_id)
+    session = {
+        'upload_id': upload_id,
+        'filename': filename,
+        'file_ext': file_ext,
+        'content_type': content_type,
+        'size': size,
+        'sha256': sha256,
+        'created_at': time.time(),
+    }
+    with open(meta_path, 'w') as f:
+        json.dump(session, f)
+    open(data_path, 'wb').close()
+    return get_upload_state(upload_id)
+
+
+def get_upload_state(upload_id):
+    session = _load_session(upload_id)
+    return {
+        'upload_id': upload_id,
+        'offset': session['offset'],
+        'size': session['size'],
+        'chunk_size': DEFAULT_CHUNK_SIZE,
+        'complete': session['offset'] == session['size'],
+    }
+
+
+def write_chunk(upload_id, offset, stream, length, chunk_sha256=None):
+    """Append ``length`` bytes from ``stream`` at ``offset``.
+
+    ``offset`` must equal the bytes already received; a client that lost a
+    response simply asks for the state and continues from there. When
+    ``chunk_sha256`` is given the chunk is verified and rolled back on
+    mismatch. Returns the new upload state.
+    """
+    session = _load_session(upload_id)
+    if offset != session['offset']:
+        raise UploadError(f'Expected offset {session["offset"]}', 409)
+    if length is None:
+        raise UploadError('Content-Length is required', 411)
+    if offset + length > session['size']:
+        raise UploadError('Chunk exceeds the declared file size', 413)
+
+    data_path, _ = _paths(upload_id)
+    digest = hashlib.sha256()
+    written = 0
+    with open(data_path, 'r+b') as out:
+        out.seek(offset)
+        try:
+            while written < length:
+                block = stream.read(min(UPLOAD_CHUNK_SIZE, length - written))
+                if not block:
+                    break
+                out.write(block)
+                digest.update(block)
+                written += len(block)
+            if written != length:
+                raise UploadError('Chunk body was shorter than Content-Length')
+            if chunk_sha256 and digest.hexdigest() != chunk_sha256.lower():
+                raise UploadError('Chunk checksum mismatch', 422)
+        except BaseException:
+            # Drop the partial chunk so the client can retry from ``offset``
+            out.truncate(offset)
+            raise
+    return get_upload_state(upload_id)
+
+
+def finish_upload(upload_id):
+    """Verify a completed upload and move it into the content-addressed store.
+
+    Returns ``(session, sha256, filename, file_path, size)``.
+    """
+    session = _load_session(upload_id)
+    if session['offset'] != session['size']:
+        raise UploadError(f'Upload incomplete: {session["offset"]} of {session["size"]} bytes', 409)
+
+    data_path, meta_path = _paths(upload_id)
+    digest = hashlib.sha256()
+    with open(data_path, 'rb') as f:
+        for block in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b''):
+            digest.update(block)
+    sha256 = digest.hexdigest()
+    if session.get('sha256') and session['sha256'] != sha256:
+        abort_upload(upload_id)
+        raise UploadError('File checksum mismatch', 422)
+
+    filename = f'{sha256}.{session["file_ext"]}'
+    file_path = os.path.join(get_upload_folder(), filename)
+    if os.path.exists(file_path):
+        os.remove(data_path)
+    else:
+        os.replace(data_path, file_path)
+    os.remove(meta_path)
+    return session, sha256, filename, file_path, session['size']
+
+
+def abort_upload(upload_id):
+    """Discard an upload session and its partial data"""
+    for path in _paths(upload_id):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def expire_stale_uploads(max_age_seconds=24 * 3600):
+    """Remove sessions with no chunk written for ``max_age_seconds``.
+
+    Returns the number of bytes reclaimed.
+    """
+    folder = _partial_folder()
+    if not os.path.isdir(folder):
+        return 0
+    cutoff = time.time() - max_age_seconds
+    reclaimed = 0
+    for name in os.listdir(folder):
+        if not name.endswith('.json'):
+            continue
+        upload_id = name[:-len('.json')]
+        try:
+            data_path, meta_path = _paths(upload_id)
+        except UploadError:
+            continue
+        last_activity = max(os.path.getmtime(p) for p in (data_path, meta_path) if os.path.exists(p))
+        if last_activity < cutoff:
+            reclaimed += os.path.getsize(data_path) if os.path.exists(data_path) else 0
+            abort_upload(upload_id)
+    return reclaimed
@@ -0,0 +1,256 @@
+"""Write-behind article view counters and the trending list.
+
+Page views only touch memory: ``record_view()`` bumps a per-article counter
+and a HyperLogLog sketch of visitors. A background thread flushes the
+batch every ``VIEW_FLUSH_INTERVAL`` seconds in one transaction and then
+recomputes the trending list, which pages read without a query.
+
+Trending uses an exponentially decayed view count with a half-life of
+``TRENDING_HALF_LIFE`` seconds. Scores are stored as
+``log2(sum(views * 2 ** ((t - epoch) / half_life)))``: every row decays at
+the same rate, so ordering by the stored value is the decayed ranking at
+any moment, and rows never need rewriting as time passes.
+"""
+from flask import current_app
+from ..models.article import Article
+from ..models.article_stats import ArticleStats
+from ..models.db import db
+from ..tracing import traced
+from collections import Counter
+from datetime import datetime, timezone
+from sqlalchemy import bindparam, delete, insert, update
+import atexit
+import hashlib
+import logging
+import math
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+VIEW_FLUSH_INTERVAL = 30
+TRENDING_HALF_LIFE = 6 * 3600
+TRENDING_SIZE = 6
+TRENDING_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp()
+
+# 2 ** HLL_PRECISION one-byte registers per article (~3% standard error)
+HLL_PRECISION = 10
+
+
+class HyperLogLog:
+    """Distinct-count sketch; merging two sketches is a register-wise max"""
+
+    def __init__(self, registers=None, precision=HLL_PRECISION):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(registers) if registers else bytearray(self.size)
+
+    def add(self, value):
+        h = int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def estimate(self):
+        alpha = 0.7213 / (1 + 1.079 / self.size)
+        raw = alpha * self.size * self.size / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * self.size and zeros:
+            # Linear counting is more accurate for small cardinalities
+            return round(self.size * math.log(self.size / zeros))
+        return round(raw)
+
+
+def _log2_add(a, b):
+    """log2(2 ** a + 2 ** b) without overflow"""
+    if a is None:
+        return b
+    high, low = max(a, b), min(a, b)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def trend_increment(views, now=None):
+    """Trend score contribution of ``views`` views at ``now`` (unix time)"""
+    now = time.time() if now is None else now
+    return math.log2(views) + (now - TRENDING_EPOCH) / TRENDING_HALF_LIFE
+
+
+class ViewCounter:
+    """In-memory view batch for one app, flushed by a daemon thread"""
+
+    def __init__(self, app, interval=VIEW_FLUSH_INTERVAL):
+        self.app = app
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.views = Counter()
+        self.sketches = {}
+        self.trending = []
+        self._thread = None
+
+    def record(self, article_id, visitor=None):
+        with self.lock:
+            self.views[article_id] += 1
+            if visitor:
+                self.sketches.setdefault(article_id, HyperLogLog()).add(visitor)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='view-counter', daemon=True)
+                self._thread.start()
+
+    def pending(self, article_id):
+        with self.lock:
+            return self.views.get(article_id, 0)
+
+    def _take(self):
+        with self.lock:
+            views, sketches = self.views, self.sketches
+            self.views, self.sketches = Counter(), {}
+        return views, sketches
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.flush()
+
+    def flush(self):
+        """Write the pending batch and refresh the trending list; returns views written"""
+        views, sketches = self._take()
+        if not views:
+            return 0
+        with self.app.app_context():
+            try:
+                _write_batch(views, sketches)
+                self.trending = load_trending()
+            except Exception as e:
+                db.session.rollback()
+                logger.error('Failed to flush article views: %s', e)
+                # Keep the counts for the next attempt
+                with self.lock:
+                    self.views.update(views)
+                    for article_id, sketch in sketches.items():
+                        self.sketches.setdefault(article_id, HyperLogLog()).merge(sketch)
+                return 0
+        return sum(views.values())
+
+    def remap(self, id_map):
+        """Follow article id renumbering for counts that are not flushed yet"""
+        with self.lock:
+            self.views = Counter({id_map.get(k, k): v for k, v in self.views.items()})
+            self.sketches = {id_map.get(k, k): v for k, v in self.sketches.items()}
+
+    def discard(self, article_id):
+        with self.lock:
+            self.views.pop(article_id, None)
+            self.sketches.pop(article_id, None)
+
+
+def _write_batch(views, sketches):
+    ids = [article_id for article_id, in db.session.query(Article.id).filter(Article.id.in_(views))]
+    existing = {row.article_id: row for row in
+                db.session.query(ArticleStats.article_id, ArticleStats.visitors_sketch, ArticleStats.trend_score)
+                .filter(ArticleStats.article_id.in_(ids))}
+    now = time.time()
+    updated_at = datetime.now(timezone.utc)
+    updates, inserts = [], []
+    for article_id in ids:
+        row = existing.get(article_id)
+        sketch = HyperLogLog(row.visitors_sketch if row else None)
+        if article_id in sketches:
+            sketch.merge(sketches[article_id])
+        values = {
+            'visitors_sketch': bytes(sketch.registers),
+            'unique_visitors': sketch.estimate(),
+            'trend_score': _log2_add(row.trend_score if row else None, trend_increment(views[article_id], now)),
+            'updated_at': updated_at,
+        }
+        if row:
+            updates.append(dict(values, stats_id=article_id, delta=views[article_id]))
+        else:
+            inserts.append(dict(values, article_id=article_id, views=views[article_id]))
+
+    table = ArticleStats.__table__
+    if updates:
+        # The remaining keys of each row become the SET clause
+        db.session.execute(
+            update(table).where(table.c.article_id == bindparam('stats_id'))
+            .values(views=table.c.views + bindparam('delta')),
+            updates
+        )
+    if inserts:
+        db.session.execute(insert(table), inserts)
+    db.session.commit()
+
+
+def load_trending(limit=TRENDING_SIZE):
+    """Top articles by decayed views as plain dicts (safe to share across requests)"""
+    rows = db.session.query(Article.id, Article.title, Article.image_url, ArticleStats.views)\
+        .join(ArticleStats, ArticleStats.article_id == Article.id)\
+        .order_by(ArticleStats.trend_score.desc()).limit(limit).all()
+    return [{'id': r.id, 'title': r.title, 'image_url': r.image_url, 'views': r.views} for r in rows]
+
+
+def get_view_counter(app=None):
+    """The app's view counter, created (and its trending list loaded) on first use"""
+    app = app or current_app._get_current_object()
+    counter = app.extensions.get('view_counter')
+    if counter is None:
+        counter = app.extensions.setdefault('view_counter', ViewCounter(app))
+        with app.app_context():
+            counter.trending = load_trending()
+        # Write the last partial batch when the worker exits
+        atexit.register(counter.flush)
+    return counter
+
+
+def record_view(article_id, visitor=None):
+    """Count one page view in memory; ``visitor`` is an opaque id for the unique count"""
+    get_view_counter().record(article_id, visitor)
+
+
+@traced()
+def get_trending_articles():
+    """The precomputed trending list (refreshed after each flush and after deletes)"""
+    counter = get_view_counter()
+    trending = counter.trending
+    if trending is None:
+        trending = counter.trending = load_trending()
+    return trending
+
+
+def invalidate_trending():
+    """Drop the cached trending list; call after committing article deletes or id renumbering"""
+    counter = current_app.extensions.get('view_counter')
+    if counter:
+        counter.trending = None
+
+
+def get_article_views(article_id):
+    """Stored plus not-yet-flushed views of an article"""
+    stats = db.session.get(ArticleStats, article_id)
+    return (stats.views if stats else 0) + get_view_counter().pending(article_id)
+
+
+def drop_article_stats(article_id):
+    """Forget a deleted article's counters (no commit)"""
+    db.session.execute(delete(ArticleStats).where(ArticleStats.article_id == article_id))
+    counter = current_app.extensions.get('view_counter')
+    if counter:
+        counter.discard(article_id)
+
+
+def renumber_article_stats(id_changes):
+    """Follow article id changes ``[(old_id, new_id), ...]`` (applied in order; no commit)"""
+    if not id_changes:
+        return
+    table = ArticleStats.__table__
+    db.session.execute(
+        update(table).where(table.c.article_id == bindparam('old_id')).values(article_id=bindparam('new_id')),
+        [{'old_id': old_id, 'new_id': new_id} for old_id, new_id in id_changes]
+    )
+    counter = current_app.extensions.get('view_counter')
+    if counter:
+        counter.remap(dict(id_changes))
@@ -0,0 +1,200 @@
+"""Prebuilt, purged stylesheet replacing the runtime Tailwind CDN compiler.
+
+``build_stylesheet()`` runs the Tailwind CLI over the templates, merges its
+output with ``style.css`` purged of selectors that no template or script
+uses, and minifies the result. It also extracts the rules that apply to the
+markup of each layout as critical CSS to inline in ``<head>``.
+
+The Tailwind CLI is taken from ``TAILWIND_CMD`` when set, otherwise a
+``tailwindcss`` binary on PATH, otherwise ``npx tailwindcss@3``. When none
+can run, no stylesheet is built and the layout keeps using the CDN.
+"""
+import glob
+import logging
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'Frontend')
+TEMPLATE_DIR = os.path.join(FRONTEND_DIR, 'templates')
+
+# Templates that other pages extend; each gets its own critical CSS file
+LAYOUTS = ('layout.html',)
+CRITICAL_DIRNAME = 'critical'
+
+TAILWIND_INPUT = '@tailwind base;\n@tailwind components;\n@tailwind utilities;\n'
+# darkMode 'media' matches the defaults of the CDN build it replaces
+TAILWIND_CONFIG = 'module.exports = {{ darkMode: "media", content: {content} }};\n'
+
+# At-rules whose bodies are kept verbatim (never purged)
+_KEEP_AT_RULES = ('@keyframes', '@-webkit-keyframes', '@font-face', '@page', '@property', '@import', '@charset')
+
+_TOKEN_RE = re.compile(r'[A-Za-z0-9_\-:/.%\[\]#!]+')
+_CLASS_RE = re.compile(r'\.((?:\\.|[A-Za-z0-9_-])+)')
+
+
+def collect_tokens(paths):
+    """Every class-like token that appears in the given templates/scripts"""
+    tokens = set()
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            text = f.read()
+        for token in _TOKEN_RE.findall(text):
+            tokens.add(token)
+            # "hover:bg-x" in markup produces ".hover\:bg-x"; "a.b" may be two classes
+            tokens.update(token.split('.'))
+    return tokens
+
+
+def parse_css(css):
+    """Split CSS into a list of ``(prelude, body)`` blocks.
+
+    ``body`` is the text between the braces (nested blocks left intact), or
+    None for statements such as ``@import ...;``. Comments are removed.
+    """
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    blocks = []
+    i = 0
+    length = len(css)
+    while i < length:
+        brace = css.find('{', i)
+        semi = css.find(';', i)
+        if brace == -1:
+            break
+        if semi != -1 and semi < brace and css[i:semi].strip().startswith('@'):
+            blocks.append((css[i:semi].strip(), None))
+            i = semi + 1
+            continue
+        depth = 0
+        j = brace
+        while j < length:
+            if css[j] == '{':
+                depth += 1
+            elif css[j] == '}':
+                depth -= 1
+                if depth == 0:
+                    break
+            j += 1
+        blocks.append((css[i:brace].strip(), css[brace + 1:j]))
+        i = j + 1
+    return blocks
+
+
+def _split_selectors(prelude):
+    parts, depth, start = [], 0, 0
+    for index, char in enumerate(prelude):
+        if char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            parts.append(prelude[start:index].strip())
+            start = index + 1
+    parts.append(prelude[start:].strip())
+    return [p for p in parts if p]
+
+
+def _selector_used(selector, tokens):
+    for match in _CLASS_RE.findall(selector):
+        if match.replace('\\', '') not in tokens:
+            return False
+    return True
+
+
+def purge_css(css, tokens, keep_at_rules=True):
+    """Drop selectors whose classes never appear in ``tokens``.
+
+    ``keep_at_rules=False`` also drops keyframes, font faces and statements,
+    which is what critical CSS wants.
+    """
+    out = []
+    for prelude, body in parse_css(css):
+        if prelude.startswith(':root'):
+            out.append(f'{prelude}{{{body}}}')
+        elif body is None or prelude.startswith(_KEEP_AT_RULES):
+            if keep_at_rules:
+                out.append(prelude + ';' if body is None else f'{prelude}{{{body}}}')
+        elif prelude.startswith('@'):
+            inner = purge_css(body, tokens, keep_at_rules)
+            if inner.strip():
+                out.append(f'{prelude}{{{inner}}}')
+        else:
+            selectors = [s for s in _split_selectors(prelude) if _selector_used(s, tokens)]
+            if selectors:
+                out.append(f'{",".join(selectors)}{{{body}}}')
+    return '\n'.join(out)
+
+
+def minify_css(css):
+    """Whitespace/comment minification that never changes selector meaning"""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    # Space before ":" can be a descendant combinator; space after it never matters
+    css = re.sub(r':\s+', ':', css)
+    css = css.replace(';}', '}')
+    return css.strip()
+
+
+def tailwind_command():
+    configured = os.getenv('TAILWIND_CMD')
+    if configured:
+        return shlex.split(configured)
+    if shutil.which('tailwindcss'):
+        return ['tailwindcss']
+    if shutil.which('npx'):
+        return ['npx', '--yes', 'tailwindcss@3']
+    return None
+
+
+def run_tailwind(content_globs):
+    """Compile Tailwind for ``content_globs``; returns CSS text or None"""
+    command = tailwind_command()
+    if not command:
+        return None
+    with tempfile.TemporaryDirectory() as workdir:
+        input_path = os.path.join(workdir, 'input.css')
+        config_path = os.path.join(workdir, 'tailwind.config.js')
+        output_path = os.path.join(workdir, 'output.css')
+        with open(input_path, 'w') as f:
+            f.write(TAILWIND_INPUT)
+        with open(config_path, 'w') as f:
+            f.write(TAILWIND_CONFIG.format(content=repr(list(content_globs)).replace("'", '"')))
+        try:
+            subprocess.run(command + ['-c', config_path, '-i', input_path, '-o', output_path, '--minify'],
+                           check=True, capture_output=True, timeout=300)
+            with open(output_path, encoding='utf-8') as f:
+                return f.read()
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.warning('Tailwind build failed, keeping the CDN: %s', e)
+            return None
+
+
+def build_stylesheet(static_dir, template_dir=TEMPLATE_DIR):
+    """Return ``(app_css, {layout: critical_css})`` or ``(None, {})`` without Tailwind"""
+    template_paths = sorted(glob.glob(os.path.join(template_dir, '*.html')))
+    script_paths = sorted(glob.glob(os.path.join(static_dir, 'js', '*.js')))
+    tailwind_css = run_tailwind([os.path.join(template_dir, '*.html'), os.path.join(static_dir, 'js', '*.js')])
+    if tailwind_css is None:
+        return None, {}
+
+    site_css = ''
+    style_path = os.path.join(static_dir, 'css', 'style.css')
+    if os.path.exists(style_path):
+        with open(style_path, encoding='utf-8') as f:
+            site_css = purge_css(f.read(), collect_tokens(template_paths + script_paths))
+    app_css = minify_css(tailwind_css + '\n' + site_css)
+
+    critical = {}
+    for layout in LAYOUTS:
+        layout_path = os.path.join(template_dir, layout)
+        if os.path.exists(layout_path):
+            # The inline theme script adds "dark" to <html> before first paint
+            tokens = collect_tokens([layout_path]) | {'dark'}
+            critical[layout] = minify_css(purge_css(app_css, tokens, keep_at_rules=False))
+    return app_css, critical
@@ -0,0 +1,396 @@
+"""Local request tracing with an OpenTelemetry-compatible file exporter.
+
+A sampled request becomes a trace: a server span for the request with
+child spans for the view function, the service calls decorated with
+``@traced``, every SQL statement, template rendering and each NewsAPI
+call (``span(...)``). The current span lives in a ``ContextVar``, so
+spans nest without being passed around. Code outside a sampled request
+pays one context-variable lookup per instrumented call.
+
+Sampling is decided once per request (head-based): ``TRACE_SAMPLE_RATE``
+of the requests are traced. An admin request (see ``auth.py``) with a
+W3C ``traceparent`` header whose sampled flag is set is always traced and
+continues that trace; other clients' ``traceparent`` only lends its trace
+id. The response carries the trace id in ``X-Trace-Id`` and log records of
+the request carry it as ``trace_id``.
+
+Finished traces are written off the request thread to ``TRACE_FILE`` as
+OTLP/JSON lines (one ``resourceSpans`` document per trace, the format of
+the OpenTelemetry collector's file exporter), so they can be loaded into
+any OTLP-aware viewer. ``flask traces`` prints them as span trees.
+"""
+from flask import g, request, template_rendered, before_render_template
+from .auth import is_admin_request
+from .models.db import db
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from sqlalchemy import event
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+TRACE_FILE = os.getenv('TRACE_FILE', '')
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', '0.05'))
+SERVICE_NAME = 'news_app'
+# A runaway loop of queries should not hold a whole trace in memory
+MAX_SPANS_PER_TRACE = 1000
+# Longest SQL statement kept as a span attribute
+MAX_STATEMENT_LENGTH = 1000
+TRACEPARENT_RE = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+# OTLP span kinds and status codes
+KIND_INTERNAL, KIND_SERVER, KIND_CLIENT = 1, 2, 3
+STATUS_UNSET, STATUS_OK, STATUS_ERROR = 0, 1, 2
+
+_current_span = ContextVar('current_span', default=None)
+_export_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='trace-export')
+
+
+class Trace:
+    """Finished spans of one sampled request, exported when the root span ends"""
+
+    def __init__(self, trace_id, exporter):
+        self.trace_id = trace_id
+        self.exporter = exporter
+        self.spans = []
+        self.dropped = 0
+
+    def finish(self, span):
+        if len(self.spans) < MAX_SPANS_PER_TRACE:
+            self.spans.append(span)
+        else:
+            self.dropped += 1
+
+
+class Span:
+    def __init__(self, trace, name, parent_id=None, kind=KIND_INTERNAL, attributes=None):
+        self.trace = trace
+        self.name = name
+        self.span_id = '%016x' % random.getrandbits(64)
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.status = STATUS_UNSET
+        self.status_message = ''
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def record_error(self, exc):
+        self.status = STATUS_ERROR
+        self.status_message = f'{type(exc).__name__}: {exc}'
+
+    def child(self, name, kind=KIND_INTERNAL, attributes=None):
+        return Span(self.trace, name, self.span_id, kind, attributes)
+
+    def end(self):
+        self.end_ns = time.time_ns()
+        self.trace.finish(self)
+
+    def to_otlp(self):
+        data = {
+            'traceId': self.trace.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            'status': {'code': self.status},
+        }
+        if self.parent_id:
+            data['parentSpanId'] = self.parent_id
+        if self.status_message:
+            data['status']['message'] = self.status_message
+        return data
+
+
+def _otlp_attribute(key, value):
+    if isinstance(value, bool):
+        return {'key': key, 'value': {'boolValue': value}}
+    if isinstance(value, int):
+        return {'key': key, 'value': {'intValue': str(value)}}
+    if isinstance(value, float):
+        return {'key': key, 'value': {'doubleValue': value}}
+    return {'key': key, 'value': {'stringValue': str(value)}}
+
+
+class FileSpanExporter:
+    """Append traces to a file as OTLP/JSON lines"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def export(self, trace):
+        document = {'resourceSpans': [{
+            'resource': {'attributes': [_otlp_attribute('service.name', SERVICE_NAME),
+                                        _otlp_attribute('process.pid', os.getpid())]},
+            'scopeSpans': [{'scope': {'name': __name__}, 'spans': [span.to_otlp() for span in trace.spans]}],
+        }]}
+        line = json.dumps(document, separators=(',', ':')) + '\n'
+        with self.lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+
+def _export_safely(trace):
+    try:
+        trace.exporter.export(trace)
+    except Exception as e:
+        logger.error('Could not export trace %s: %s', trace.trace_id, e)
+
+
+def current_span():
+    """The innermost open span, or None outside a sampled request"""
+    return _current_span.get()
+
+
+@contextmanager
+def span(name, kind=KIND_INTERNAL, **attributes):
+    """Trace the block as a child of the current span (no-op outside a sampled request)"""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = parent.child(name, kind, attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except Exception as e:
+        child.record_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        child.end()
+
+
+def traced(name=None):
+    """Decorator: run the function in a span named ``module.function``"""
+    def decorator(func):
+        span_name = name or f'{func.__module__.rsplit(".", 1)[-1]}.{func.__name__}'
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return func(*args, **kwargs)
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _before_render(sender, template, context, **extra):
+    parent = _current_span.get()
+    if parent is not None:
+        child = parent.child(f'render {template.name}', attributes={'template': template.name})
+        g.setdefault('_template_spans', []).append((child, _current_span.set(child)))
+
+
+def _rendered(sender, template, context, **extra):
+    spans = g.get('_template_spans')
+    if spans:
+        child, token = spans.pop()
+        _current_span.reset(token)
+        child.end()
+
+
+class Tracer:
+    """Sampling rate, exporter and hooks of one app"""
+
+    def __init__(self, app):
+        self.app = app
+        self.enabled = False
+        self.sample_rate = TRACE_SAMPLE_RATE
+        self.exporter = None
+        self._engines = []
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        parent = _current_span.get()
+        if parent is not None:
+            context._trace_span = parent.child('sql ' + statement.split(None, 1)[0].upper(), attributes={
+                'db.system': 'sqlite',
+                'db.statement': ' '.join(statement.split())[:MAX_STATEMENT_LENGTH],
+            })
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        sql_span = getattr(context, '_trace_span', None)
+        if sql_span is not None:
+            context._trace_span = None
+            sql_span.end()
+
+    def set_sample_rate(self, sample_rate):
+        self.sample_rate = min(max(float(sample_rate), 0.0), 1.0)
+
+    def enable(self, path, sample_rate=None):
+        if sample_rate is not None:
+            self.set_sample_rate(sample_rate)
+        self.exporter = FileSpanExporter(path)
+        if self.enabled:
+            return
+        with self.app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        self._engines.append(engine)
+        before_render_template.connect(_before_render, self.app)
+        template_rendered.connect(_rendered, self.app)
+        self.enabled = True
+
+    def disable(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        for engine in self._engines:
+            event.remove(engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.remove(engine, 'after_cursor_execute', self._after_cursor_execute)
+        self._engines = []
+        before_render_template.disconnect(_before_render, self.app)
+        template_rendered.disconnect(_rendered, self.app)
+
+    def start_request(self):
+        """Root span of the current request if it is sampled, else None"""
+        match = TRACEPARENT_RE.match(request.headers.get('traceparent', ''))
+        forced = bool(match and int(match.group(3), 16) & 1) and is_admin_request()
+        if not forced and random.random() >= self.sample_rate:
+            return None
+        trace_id = match.group(1) if match else '%032x' % random.getrandbits(128)
+        root = Span(Trace(trace_id, self.exporter), f'{request.method} {request.url_rule or request.path}',
+                    parent_id=match.group(2) if forced else None, kind=KIND_SERVER, attributes={
+                        'http.method': request.method,
+                        'http.target': request.full_path.rstrip('?'),
+                        'http.route': str(request.url_rule or ''),
+                    })
+        if g.get('request_id'):
+            root.set_attribute('request_id', g.request_id)
+        return root
+
+    def finish_request(self, root):
+        if root.trace.dropped:
+            root.set_attribute('spans.dropped', root.trace.dropped)
+        # The root span bypasses MAX_SPANS_PER_TRACE: without it the trace has no request
+        root.end_ns = time.time_ns()
+        root.trace.spans.append(root)
+        _export_executor.submit(_export_safely, root.trace)
+
+
+def get_tracer(app):
+    return app.extensions['tracer']
+
+
+def set_tracing(app, enabled, path=None, sample_rate=None):
+    """Switch tracing on or off for a running app, optionally changing the file or sampling rate"""
+    tracer = get_tracer(app)
+    if enabled:
+        tracer.enable(path or (tracer.exporter.path if tracer.exporter else TRACE_FILE or 'traces.jsonl'),
+                      sample_rate)
+    else:
+        if sample_rate is not None:
+            tracer.set_sample_rate(sample_rate)
+        tracer.disable()
+    return tracer.enabled
+
+
+def _wrap_view(endpoint, view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if _current_span.get() is None:
+            return view(*args, **kwargs)
+        with span(f'view {endpoint}', **{'flask.endpoint': endpoint}):
+            return view(*args, **kwargs)
+    return wrapper
+
+
+def init_tracing(app):
+    """Register the tracing hooks; tracing starts enabled when TRACE_FILE is set"""
+    tracer = Tracer(app)
+    app.extensions['tracer'] = tracer
+
+    # Views registered so far get their own span under the request span
+    for endpoint, view in list(app.view_functions.items()):
+        if endpoint != 'static':
+            app.view_functions[endpoint] = _wrap_view(endpoint, view)
+
+    @app.before_request
+    def start_trace():
+        if not tracer.enabled:
+            return
+        root = tracer.start_request()
+        if root is not None:
+            g._trace_root = root
+            g._trace_token = _current_span.set(root)
+            g.trace_id = root.trace.trace_id
+
+    @app.after_request
+    def add_trace_header(response):
+        root = g.get('_trace_root')
+        if root is not None:
+            root.set_attribute('http.status_code', response.status_code)
+            if response.status_code >= 500:
+                root.status = STATUS_ERROR
+            response.headers['X-Trace-Id'] = root.trace.trace_id
+        return response
+
+    @app.teardown_request
+    def finish_trace(exc):
+        root = g.pop('_trace_root', None)
+        if root is None:
+            return
+        _current_span.reset(g.pop('_trace_token'))
+        if exc is not None:
+            root.record_error(exc)
+        tracer.finish_request(root)
+
+    if TRACE_FILE:
+        tracer.enable(TRACE_FILE)
+    return tracer
+
+
+def read_traces(path):
+    """Spans of every trace in an OTLP/JSON lines file, grouped by trace id"""
+    traces = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            for resource in json.loads(line)['resourceSpans']:
+                for scope in resource['scopeSpans']:
+                    for data in scope['spans']:
+                        traces.setdefault(data['traceId'], []).append(data)
+    return traces
+
+
+def span_duration_ms(data):
+    return (int(data['endTimeUnixNano']) - int(data['startTimeUnixNano'])) / 1e6
+
+
+def format_trace(spans):
+    """Indented span tree with durations, children in start order"""
+    ids = {data['spanId'] for data in spans}
+    children = {}
+    for data in spans:
+        parent = data.get('parentSpanId')
+        children.setdefault(parent if parent in ids else None, []).append(data)
+    lines = []
+
+    def walk(parent_id, depth):
+        for data in sorted(children.get(parent_id, []), key=lambda d: int(d['startTimeUnixNano'])):
+            attributes = {a['key']: next(iter(a['value'].values())) for a in data['attributes']}
+            detail = attributes.get('db.statement', '')
+            error = ' ERROR' if data['status'].get('code') == STATUS_ERROR else ''
+            lines.append(f"{span_duration_ms(data):9.1f}ms {'  ' * depth}{data['name']}{error}"
+                         + (f'  {detail[:120]}' if detail else ''))
+            walk(data['spanId'], depth + 1)
+
+    walk(None, 0)
+    return '\n'.join(lines)
@@ -319,6 +319,56 @@ async function apiDelete(url) {
     }
 }
 
+/**
+ * Resumable upload - sends a file in chunks to /api/media/uploads.
+ * A failed chunk is retried from the offset the server reports, so a
+ * dropped connection only costs the chunk in flight.
+ */
+async function uploadFileResumable(file, onProgress, maxRetries = 5) {
+    const startResponse = await fetch('/api/media/uploads', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ filename: file.name, size: file.size, content_type: file.type })
+    });
+    let state = await startResponse.json();
+    if (!startResponse.ok) throw new Error(state.error || 'Upload failed');
+
+    const uploadUrl = `/api/media/uploads/${state.upload_id}`;
+    let retries = 0;
+    while (state.offset < state.size) {
+        const chunk = file.slice(state.offset, state.offset + state.chunk_size);
+        let response = null;
+        try {
+            response = await fetch(`${uploadUrl}?offset=${state.offset}`, {
+                method: 'PUT',
+                headers: { 'Content-Type': 'application/octet-stream' },
+                body: chunk
+            });
+        } catch (error) {
+            // Network failure: fall through and retry
+        }
+        if (response && response.ok) {
+            state = await response.json();
+            retries = 0;
+            if (onProgress) onProgress(state.offset / state.size);
+            continue;
+        }
+        if (response && response.status !== 409 && response.status < 500) {
+            const data = await response.json();
+            throw new Error(data.error || 'Upload failed');
+        }
+        if (++retries > maxRetries) throw new Error('Upload failed after several retries');
+        await new Promise(resolve => setTimeout(resolve, 500 * 2 ** retries));
+        // Resume from whatever the server actually stored
+        state = { ...state, ...(await apiGet(uploadUrl)) };
+    }
+
+    const completeResponse = await fetch(`${uploadUrl}/complete`, { method: 'POST' });
+    const result = await completeResponse.json();
+    if (!completeResponse.ok) throw new Error(result.error || 'Upload failed');
+    return result;
+}
+
 // Export functions for global use
 window.showNotification = showNotification;
 window.formatDate = formatDate;
@@ -328,4 +378,5 @@ window.countCharacters = countCharacters;
 window.apiGet = apiGet;
 window.apiPost = apiPost;
 window.apiPut = apiPut;
+window.uploadFileResumable = uploadFileResumable;
 window.apiDelete = apiDelete;
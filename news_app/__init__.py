@@ -1,19 +1,36 @@
 from flask import Flask, send_from_directory
 from flask_compress import Compress
-from .Backend.models.db import db
+from .Backend.models.db import db, upgrade_schema
 from .Backend.controllers.article_controller import article_bp
 from .Backend.controllers.category_controller import category_bp
 from .Backend.controllers.admin_controller import admin_bp
 from .Backend.controllers.api_controller import api_bp
 from .Backend.controllers.media_controller import media_bp
+from .Backend.controllers.debug_controller import debug_bp
+from .Backend.commands import register_commands
+from .Backend.admission import init_admission
+from .Backend.assets import init_assets
+from .Backend.instrumentation import init_instrumentation
+from .Backend.logging_setup import init_logging
+from .Backend.metrics import init_metrics
+from .Backend.query_plans import init_query_plans
+from .Backend.tracing import init_tracing
+from .Backend.services.image_service import image_attrs
+from .Backend.services.media_reference_service import rebuild_media_references
+from .Backend.services.related_service import rebuild_related_articles, schedule_related_update
+from sqlalchemy import inspect
+import logging
 import os
 
 compress = Compress()
+logger = logging.getLogger(__name__)
 
 def create_app():
     template_dir = os.path.join(os.path.dirname(__file__), 'Frontend', 'templates')
     static_dir = os.path.join(os.path.dirname(__file__), 'Frontend', 'static')
     app = Flask(__name__, static_folder=static_dir, template_folder=template_dir)
+    # First, so startup messages (seeding, backfills) already go through the queue
+    init_logging(app)
     
     app.config['COMPRESS_ENABLED'] = True
     compress.init_app(app)
@@ -28,22 +45,47 @@ def create_app():
     app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret')
+    # Operational endpoints (/api/debug/*) are disabled unless a token is set
+    app.config['ADMIN_TOKEN'] = os.getenv('ADMIN_TOKEN', '')
+    app.config['MAX_UPLOAD_SIZE'] = int(os.getenv('MAX_UPLOAD_MB', '10')) * 1024 * 1024
+    # Upload serving offload: '' (sendfile via the WSGI server), 'nginx' (X-Accel-Redirect) or 'sendfile' (X-Sendfile)
+    app.config['MEDIA_ACCEL'] = os.getenv('MEDIA_ACCEL', '').lower()
+    app.config['MEDIA_ACCEL_PREFIX'] = os.getenv('MEDIA_ACCEL_PREFIX', '/protected-uploads/')
 
     db.init_app(app)
 
     with app.app_context():
         try:
+            # Derived tables are backfilled once, when they are new
+            backfill_references = not inspect(db.engine).has_table('media_references')
+            backfill_related = not inspect(db.engine).has_table('related_articles')
             db.create_all()
+            upgrade_schema()
             from .Backend.seed import seed_data
             seed_data(app)
+            if backfill_references:
+                rebuild_media_references()
+            if backfill_related:
+                schedule_related_update(rebuild_related_articles)
         except Exception as e:
-            print(f"[ERROR] Init failed: {e}")
+            logger.error('Init failed: %s', e)
     
     app.register_blueprint(article_bp)
     app.register_blueprint(category_bp)
     app.register_blueprint(admin_bp)
     app.register_blueprint(api_bp, url_prefix='/api')
     app.register_blueprint(media_bp)
+    app.register_blueprint(debug_bp, url_prefix='/api/debug')
+
+    register_commands(app)
+    app.add_template_global(image_attrs)
+    init_assets(app)
+    init_admission(app)
+    init_instrumentation(app)
+    init_metrics(app)
+    init_query_plans(app)
+    # After the blueprints, so their views get spans
+    init_tracing(app)
 
     return app
 
@@ -1,3 +1,7 @@
 #!/bin/bash
 echo "Starting News App..."
+# Metric snapshots of the previous run's workers
+if [ -n "$METRICS_DIR" ]; then
+    rm -f "$METRICS_DIR"/metrics-*.json
+fi
 exec gunicorn app:app --bind 0.0.0.0:$PORT --timeout 120 --workers 1 --log-level info
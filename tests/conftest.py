@@ -0,0 +1,23 @@
+import pytest
+
+from news_app import create_app
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """App bound to a throwaway news.db in a temporary working directory"""
+    monkeypatch.chdir(tmp_path)
+    return create_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def media_app(tmp_path, monkeypatch):
+    """App whose database and uploads folder both live under tmp_path"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('DISK_MOUNT_PATH', str(tmp_path))
+    return create_app()
@@ -0,0 +1,71 @@
+import runpy
+import threading
+from pathlib import Path
+from unittest import mock
+
+from werkzeug.serving import make_server
+
+from benchmarks.access_log import parse_line, read_log, replay, route_of, route_report
+
+NEW_LINE = ('10.0.0.1 - - [09/Feb/2026:11:35:49 +0000] "GET /articles/12?x=1 HTTP/1.1" 200 812 "-" "curl/8.5.0" '
+            'rt_us=41602 worker=<81455> cache=-')
+OLD_LINE = '127.0.0.1 - - [09/Feb/2026:11:35:50 +0000] "GET /api/live HTTP/1.1" 200 206 "-" "curl/8.5.0"'
+
+
+def test_parse_line_with_and_without_latency():
+    entry = parse_line(NEW_LINE)
+    assert entry['duration_ms'] == 41.602 and entry['worker'] == '81455'
+    assert entry['route'] == '/articles/<id>' and entry['cache'] is None
+    old = parse_line(OLD_LINE)
+    assert old['duration_ms'] is None and old['status'] == 200
+    assert parse_line('garbage') is None
+
+
+def test_log_format_matches_parser():
+    settings = runpy.run_path(str(Path(__file__).parent.parent / 'gunicorn.conf.py'))
+    line = settings['access_log_format'] % {
+        'h': '1.2.3.4', 'l': '-', 'u': '-', 't': '[09/Feb/2026:11:35:49 +0000]', 'r': 'GET /api/sources HTTP/1.1',
+        's': '200', 'b': '10', 'f': '-', 'a': 'agent', 'D': '1500', 'p': '<7>', '{x-cache}o': 'HIT',
+        '{x-request-id}o': 'abc123',
+    }
+    entry = parse_line(line)
+    assert entry['duration_ms'] == 1.5 and entry['cache'] == 'HIT' and entry['worker'] == '7'
+    assert entry['request_id'] == 'abc123'
+
+
+def test_route_report_percentiles():
+    assert route_of('/static/uploads/' + 'a' * 64 + '.jpg') == '/static/uploads/<file>'
+    lines = [NEW_LINE.replace('rt_us=41602', f'rt_us={ms * 1000}').replace('/articles/12', f'/articles/{ms}')
+             for ms in range(1, 101)]
+    lines.append(NEW_LINE.replace('" 200 ', '" 503 '))
+    report = route_report([parse_line(line) for line in lines])
+    assert report[0]['route'] == 'GET /articles/<id>'
+    assert report[0]['count'] == 101 and report[0]['errors'] == 1
+    assert report[0]['p50_ms'] == 50 and report[0]['max_ms'] == 100
+
+
+def test_api_responses_carry_cache_status(client, app):
+    app.config['ADMIN_TOKEN'] = 'secret'
+    with mock.patch('news_app.Backend.controllers.api_controller.get_sources', return_value={'status': 'ok'}):
+        assert client.get('/api/sources').headers['X-Cache'] == 'MISS'
+        assert client.get('/api/sources').headers['X-Cache'] == 'HIT'
+        assert client.get('/api/sources?no_cache=1').headers['X-Cache'] == 'HIT'
+        assert client.get('/api/sources?no_cache=1', headers={'X-Admin-Token': 'secret'}).headers['X-Cache'] == 'BYPASS'
+
+
+def test_replay_against_local_instance(app, tmp_path):
+    log = tmp_path / 'access.log'
+    log.write_text('\n'.join([
+        OLD_LINE.replace('/api/live', '/articles'),
+        OLD_LINE.replace('/api/live', '/categories').replace(':50 ', ':51 '),
+        OLD_LINE.replace('GET /api/live', 'DELETE /api/articles/1'),
+    ]) + '\n')
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        results = replay(read_log(log), f'http://127.0.0.1:{server.port}', speed=0)
+    finally:
+        server.shutdown()
+    assert sorted(r['route'] for r in results) == ['/articles', '/categories']
+    assert all(r['status'] == 200 and r['duration_ms'] > 0 for r in results)
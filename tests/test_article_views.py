@@ -0,0 +1,90 @@
+from sqlalchemy import event
+
+from news_app.Backend.models.article_stats import ArticleStats
+from news_app.Backend.models.db import db
+from news_app.Backend.services.article_service import create_article, delete_article
+from news_app.Backend.services.view_service import (
+    HyperLogLog, get_article_views, get_view_counter, trend_increment, _log2_add
+)
+
+
+def test_hyperloglog_estimates_distinct_values():
+    sketch = HyperLogLog()
+    for i in range(5000):
+        sketch.add(f'visitor-{i % 2000}')
+    assert abs(sketch.estimate() - 2000) < 200
+
+    other = HyperLogLog()
+    for i in range(2000, 3000):
+        other.add(f'visitor-{i}')
+    sketch.merge(other)
+    assert abs(sketch.estimate() - 3000) < 300
+
+
+def test_trend_score_decays_older_views():
+    half_life = trend_increment(1, 6 * 3600) - trend_increment(1, 0)
+    assert half_life == 1
+    # Ten old views lose to ten views one day later
+    assert trend_increment(10, 0) < trend_increment(10, 86400)
+    assert _log2_add(3, 3) == 4
+
+
+def test_views_are_written_behind(client, app):
+    with app.app_context():
+        article_id = create_article('Popular', 'Body').id
+        quiet_id = create_article('Quiet', 'Body').id
+        engine = db.engine
+
+    writes = []
+    def listener(conn, cursor, statement, *args):
+        if statement.startswith(('INSERT', 'UPDATE')) and 'article_stats' in statement:
+            writes.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        for i in range(3):
+            client.get(f'/articles/{article_id}', headers={'User-Agent': f'agent-{i}'})
+        client.get(f'/articles/{quiet_id}')
+        client.get(f'/articles/{quiet_id}', headers={'Sec-Purpose': 'prefetch'})
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+    assert writes == []
+
+    counter = get_view_counter(app)
+    assert counter.flush() == 4
+    with app.app_context():
+        stats = db.session.get(ArticleStats, article_id)
+        assert stats.views == 3 and stats.unique_visitors == 3
+        assert get_article_views(quiet_id) == 1
+
+    trending = client.get('/api/articles/trending').get_json()['articles']
+    assert [a['title'] for a in trending] == ['Popular', 'Quiet']
+    assert b'Trending' in client.get('/').data
+
+
+def test_delete_follows_renumbering(client, app):
+    with app.app_context():
+        first = create_article('First', 'Body').id
+        second = create_article('Second', 'Body').id
+    client.get(f'/articles/{first}')
+    client.get(f'/articles/{second}')
+    client.get(f'/articles/{second}')
+    with app.app_context():
+        delete_article(first)
+    get_view_counter(app).flush()
+    with app.app_context():
+        # "Second" now has the first id and kept its pending views
+        assert get_article_views(first) == 2
+
+
+def test_trending_follows_delete_and_renumbering(client, app):
+    with app.app_context():
+        first = create_article('First', 'Body').id
+        second = create_article('Second', 'Body').id
+    client.get(f'/articles/{second}')
+    get_view_counter(app).flush()
+    assert client.get('/api/articles/trending').get_json()['articles'][0]['id'] == second
+    with app.app_context():
+        delete_article(first)
+    trending = client.get('/api/articles/trending').get_json()['articles']
+    assert [(a['id'], a['title']) for a in trending] == [(first, 'Second')]
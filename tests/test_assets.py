@@ -0,0 +1,51 @@
+import gzip
+
+import brotli
+
+from news_app import create_app
+from news_app.Backend.assets import build_assets
+
+
+def test_fingerprinted_assets_are_served_precompressed_and_immutable(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('TAILWIND_CMD', 'false')  # no stylesheet build in this test
+    app = create_app()
+    static_dir = tmp_path / 'static'
+    (static_dir / 'css').mkdir(parents=True)
+    (static_dir / 'css' / 'style.css').write_text('body { color: red; }\n' * 50)
+    app.static_folder = str(static_dir)
+    manifest = build_assets(app.static_folder)
+    assert manifest['css/style.css'].startswith('dist/css/style.')
+
+    # A fresh app picks up the manifest written by the build step
+    monkeypatch.setattr('news_app.Backend.assets.load_manifest', lambda _: manifest)
+    app = create_app()
+    app.static_folder = str(static_dir)
+    with app.test_request_context():
+        from flask import url_for
+        url = url_for('static', filename='css/style.css')
+    assert url == '/static/' + manifest['css/style.css']
+
+    resp = app.test_client().get(url, headers={'Accept-Encoding': 'gzip'})
+    assert resp.status_code == 200
+    assert resp.headers['Content-Encoding'] == 'gzip'
+    assert 'immutable' in resp.headers['Cache-Control']
+    assert gzip.decompress(resp.data).startswith(b'body { color: red; }')
+
+    resp = app.test_client().get(url, headers={'Accept-Encoding': 'gzip, br'})
+    assert resp.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(resp.data).startswith(b'body { color: red; }')
+
+
+def test_build_prunes_assets_older_than_the_previous_build(tmp_path, monkeypatch):
+    monkeypatch.setenv('TAILWIND_CMD', 'false')
+    css = tmp_path / 'css' / 'style.css'
+    css.parent.mkdir()
+    builds = []
+    for color in ('red', 'green', 'blue'):
+        css.write_text(f'body {{ color: {color}; }}\n')
+        builds.append(build_assets(str(tmp_path))['css/style.css'])
+    remaining = {p.name for p in (tmp_path / 'dist' / 'css').iterdir()}
+    # The previous build's files stay for pages rendered before the deploy
+    assert (tmp_path / builds[2]).name in remaining and (tmp_path / builds[1]).name + '.gz' in remaining
+    assert not any(name.startswith((tmp_path / builds[0]).name) for name in remaining)
@@ -0,0 +1,39 @@
+from collections import Counter
+
+from benchmarks.datagen import DatasetGenerator, generate_dataset
+from benchmarks.run import compare, meta_mismatches, percentile
+from news_app.Backend.models.article import Article
+from news_app.Backend.models.media_reference import MediaReference
+
+
+def test_generator_is_deterministic():
+    first = list(DatasetGenerator(seed=7).article_rows(20, [1, 2, 3], ['a.jpg']))
+    second = list(DatasetGenerator(seed=7).article_rows(20, [1, 2, 3], ['a.jpg']))
+    assert [r['title'] for r in first] == [r['title'] for r in second]
+    assert [r['content'] for r in first] == [r['content'] for r in second]
+
+
+def test_categories_follow_zipf(app):
+    with app.app_context():
+        counts = generate_dataset(articles=300, categories=10, media=20, related=False)
+        assert counts['articles'] >= 300 and counts['media'] == 20
+        per_category = Counter(c for c, in Article.query.with_entities(Article.category_id))
+        sizes = sorted(per_category.values(), reverse=True)
+        # A few large sections and a long tail
+        assert sizes[0] > 5 * sizes[-1]
+        assert MediaReference.query.count() > 0
+
+
+def test_compare_flags_regressions():
+    assert percentile([5, 1, 3, 2, 4], 50) == 3
+    assert percentile([5, 1, 3, 2, 4], 99) == 5
+    baseline = {'home': {'p50_ms': 10, 'queries': 4, 'peak_kb': 100}}
+    assert compare({'home': {'p50_ms': 11, 'queries': 4, 'peak_kb': 100}}, baseline, 0.25) == []
+    problems = compare({'home': {'p50_ms': 20, 'queries': 5, 'peak_kb': 100}}, baseline, 0.25)
+    assert len(problems) == 2
+
+
+def test_baseline_needs_the_same_run_settings():
+    meta = {'articles': 5000, 'seed': 42, 'requests': 20}
+    assert meta_mismatches(meta, dict(meta)) == []
+    assert meta_mismatches(dict(meta, requests=50), meta) == ['requests']
@@ -0,0 +1,66 @@
+from news_app.Backend.admission import TokenBuckets, get_admission
+from news_app.Backend.models.article import Article
+from news_app.Backend.models.db import db
+from news_app.Backend.services.article_service import bulk_create_articles, iter_article_payload
+
+
+def test_bulk_endpoint_reports_each_ndjson_row(app, client):
+    body = '\n'.join([
+        '{"title": "One", "content": "body", "category": "Technology"}',
+        '{"title": "Two", "content": "body", "category_id": 1}',
+        '{"title": "", "content": "body"}',
+        '{"title": "Three", "content": "body", "category": "Missing"}',
+    ])
+    resp = client.post('/api/articles/bulk', data=body, content_type='application/x-ndjson')
+    assert resp.status_code == 201
+    data = resp.get_json()
+    assert data['created'] == 2
+    assert [r['status'] for r in data['results']] == ['created', 'created', 'error', 'error']
+    assert 'Missing' in data['results'][3]['error']
+
+
+def test_bulk_create_accepts_json_array_in_chunks(app):
+    payload = '[' + ','.join(f'{{"title": "Bulk {i}", "content": "c"}}' for i in range(25)) + ']'
+    with app.app_context():
+        before = Article.query.count()
+        report = bulk_create_articles(iter_article_payload([payload]), chunk_size=10)
+        assert report['created'] == 25
+        assert Article.query.count() == before + 25
+
+
+def test_bulk_rows_with_wrong_types_are_reported_not_500(app, client):
+    body = '\n'.join([
+        '{"title": "List category", "content": "body", "category": ["Technology"]}',
+        '{"title": "Dict category", "content": "body", "category_id": {"id": 1}}',
+        '{"title": "Bool category", "content": "body", "category_id": true}',
+        '{"title": "Object content", "content": {"html": "body"}}',
+        '{"title": ["Not", "a", "string"], "content": "body"}',
+        '{"title": "Fine", "content": "body"}',
+    ])
+    resp = client.post('/api/articles/bulk', data=body, content_type='application/x-ndjson')
+    assert resp.status_code == 201
+    results = resp.get_json()['results']
+    assert [r['status'] for r in results] == ['error'] * 5 + ['created']
+    assert 'content must be a string' in results[3]['error']
+    with app.app_context():
+        assert db.session.get(Article, results[5]['id']).title == 'Fine'
+
+
+def test_bulk_import_is_not_capped_by_the_upload_limit(app, client):
+    app.config['MAX_UPLOAD_SIZE'] = 1000
+    body = '\n'.join(f'{{"title": "Long {i}", "content": "{"x" * 50000}"}}' for i in range(3))
+    resp = client.post('/api/articles/bulk', data=body, content_type='application/x-ndjson')
+    assert resp.status_code == 201
+    assert resp.get_json()['created'] == 3
+
+
+def test_bulk_endpoint_keeps_http_errors_and_is_rate_limited(app, client):
+    app.config['MAX_CONTENT_LENGTH'] = 100
+    body = '{"title": "Too big", "content": "' + 'x' * 200 + '"}'
+    resp = client.post('/api/articles/bulk', data=body, content_type='application/x-ndjson')
+    assert resp.status_code == 413
+    app.config['MAX_CONTENT_LENGTH'] = None
+    get_admission(app).limits['bulk'] = TokenBuckets(1, 0.01)
+    body = '{"title": "Small", "content": "body"}'
+    assert client.post('/api/articles/bulk', data=body, content_type='application/x-ndjson').status_code == 201
+    assert client.post('/api/articles/bulk', data=body, content_type='application/x-ndjson').status_code == 429
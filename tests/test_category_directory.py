@@ -0,0 +1,76 @@
+from sqlalchemy import event
+
+from news_app.Backend.models.db import db
+from news_app.Backend.services.article_service import create_article, delete_article
+from news_app.Backend.services.category_service import create_category, get_category_directory, slugify
+
+
+def _count_queries(app, func):
+    statements = []
+    with app.app_context():
+        engine = db.engine
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        func()
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+    return statements
+
+
+def test_directory_counts_and_lookup(app):
+    with app.app_context():
+        category = create_category('World News', 'desc')
+        article = create_article('Title', 'Body', category.id)
+        directory = get_category_directory()
+        entry = directory.by_id[category.id]
+        assert entry.slug == 'world-news' == slugify('World News!')
+        assert entry.article_count == 1
+        assert directory.resolve('world-news') is entry
+        assert directory.resolve('WORLD NEWS') is entry
+        assert directory.resolve(str(category.id)) is entry
+        assert directory.resolve('missing') is None
+
+        delete_article(article.id)
+        assert get_category_directory().by_id[category.id].article_count == 0
+
+
+def test_category_pages_do_not_query_categories(client, app):
+    client.get('/categories')
+    statements = _count_queries(app, lambda: client.get('/categories'))
+    assert not any('categories' in s for s in statements)
+
+    with app.app_context():
+        create_category('Fresh')
+    assert b'Fresh' in client.get('/categories').data
+
+
+def test_articles_filter_by_slug(client, app):
+    with app.app_context():
+        category = create_category('Local Sports')
+        create_article('Match report', 'Body', category.id)
+    page = client.get('/articles?category=local-sports').data
+    assert b'Match report' in page
+    assert b'Local Sports Articles' in page
+
+
+def test_categories_without_a_usable_slug_are_linked_by_id(client, app):
+    with app.app_context():
+        japan = create_category('日本')
+        first = create_category('Science & Tech')
+        second = create_category('Science Tech')
+        year = create_category('2024')
+        create_article('Tokyo report', 'Body', japan.id)
+        create_article('Lab notes', 'Body', first.id)
+        directory = get_category_directory()
+        assert [directory.by_id[c.id].slug for c in (japan, first, second, year)] == [None] * 4
+        assert 'science-tech' not in directory.by_slug
+        # Ids win over slugs and names; a digit-only name still resolves when it is no id
+        assert directory.resolve(str(first.id)).id == first.id
+        assert directory.resolve('2024').id == year.id
+        ids = japan.id, first.id, second.id, year.id
+    page = client.get('/categories').data.decode()
+    for cid in ids:
+        assert f'/articles?category={cid}"' in page
+    page = client.get(f'/articles?category={ids[0]}').data.decode()
+    assert 'Tokyo report' in page and 'Lab notes' not in page
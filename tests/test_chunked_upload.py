@@ -0,0 +1,41 @@
+import hashlib
+import os
+
+
+def _start(client, data, name='big.png'):
+    resp = client.post('/api/media/uploads', json={'filename': name, 'size': len(data)})
+    assert resp.status_code == 201
+    return resp.get_json()['upload_id']
+
+
+def test_chunked_upload_resumes_and_completes(media_app, tmp_path):
+    client = media_app.test_client()
+    data = os.urandom(5000)
+    upload_id = _start(client, data)
+    url = f'/api/media/uploads/{upload_id}'
+
+    assert client.put(f'{url}?offset=0', data=data[:2000]).get_json()['offset'] == 2000
+    # A retried chunk at a stale offset is refused with the expected offset
+    assert client.put(f'{url}?offset=0', data=data[:2000]).status_code == 409
+    bad = client.put(f'{url}?offset=2000', data=data[2000:4000],
+                     headers={'X-Chunk-SHA256': '0' * 64})
+    assert bad.status_code == 422
+    assert client.get(url).get_json()['offset'] == 2000
+
+    client.put(f'{url}?offset=2000', data=data[2000:])
+    resp = client.post(f'{url}/complete')
+    assert resp.status_code == 201
+    media = resp.get_json()['media']
+    assert media['sha256'] == hashlib.sha256(data).hexdigest()
+    assert media['file_size'] == 5000
+    stored = tmp_path / 'news_app' / 'Frontend' / 'static' / 'uploads' / media['filename']
+    assert stored.read_bytes() == data
+
+
+def test_chunked_upload_enforces_size_cap(media_app):
+    client = media_app.test_client()
+    too_big = media_app.config['MAX_UPLOAD_SIZE'] + 1
+    resp = client.post('/api/media/uploads', json={'filename': 'x.jpg', 'size': too_big})
+    assert resp.status_code == 413
+    assert client.post('/api/media/uploads', json={'filename': 'x.jpg', 'size': True}).status_code == 400
+    assert client.post('/api/media/uploads/' + 'a' * 32 + '/complete').status_code == 404
@@ -0,0 +1,81 @@
+from unittest import mock
+
+import pytest
+import requests
+
+from news_app.Backend import circuit_breaker, metrics
+from news_app.Backend.circuit_breaker import CircuitBreaker, CircuitOpenError
+from news_app.Backend.controllers import api_controller
+from news_app.Backend.services.news_service import newsapi_breaker
+
+
+@pytest.fixture
+def breaker_client(client):
+    newsapi_breaker.reset()
+    api_controller.clear_api_cache()
+    yield client
+    newsapi_breaker.reset()
+    api_controller.clear_api_cache()
+
+
+def ok_response():
+    response = mock.Mock(status_code=200)
+    response.json.return_value = {'status': 'ok', 'totalResults': 1, 'articles': [{'title': 'Cached'}]}
+    return response
+
+
+def test_breaker_opens_probes_and_closes(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(circuit_breaker.time, 'monotonic', lambda: clock[0])
+    breaker = CircuitBreaker('test', failure_threshold=2, reset_timeout=30)
+    breaker.before_call()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.before_call()
+    assert error.value.retry_after == 30
+    assert metrics.CIRCUIT_STATE.samples[('test', 'open')] == 1
+
+    clock[0] += 30
+    breaker.before_call()  # the probe
+    assert breaker.state == 'half_open'
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # only one probe at a time
+    breaker.record_failure()
+    assert breaker.state == 'open' and breaker.retry_after() == 30
+
+    clock[0] += 30
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == 'closed' and breaker.failures == 0
+    assert metrics.CIRCUIT_STATE.samples[('test', 'closed')] == 1
+
+
+def test_live_fails_fast_while_open(breaker_client):
+    with mock.patch('requests.get', side_effect=requests.exceptions.ReadTimeout('slow')) as get:
+        for _ in range(newsapi_breaker.failure_threshold):
+            assert breaker_client.get('/api/live').status_code == 200
+        assert newsapi_breaker.state == 'open'
+        calls = get.call_count
+        response = breaker_client.get('/api/live')
+    assert get.call_count == calls
+    assert response.status_code == 503 and int(response.headers['Retry-After']) > 0
+    assert response.get_json()['status'] == 'error'
+    assert breaker_client.get('/api/health').get_json()['newsapi']['circuit'] == 'open'
+
+
+def test_stale_payload_served_when_upstream_fails(breaker_client, monkeypatch):
+    with mock.patch('requests.get', return_value=ok_response()):
+        assert breaker_client.get('/api/live').headers['X-Cache'] == 'MISS'
+    # Let the cached payload expire
+    monkeypatch.setattr(api_controller, 'CACHE_TIMEOUT_LIVE', -1)
+    with mock.patch('requests.get', side_effect=requests.exceptions.ConnectionError('down')):
+        response = breaker_client.get('/api/live')
+    assert response.headers['X-Cache'] == 'STALE'
+    data = response.get_json()
+    assert data['stale'] is True and data['articles'][0]['title'] == 'Cached'
+
+    # Errors are not cached over the last good payload
+    with mock.patch('requests.get', side_effect=requests.exceptions.ConnectionError('down')):
+        assert breaker_client.get('/api/live').headers['X-Cache'] == 'STALE'
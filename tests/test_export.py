@@ -0,0 +1,27 @@
+import gzip
+import json
+
+from news_app.Backend.services.export_service import iter_export
+
+
+def test_export_streams_ndjson_and_resumes_after_id(app, client):
+    resp = client.get('/api/export?resource=categories')
+    assert resp.status_code == 200
+    rows = [json.loads(line) for line in resp.data.decode().splitlines()]
+    ids = [r['id'] for r in rows]
+    assert ids == sorted(ids) and len(ids) > 2
+
+    with app.app_context():
+        resumed = ''.join(iter_export('categories', 'ndjson', after_id=ids[1], chunk_size=1))
+    assert [json.loads(line)['id'] for line in resumed.splitlines()] == ids[2:]
+
+
+def test_export_rejects_unknown_resource(client):
+    assert client.get('/api/export?resource=users').status_code == 400
+
+
+def test_compressed_export_is_a_gzip_file(client):
+    resp = client.get('/api/export?resource=categories&compress=gzip')
+    assert resp.mimetype == 'application/gzip' and 'Content-Encoding' not in resp.headers
+    assert resp.headers['Content-Disposition'] == 'attachment; filename=categories.ndjson.gz'
+    assert json.loads(gzip.decompress(resp.data).decode().splitlines()[0])['id']
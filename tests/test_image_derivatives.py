@@ -0,0 +1,49 @@
+import io
+
+import pytest
+
+Image = pytest.importorskip('PIL.Image')
+
+from news_app.Backend.controllers import media_controller
+from news_app.Backend.services import image_service
+
+
+def _jpeg_with_exif(width, height):
+    img = Image.new('RGB', (width, height), (200, 30, 30))
+    exif = Image.Exif()
+    exif[0x010F] = 'CameraMaker'
+    buf = io.BytesIO()
+    img.save(buf, 'JPEG', exif=exif.tobytes())
+    return buf.getvalue()
+
+
+def test_upload_builds_stripped_variants_and_srcset(media_app, tmp_path, monkeypatch):
+    # Run the background job inline so the test can inspect its output
+    monkeypatch.setattr(media_controller, 'schedule_derivatives', image_service.build_derivatives)
+    client = media_app.test_client()
+    resp = client.post('/api/media', data={'file': (io.BytesIO(_jpeg_with_exif(800, 400)), 'photo.jpg')},
+                       content_type='multipart/form-data')
+    media = resp.get_json()['media']
+
+    manifest = image_service.get_derivatives(media['filename'])
+    assert [w for w, _ in manifest['webp']] == [320, 640]
+    assert manifest['placeholder'].startswith('data:image/webp;base64,')
+
+    variant_path = tmp_path / 'news_app' / 'Frontend' / 'static' / 'uploads' / 'derived' / manifest['jpeg'][0][1]
+    with Image.open(variant_path) as variant:
+        assert variant.width == 320
+        assert not variant.getexif()
+
+    with media_app.test_request_context(headers={'Accept': 'text/html,image/webp,*/*'}):
+        attrs = str(image_service.image_attrs(media['file_path'], '50vw'))
+        # The srcset depends on Accept, so shared caches must key on it
+        assert 'Accept' in media_app.process_response(media_app.response_class()).vary
+    assert 'loading="lazy"' in attrs
+    assert '-640.webp 640w' in attrs and 'sizes="50vw"' in attrs
+
+
+def test_image_attrs_passes_external_urls_through(media_app):
+    with media_app.test_request_context():
+        attrs = str(image_service.image_attrs('https://example.com/a.jpg', eager=True))
+    assert attrs.startswith('src="https://example.com/a.jpg"')
+    assert 'srcset' not in attrs and 'loading' not in attrs
@@ -0,0 +1,45 @@
+from news_app.Backend.instrumentation import get_instrumentation, set_request_timing, timed_phase
+
+
+def test_timing_is_off_by_default(client):
+    assert 'Server-Timing' not in client.get('/').headers
+
+
+def test_server_timing_header(client, app):
+    set_request_timing(app, True)
+    response = client.get('/articles')
+    timing = response.headers['Server-Timing']
+    assert 'db;dur=' in timing and 'queries"' in timing
+    assert 'tpl;dur=' in timing and 'total;dur=' in timing
+
+    set_request_timing(app, False)
+    assert 'Server-Timing' not in client.get('/articles').headers
+    assert not get_instrumentation(app)._engines
+
+
+def test_slow_logs(client, app, caplog):
+    set_request_timing(app, True, slow_query_ms=0, slow_request_ms=0)
+    client.get('/articles?page=1')
+    messages = [r.getMessage() for r in caplog.records if r.levelname == 'WARNING']
+    assert any(m.startswith('Slow query') and '[GET /articles]' in m and 'params=' in m for m in messages)
+    assert any(m.startswith('Slow request GET /articles?page=1') for m in messages)
+
+
+def test_timed_phase_and_runtime_switch(client, app):
+    @app.route('/_phase')
+    def phase():
+        with timed_phase('newsapi'):
+            pass
+        return 'ok'
+
+    assert client.post('/api/debug/timing', json={'enabled': True}).status_code == 403
+    app.config['ADMIN_TOKEN'] = 'secret'
+    client.environ_base['HTTP_X_ADMIN_TOKEN'] = 'secret'
+    response = client.post('/api/debug/timing', json={'enabled': True, 'slow_query_ms': 250})
+    assert response.get_json() == {'enabled': True, 'slow_query_ms': 250.0, 'slow_request_ms': 1000.0}
+    assert 'newsapi;dur=' in client.get('/_phase').headers['Server-Timing']
+    assert client.post('/api/debug/timing', json={'slow_query_ms': 50, 'slow_request_ms': 'x'}).status_code == 400
+    assert get_instrumentation(app).slow_query_ms == 250.0
+    # Changing a threshold alone keeps timing on
+    assert client.post('/api/debug/timing', json={'slow_request_ms': 500}).get_json()['enabled'] is True
+    assert client.post('/api/debug/timing', json={'enabled': False}).get_json()['enabled'] is False
@@ -0,0 +1,67 @@
+from news_app.Backend.logging_setup import (
+    DroppingQueueHandler, JsonFormatter, RequestContextFilter, SamplingFilter, configure_logging
+)
+import json
+import logging
+import queue
+import sys
+
+
+def make_record(msg, *args, level=logging.INFO, name='news_app.test'):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+def test_json_records_carry_request_context(client, app, caplog):
+    @app.route('/_log')
+    def log_something():
+        logging.getLogger('news_app.test').info('Handled %s', 'thing', extra={'article_id': 7})
+        return 'ok'
+
+    response = client.get('/_log', headers={'X-Request-ID': 'req-123'})
+    assert response.headers['X-Request-ID'] == 'req-123'
+    record = next(r for r in caplog.records if r.name == 'news_app.test')
+
+    handler = configure_logging()
+    prepared = handler.prepare(record)
+    RequestContextFilter().filter(prepared)
+    data = json.loads(JsonFormatter().format(prepared))
+    assert data['msg'] == 'Handled thing' and data['level'] == 'INFO' and data['article_id'] == 7
+
+    with app.test_request_context('/articles', headers={'X-Request-ID': 'abc'}):
+        app.preprocess_request()
+        record = make_record('inside')
+        RequestContextFilter().filter(record)
+        assert (record.request_id, record.method, record.path) == ('abc', 'GET', '/articles')
+
+
+def test_invalid_request_id_is_replaced(client):
+    generated = client.get('/', headers={'X-Request-ID': 'not a valid id!'}).headers['X-Request-ID']
+    assert len(generated) == 32 and generated != client.get('/').headers['X-Request-ID']
+
+
+def test_sampling_reports_suppressed_records(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr('news_app.Backend.logging_setup.time.monotonic', lambda: clock[0])
+    sampler = SamplingFilter(burst=3, window=60)
+    passed = [sampler.filter(make_record('Could not remove %s', n)) for n in range(10)]
+    assert passed.count(True) == 3
+    assert sampler.filter(make_record('Other message'))
+
+    clock[0] = 61
+    record = make_record('Could not remove %s', 'x')
+    assert sampler.filter(record) and record.suppressed == 7
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = DroppingQueueHandler(queue.Queue(2))
+    for n in range(5):
+        handler.handle(make_record('message %s', n))
+    assert handler.queue.qsize() == 2 and handler.dropped == 3
+
+    try:
+        raise ValueError('boom')
+    except ValueError:
+        record = logging.LogRecord('news_app.test', logging.ERROR, __file__, 1, 'failed %s', ('x',), sys.exc_info())
+    prepared = handler.prepare(record)
+    assert prepared.msg == 'failed x' and prepared.args is None and 'ValueError: boom' in prepared.exc_text
+    assert 'ValueError: boom' in json.loads(JsonFormatter().format(prepared))['exc']
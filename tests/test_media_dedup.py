@@ -0,0 +1,37 @@
+import io
+import os
+
+
+def _upload(client, data, name):
+    return client.post('/api/media', data={'file': (io.BytesIO(data), name)},
+                       content_type='multipart/form-data')
+
+
+def test_reupload_returns_existing_media(media_app, tmp_path):
+    media_client = media_app.test_client()
+    first = _upload(media_client, b'\x89PNG same bytes', 'a.png')
+    assert first.status_code == 201
+    media = first.get_json()['media']
+    assert media['filename'] == media['sha256'] + '.png'
+
+    second = _upload(media_client, b'\x89PNG same bytes', 'copy.png')
+    assert second.status_code == 200
+    assert second.get_json()['duplicate'] is True
+    assert second.get_json()['media']['id'] == media['id']
+
+    upload_dir = tmp_path / 'news_app' / 'Frontend' / 'static' / 'uploads'
+    assert [f for f in os.listdir(upload_dir) if f != 'derived'] == [media['filename']]
+    assert media_client.get('/api/media/count').get_json()['count'] == 1
+
+
+def test_upload_size_is_enforced_while_streaming(media_app, tmp_path):
+    media_client = media_app.test_client()
+    media_app.config['MAX_UPLOAD_SIZE'] = 1000
+    resp = _upload(media_client, b'\x89PNG' + b'x' * 2000, 'big.png')
+    assert resp.status_code == 413 and 'error' in resp.get_json()
+    upload_dir = tmp_path / 'news_app' / 'Frontend' / 'static' / 'uploads'
+    assert not upload_dir.exists() or os.listdir(upload_dir) == []
+
+    # Bodies larger than the file limit plus the multipart envelope are refused
+    resp = _upload(media_client, b'\x89PNG' + b'x' * 70000, 'big.png')
+    assert resp.status_code == 413 and 'error' in resp.get_json()
@@ -0,0 +1,95 @@
+import io
+import os
+import threading
+
+from news_app.Backend.services import media_service
+from news_app.Backend.services.media_gc_service import collect_garbage
+from news_app.Backend.services.media_service import create_media
+
+
+def _upload_dir(tmp_path):
+    path = tmp_path / 'news_app' / 'Frontend' / 'static' / 'uploads'
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def test_collect_garbage_removes_orphans_and_reports_missing(media_app, tmp_path):
+    upload_dir = _upload_dir(tmp_path)
+    (upload_dir / 'kept.png').write_bytes(b'kept')
+    (upload_dir / 'orphan.png').write_bytes(b'orphan bytes')
+    (upload_dir / '.upload-dead.part').write_bytes(b'xx')
+    (upload_dir / 'derived').mkdir()
+    (upload_dir / 'derived' / 'gone.json').write_text('{}')
+    (upload_dir / 'derived' / 'kept.json').write_text('{}')
+
+    with media_app.app_context():
+        create_media('kept.png', 'kept.png', 'image/png', 4, str(upload_dir / 'kept.png'))
+        missing = create_media('missing.png', 'missing.png', 'image/png', 4, str(upload_dir / 'missing.png'))
+
+        dry = collect_garbage(dry_run=True, min_age_seconds=0, batch_size=1)
+        assert dry['orphan_files'] == 3
+        assert (upload_dir / 'orphan.png').exists()
+
+        report = collect_garbage(min_age_seconds=0, batch_size=1)
+        assert report['orphan_files'] == 3
+        assert report['reclaimed_bytes'] == len(b'orphan bytes') + 2 + 2
+        assert report['missing_media_ids'] == [missing.id]
+        assert report['rows_pruned'] == 0
+
+        pruned = collect_garbage(min_age_seconds=0, prune_rows=True)
+        assert pruned['rows_pruned'] == 1
+
+    assert sorted(os.listdir(upload_dir)) == ['derived', 'kept.png']
+    assert os.listdir(upload_dir / 'derived') == ['kept.json']
+
+
+def test_collect_garbage_quarantine_and_grace_period(media_app, tmp_path):
+    upload_dir = _upload_dir(tmp_path)
+    (upload_dir / 'fresh.png').write_bytes(b'fresh')
+    (upload_dir / 'old.png').write_bytes(b'old')
+    os.utime(upload_dir / 'old.png', (0, 0))
+
+    with media_app.app_context():
+        report = collect_garbage(quarantine=True)
+
+    assert report['orphan_files'] == 1
+    assert report['quarantined_bytes'] == 3
+    assert [p.read_bytes() for p in (upload_dir / '.quarantine').glob('old-*.png')] == [b'old']
+    assert (upload_dir / 'fresh.png').exists()
+
+
+def test_delete_removes_file_in_background(media_app, tmp_path):
+    client = media_app.test_client()
+    media = client.post('/api/media', data={'file': (io.BytesIO(b'\x89PNG delete me'), 'd.png')},
+                        content_type='multipart/form-data').get_json()['media']
+    file_path = _upload_dir(tmp_path) / media['filename']
+    assert file_path.exists()
+
+    assert client.delete(f'/api/media/{media["id"]}').status_code == 200
+    assert not file_path.exists()
+    media_service._delete_executor.submit(lambda: None).result()
+    assert [f for f in os.listdir(file_path.parent) if f != 'derived'] == []
+
+
+def test_reupload_during_delete_keeps_the_new_file(media_app, tmp_path):
+    client = media_app.test_client()
+    data = b'\x89PNG deleted and uploaded again'
+    media = client.post('/api/media', data={'file': (io.BytesIO(data), 'd.png')},
+                        content_type='multipart/form-data').get_json()['media']
+    derived = _upload_dir(tmp_path) / 'derived'
+    derived.mkdir(exist_ok=True)
+    manifest = derived / (media['sha256'] + '.json')
+    manifest.write_text('{}')
+
+    # Hold the delete worker until the content is back
+    uploaded_again = threading.Event()
+    media_service._delete_executor.submit(uploaded_again.wait, 5)
+    assert client.delete(f'/api/media/{media["id"]}').status_code == 200
+    again = client.post('/api/media', data={'file': (io.BytesIO(data), 'd.png')},
+                        content_type='multipart/form-data')
+    assert again.status_code == 201
+    uploaded_again.set()
+    media_service._delete_executor.submit(lambda: None).result()
+
+    assert (_upload_dir(tmp_path) / media['filename']).read_bytes() == data
+    assert manifest.exists()
@@ -0,0 +1,79 @@
+from news_app.Backend.models.db import db
+from news_app.Backend.models.media import Media
+from news_app.Backend.services.media_service import create_media
+
+
+def _add_media(count):
+    for i in range(count):
+        create_media(
+            filename=f'file{i}.{"png" if i % 2 else "gif"}',
+            original_name=f'{"cat" if i < 3 else "dog"}-{i}.png',
+            file_type='image/png' if i % 2 else 'image/gif',
+            file_size=1536,
+            file_path=f'/tmp/file{i}'
+        )
+
+
+def test_file_size_formatted_does_not_modify_row(app):
+    with app.app_context():
+        _add_media(1)
+        media = Media.query.first()
+        assert media.file_size_formatted == '1.5 KB'
+        assert media.file_size == 1536
+        assert media not in db.session.dirty
+
+
+def test_media_api_paginates_with_cursor(client, app):
+    with app.app_context():
+        _add_media(5)
+    first = client.get('/api/media?limit=2').get_json()
+    assert [m['id'] for m in first['media']] == [5, 4]
+    assert first['total'] == 5
+
+    seen = [m['id'] for m in first['media']]
+    cursor = first['next_cursor']
+    while cursor:
+        page = client.get(f'/api/media?limit=2&cursor={cursor}').get_json()
+        seen += [m['id'] for m in page['media']]
+        cursor = page['next_cursor']
+    assert seen == [5, 4, 3, 2, 1]
+
+
+def test_media_api_filters(client, app):
+    with app.app_context():
+        _add_media(5)
+    gifs = client.get('/api/media?type=image/gif').get_json()['media']
+    assert sorted(m['id'] for m in gifs) == [1, 3, 5]
+    images = client.get('/api/media?type=image/').get_json()['media']
+    assert len(images) == 5
+    cats = client.get('/api/media?q=cat').get_json()['media']
+    assert sorted(m['original_name'] for m in cats) == ['cat-0.png', 'cat-1.png', 'cat-2.png']
+    assert client.get('/api/media?since=2999-01-01').get_json()['media'] == []
+
+
+def test_filtered_pages_follow_the_filtered_column(client, app):
+    with app.app_context():
+        _add_media(5)
+
+    def pages(query):
+        seen, cursor = [], ''
+        while True:
+            page = client.get(f'/api/media?limit=2&{query}&cursor={cursor}').get_json()
+            seen += [m['id'] for m in page['media']]
+            cursor = page['next_cursor']
+            if not cursor:
+                return seen
+
+    assert pages('since=2000-01-01') == [5, 4, 3, 2, 1]
+    assert pages('q=dog') == [4, 5]
+    assert pages('type=image/gif') == [5, 3, 1]
+
+
+def test_media_usage_totals(client, app):
+    with app.app_context():
+        _add_media(3)
+    usage = client.get('/api/media/usage').get_json()
+    assert usage['count'] == 3
+    assert usage['bytes'] == 3 * 1536
+    assert usage['by_type']['image/gif']['count'] == 2
+    assert usage['by_type']['image/png']['bytes'] == 1536
@@ -0,0 +1,57 @@
+from news_app.Backend.services.article_service import (
+    bulk_create_articles, create_article, delete_article, update_article
+)
+from news_app.Backend.services.media_reference_service import (
+    count_media_usages, extract_upload_filenames, get_media_articles, rebuild_media_references
+)
+from news_app.Backend.services.media_service import create_media
+
+
+def _media(name):
+    return create_media(name, name, 'image/png', 10, '/tmp/' + name)
+
+
+def test_extract_upload_filenames_ignores_derived_variants():
+    content = ('<img src="https://example.com/static/uploads/a.png"> '
+               '<img src="/static/uploads/derived/b-320.webp"> /static/uploads/c.jpg')
+    assert extract_upload_filenames(content, None) == {'a.png', 'c.jpg'}
+
+
+def test_references_follow_article_writes(app):
+    with app.app_context():
+        cover, inline = _media('cover.png'), _media('inline.png')
+        first = create_article('First', 'text', image_url='/static/uploads/cover.png')
+        second = create_article('Second', 'see /static/uploads/inline.png', image_url='/static/uploads/cover.png')
+        assert count_media_usages([cover.id, inline.id]) == {cover.id: 2, inline.id: 1}
+
+        update_article(second.id, 'Second', 'no images', image_url='/static/uploads/cover.png')
+        assert count_media_usages([inline.id]) == {}
+
+        # Deleting the first article renumbers the second one to its id
+        delete_article(first.id)
+        assert [a.title for a in get_media_articles(cover.id)] == ['Second']
+        assert get_media_articles(cover.id)[0].id == first.id
+
+
+def test_bulk_import_and_rebuild_index_references(app):
+    with app.app_context():
+        media = _media('bulk.png')
+        bulk_create_articles([
+            {'title': 'A', 'content': 'plain'},
+            {'title': 'B', 'content': 'x', 'image_url': '/static/uploads/bulk.png'},
+        ])
+        assert [a.title for a in get_media_articles(media.id)] == ['B']
+        assert rebuild_media_references() == 1
+
+
+def test_media_articles_api_and_delete(client, app):
+    with app.app_context():
+        media_id = _media('used.png').id
+        create_article('Uses it', 'x', image_url='/static/uploads/used.png')
+    data = client.get(f'/api/media/{media_id}/articles').get_json()
+    assert data['count'] == 1 and data['articles'][0]['title'] == 'Uses it'
+    assert client.get('/api/media').get_json()['media'][0]['used_by'] == 1
+
+    assert client.delete(f'/api/media/{media_id}').status_code == 200
+    with app.app_context():
+        assert count_media_usages([media_id]) == {}
@@ -0,0 +1,55 @@
+from unittest import mock
+
+import requests
+
+from news_app.Backend import metrics
+from news_app.Backend.metrics import SnapshotWriter, merge_snapshots, render_metrics
+from news_app.Backend.services.news_service import top_headlines
+
+
+def _metric_value(text, line_prefix):
+    for line in text.splitlines():
+        if line.startswith(line_prefix):
+            return float(line.rsplit(' ', 1)[1])
+    return 0.0
+
+
+def test_metrics_endpoint_counts_requests(client):
+    before = _metric_value(client.get('/metrics').text,
+                           'http_requests_total{endpoint="articles.articles_page",method="GET",status="200"}')
+    client.get('/articles')
+    client.get('/categories')
+    text = client.get('/metrics').text
+    assert _metric_value(text, 'http_requests_total{endpoint="articles.articles_page",method="GET",status="200"}') \
+        == before + 1
+    assert '# TYPE http_request_duration_seconds histogram' in text
+    assert 'http_request_duration_seconds_bucket{endpoint="articles.articles_page",method="GET",le="+Inf"}' in text
+    assert 'db_pool_connections{state="checkedout"}' in text
+    assert 'cache_lookups_total{cache="category_directory",result="hit"}' in text
+
+
+def test_newsapi_calls_are_recorded(app):
+    response = mock.Mock(status_code=200)
+    response.json.return_value = {'status': 'ok', 'articles': []}
+    with mock.patch('requests.get', return_value=response):
+        top_headlines()
+    with mock.patch('requests.get', side_effect=requests.exceptions.ConnectTimeout('slow')):
+        assert top_headlines()['status'] == 'error'
+    samples = metrics.NEWSAPI_REQUESTS.samples
+    assert samples[('top-headlines', '200')] >= 1
+    assert samples[('top-headlines', 'error')] >= 1
+
+
+def test_snapshots_merge_across_workers(tmp_path):
+    writer = SnapshotWriter(str(tmp_path))
+    writer.write()
+    own = writer.read_all()[0]
+    dead_worker = {'pid': 2 ** 22 + 1, 'metrics': {
+        'http_requests_total': {'kind': 'counter', 'samples': [[['x', 'GET', '200'], 3]]},
+        'db_pool_connections': {'kind': 'gauge', 'samples': [[['test'], 5]]},
+    }}
+    merged = merge_snapshots([own, dead_worker, dict(dead_worker, pid=own['pid'])])
+    # Counters keep the totals of exited workers, gauges only count live ones
+    assert merged['http_requests_total'][('x', 'GET', '200')] == 6
+    assert merged['db_pool_connections'][('test',)] == 5
+    assert 'http_requests_total{endpoint="x",method="GET",status="200"} 6' in render_metrics(merged)
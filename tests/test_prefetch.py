@@ -0,0 +1,73 @@
+from unittest import mock
+
+import pytest
+
+from news_app.Backend import metrics
+from news_app.Backend.controllers import api_controller
+from news_app.Backend.services.news_service import newsapi_breaker
+
+
+@pytest.fixture
+def prefetch_client(client):
+    newsapi_breaker.reset()
+    api_controller.clear_api_cache()
+    yield client
+    api_controller.clear_api_cache()
+
+
+def page_response(total=60):
+    response = mock.Mock(status_code=200)
+    response.json.return_value = {'status': 'ok', 'totalResults': total, 'articles': [{'title': 'A'}]}
+    return response
+
+
+def drain():
+    api_controller._prefetch_executor.submit(lambda: None).result()
+
+
+def requested_pages(get):
+    return [call.kwargs['params']['page'] for call in get.call_args_list]
+
+
+def test_next_page_is_prefetched(prefetch_client):
+    used = metrics.NEWSAPI_PREFETCHES.samples.get(('used',), 0)
+    with mock.patch('requests.get', return_value=page_response()) as get:
+        assert prefetch_client.get('/api/search?q=mars&pageSize=20').headers['X-Cache'] == 'MISS'
+        drain()
+        # Nobody has paged through this query yet
+        assert requested_pages(get) == [1]
+        assert prefetch_client.get('/api/search?q=mars&pageSize=20&page=2').headers['X-Cache'] == 'MISS'
+        drain()
+        assert requested_pages(get) == [1, 2, 3]
+        # Page 3 is the last one (60 results), so nothing follows it
+        assert prefetch_client.get('/api/search?q=mars&pageSize=20&page=3').headers['X-Cache'] == 'HIT'
+        drain()
+    assert requested_pages(get) == [1, 2, 3]
+    assert metrics.NEWSAPI_PREFETCHES.samples[('used',)] == used + 1
+
+
+def test_prefetch_budgets_and_open_circuit(prefetch_client, monkeypatch):
+    monkeypatch.setattr(api_controller, 'PREFETCH_PAGES_PER_KEY', 1)
+    with mock.patch('requests.get', return_value=page_response(total=100)) as get:
+        prefetch_client.get('/api/live?pageSize=20&page=2')
+        drain()
+        prefetch_client.get('/api/live?pageSize=20&page=3')
+        drain()
+    assert requested_pages(get) == [2, 3]
+
+    # Nothing is prefetched while NewsAPI is failing
+    fetch = mock.Mock()
+    params = dict(country='us', category='science', page=2, page_size=20)
+    for _ in range(newsapi_breaker.failure_threshold):
+        newsapi_breaker.record_failure()
+    assert not api_controller._schedule_prefetch('live', fetch, params, {'totalResults': 60}, 300)
+    newsapi_breaker.reset()
+    assert api_controller._schedule_prefetch('live', fetch, params, {'totalResults': 60}, 300)
+    drain()
+    fetch.assert_called_once_with(country='us', category='science', page=3, page_size=20)
+
+    # The daily budget covers all queries
+    monkeypatch.setattr(api_controller, '_prefetch_day', [0, 0])
+    monkeypatch.setattr(api_controller, 'PREFETCH_PER_DAY', 0)
+    params = dict(country='us', category='health', page=2, page_size=20)
+    assert not api_controller._schedule_prefetch('live', fetch, params, {'totalResults': 60}, 300)
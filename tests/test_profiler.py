@@ -0,0 +1,70 @@
+import threading
+import time
+
+import pytest
+
+from news_app.Backend import profiler
+from news_app.Backend.profiler import collapse_stack, sample_stacks
+
+
+@pytest.fixture
+def admin(client, app, tmp_path, monkeypatch):
+    monkeypatch.setattr(profiler, 'PROFILE_DIR', str(tmp_path / 'profiles'))
+    app.config['ADMIN_TOKEN'] = 'secret'
+    client.environ_base['HTTP_AUTHORIZATION'] = 'Bearer secret'
+    yield client
+    profiler.stop_memory_tracing()
+
+
+def _busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sampler_collapses_stacks():
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_loop, args=(stop,), name='busy')
+    worker.start()
+    try:
+        stacks, samples = sample_stacks(0.2, interval=0.005)
+    finally:
+        stop.set()
+        worker.join()
+    assert samples > 5
+    busy = [stack for stack in stacks if stack.startswith('busy;')]
+    assert any('test_profiler:_busy_loop' in stack for stack in busy)
+    assert collapse_stack(None, 'root') == 'root'
+
+
+def test_endpoints_require_admin_token(client, app):
+    assert client.post('/api/debug/profile?seconds=1').status_code == 403
+    app.config['ADMIN_TOKEN'] = 'secret'
+    assert client.post('/api/debug/profile?seconds=1', headers={'X-Admin-Token': 'wrong'}).status_code == 403
+
+
+def test_profile_endpoint_returns_folded_file(admin):
+    assert admin.post('/api/debug/profile?seconds=500').status_code == 400
+    started = admin.post('/api/debug/profile?seconds=0.2&interval_ms=5')
+    assert started.status_code == 202
+    url = started.get_json()['url']
+    assert admin.post('/api/debug/profile?seconds=1').status_code == 409
+    deadline = time.monotonic() + 5
+    response = admin.get(url)
+    while response.status_code == 202 and time.monotonic() < deadline:
+        time.sleep(0.05)
+        response = admin.get(url)
+    assert response.status_code == 200
+    assert 'attachment' in response.headers['Content-Disposition']
+    line = response.text.splitlines()[0]
+    assert ';' in line and line.rsplit(' ', 1)[1].isdigit()
+    assert admin.get('/api/debug/profile/../../etc').status_code == 404
+
+
+def test_memory_diff_shows_growth(admin):
+    assert admin.get('/api/debug/memory/diff').status_code == 409
+    assert 'traced_kb' in admin.post('/api/debug/memory/snapshot').get_json()
+    leak = [bytearray(1024) for _ in range(500)]
+    diff = admin.get('/api/debug/memory/diff?limit=5').get_json()
+    assert any('test_profiler.py' in site['site'] and site['size_diff_kb'] >= 400 for site in diff['sites'])
+    assert admin.delete('/api/debug/memory').status_code == 204
+    assert leak
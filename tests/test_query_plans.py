@@ -0,0 +1,73 @@
+import threading
+from datetime import datetime
+
+import pytest
+from click.testing import CliRunner
+
+from news_app.Backend.commands import query_plans_command
+from news_app.Backend.models.article import Article
+from news_app.Backend.query_plans import QueryPlanRecorder, assert_uses_index, capture_query_plans, plan_problems
+from news_app.Backend.models.db import db
+from news_app.Backend.services.article_service import (
+    count_articles_this_week, count_articles_today, list_articles, list_articles_by_category
+)
+from news_app.Backend.services import related_service
+from news_app.Backend.services.media_service import list_media_page
+
+
+def test_plan_problems():
+    assert plan_problems(['SCAN articles', 'USE TEMP B-TREE FOR ORDER BY']) == \
+        ['SCAN articles', 'USE TEMP B-TREE FOR ORDER BY']
+    assert plan_problems(['SCAN articles USING INDEX ix_articles_created_at',
+                          'SEARCH media USING INDEX ix_media_file_type (file_type>?)']) == []
+
+
+def test_article_listings_use_indexes(app):
+    with app.app_context():
+        assert_uses_index('ix_articles_created_at', list_articles, page=2, per_page=12)
+        assert_uses_index('ix_articles_category_id_created_at', list_articles_by_category, 1, page=1, per_page=12)
+        assert_uses_index('ix_articles_created_at', count_articles_today)
+        assert_uses_index('ix_articles_created_at', count_articles_this_week)
+        assert_uses_index('ix_media_file_type', list_media_page, file_type='image/')
+        # Range filters are returned in index order, not re-sorted by id
+        with capture_query_plans() as recorder:
+            list_media_page(since=datetime(2000, 1, 1))
+            list_media_page(name_prefix='cat', cursor='cat-1.png|2')
+        assert not any(plan_problems(entry['plan']) for entry in recorder.plans.values()), recorder.format()
+        with pytest.raises(AssertionError, match='did not use index ix_media_sha256'):
+            assert_uses_index('ix_media_sha256', list_articles, page=1, per_page=12)
+
+
+def test_capture_names_the_calling_service(app):
+    # Startup may have queued a related-articles rebuild
+    related_service._executor.submit(lambda: None).result()
+    with app.app_context():
+        with capture_query_plans() as recorder:
+            list_articles(page=1, per_page=5)
+            # Statements from other threads are not attributed to this block
+            def count_elsewhere():
+                with app.app_context():
+                    count_articles_today()
+            other = threading.Thread(target=count_elsewhere)
+            other.start()
+            other.join()
+        callers = {entry['caller'] for entry in recorder.plans.values()}
+        assert callers == {'article_service.list_articles'}
+
+
+def test_report_lists_problem_statements(app, tmp_path):
+    log_path = str(tmp_path / 'plans.jsonl')
+    recorder = QueryPlanRecorder(log_path)
+    with app.app_context():
+        recorder.attach(db.engine)
+        try:
+            Article.query.filter(Article.author == 'nobody').all()
+            list_articles(page=1, per_page=5)
+        finally:
+            recorder.detach(db.engine)
+
+    result = CliRunner().invoke(query_plans_command, ['--log', log_path])
+    assert result.exit_code == 0
+    assert 'SCAN articles\n' in result.output and 'articles.author = ?' in result.output
+    assert 'ORDER BY articles.created_at DESC' not in result.output
+    assert '[INFO] 1 of ' in result.output
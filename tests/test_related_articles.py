@@ -0,0 +1,87 @@
+import pytest
+
+from news_app.Backend.models.article import Article
+from news_app.Backend.models.db import db
+from news_app.Backend.services import related_service
+from news_app.Backend.services.article_service import create_article, delete_article, update_article
+from news_app.Backend.services.related_service import TfidfIndex, get_related_articles, tokenize
+
+
+def _drain():
+    related_service._executor.submit(lambda: None).result()
+
+
+def _titles(article_id):
+    return [a.title for a in get_related_articles(article_id)]
+
+
+def test_tokenize_strips_markup_and_stopwords():
+    counts = tokenize('Solar Power', '<p>The solar farm and the grid</p>')
+    assert counts['solar'] == 4
+    assert 'the' not in counts and 'p' not in counts
+
+
+def test_index_neighbours_ranks_by_cosine():
+    index = TfidfIndex()
+    index.add(1, tokenize('Solar power record', 'solar panels grid'))
+    index.add(2, tokenize('Solar grid expansion', 'solar panels installed'))
+    index.add(3, tokenize('Football final', 'goal penalty stadium'))
+    neighbours = index.neighbours(1)
+    assert [doc for doc, _ in neighbours] == [2]
+    assert 0 < neighbours[0][1] <= 1
+
+
+def test_pruned_terms_are_left_out_of_the_norm(monkeypatch):
+    monkeypatch.setattr(related_service, 'MIN_DOCS_FOR_TERM_PRUNING', 1)
+    monkeypatch.setattr(related_service, 'MAX_TERM_SHARE', 0.5)
+    index = TfidfIndex()
+    index.add(1, tokenize('Comet', 'update'))
+    index.add(2, tokenize('Comet', 'update'))
+    index.add(3, tokenize('Harbour', 'update'))
+    index.add(4, tokenize('Tennis', 'match'))
+    # "update" is in 3 of 4 articles and pruned, so only "comet" is scored
+    assert index.neighbours(1) == [(2, pytest.approx(1.0))]
+
+
+def test_related_articles_follow_writes(app):
+    with app.app_context():
+        Article.query.delete()
+        db.session.commit()
+        solar = create_article('Solar farm opens', 'solar panels feed the regional grid')
+        grid = create_article('Grid upgrade', 'regional grid ready for solar panels')
+        football = create_article('Cup final', 'late goal wins the football cup')
+        _drain()
+        assert _titles(solar.id) == ['Grid upgrade']
+        assert _titles(football.id) == []
+
+        update_article(football.id, 'Cup final', 'solar panels power the stadium grid')
+        _drain()
+        assert 'Cup final' in _titles(solar.id)
+
+        solar_id = solar.id
+        delete_article(solar_id)
+        _drain()
+        # The grid article took over the deleted id and no longer lists the deleted article
+        assert _titles(solar_id) == ['Cup final']
+
+
+def test_article_detail_renders_related(client, app):
+    with app.app_context():
+        first = create_article('Rainfall record broken', 'heavy rainfall floods the valley')
+        create_article('Valley floods again', 'rainfall swells the valley river')
+        _drain()
+        first_id = first.id
+    page = client.get(f'/articles/{first_id}').data
+    assert b'Valley floods again' in page
+
+
+def test_common_terms_are_pruned_in_large_corpora(monkeypatch):
+    monkeypatch.setattr(related_service, 'MIN_DOCS_FOR_TERM_PRUNING', 1)
+    monkeypatch.setattr(related_service, 'MAX_TERM_SHARE', 0.5)
+    index = TfidfIndex()
+    index.add(1, tokenize('Comet', 'update'))
+    index.add(2, tokenize('Harbour', 'update'))
+    index.add(3, tokenize('Tennis', 'update'))
+    index.add(4, tokenize('Comet', 'sighting'))
+    # "update" is in 3 of 4 articles, so only "comet" links anything
+    assert [doc for doc, _ in index.neighbours(1)] == [4]
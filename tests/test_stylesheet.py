@@ -0,0 +1,52 @@
+import sys
+
+from news_app import create_app
+from news_app.Backend import assets
+from news_app.Backend.stylesheet import minify_css, purge_css
+
+FAKE_TAILWIND = '''
+import sys
+out = sys.argv[sys.argv.index('-o') + 1]
+with open(out, 'w') as f:
+    f.write('.flex{display:flex}.lg\\\\:hidden{display:none}')
+'''
+
+
+def test_purge_keeps_used_selectors_and_keyframes():
+    css = '''
+    /* comment */
+    .used, .unused { color: red; }
+    .unused:hover { color: blue; }
+    body { margin: 0; }
+    @media (min-width: 1024px) { .unused { display: none; } .used > a { display: block; } }
+    @keyframes spin { from { opacity: 0; } to { opacity: 1; } }
+    '''
+    purged = minify_css(purge_css(css, {'used'}))
+    assert purged == ('.used{color:red}body{margin:0}'
+                      '@media (min-width:1024px){.used>a{display:block}}'
+                      '@keyframes spin{from{opacity:0}to{opacity:1}}')
+
+
+def test_layout_uses_prebuilt_stylesheet_instead_of_cdn(tmp_path, monkeypatch):
+    script = tmp_path / 'fake_tailwind.py'
+    script.write_text(FAKE_TAILWIND)
+    monkeypatch.setenv('TAILWIND_CMD', f'{sys.executable} {script}')
+    static_dir = tmp_path / 'static'
+    (static_dir / 'css').mkdir(parents=True)
+    (static_dir / 'css' / 'style.css').write_text('.sidebar{width:16rem}.never-used-anywhere{color:red}')
+    manifest = assets.build_assets(str(static_dir))
+    app_css = (static_dir / manifest['css/app.css']).read_text()
+    assert '.flex{display:flex}' in app_css and '.sidebar{width:16rem}' in app_css
+    assert 'never-used-anywhere' not in app_css
+    critical = (static_dir / 'dist' / 'critical' / 'layout.css').read_text()
+    assert '.sidebar' in critical
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(assets, 'DEFAULT_STATIC_DIR', str(static_dir))
+    app = create_app()
+    app.static_folder = str(static_dir)
+    assets.init_assets(app)
+    html = app.test_client().get('/').data.decode()
+    assert 'cdn.tailwindcss.com' not in html
+    assert '/static/' + manifest['css/app.css'] in html
+    assert '.sidebar{width:16rem}' in html
@@ -0,0 +1,88 @@
+from news_app.Backend import tracing
+from news_app.Backend.tracing import (
+    _export_executor, format_trace, read_traces, set_tracing, span, traced
+)
+
+TRACEPARENT = '00-' + 'a' * 32 + '-' + 'b' * 16 + '-01'
+
+
+def drain_exports():
+    _export_executor.submit(lambda: None).result()
+
+
+def test_sampled_request_writes_otlp_trace(client, app, tmp_path):
+    path = tmp_path / 'traces.jsonl'
+    set_tracing(app, True, str(path), sample_rate=1.0)
+    response = client.get('/articles')
+    drain_exports()
+
+    traces = read_traces(path)
+    assert list(traces) == [response.headers['X-Trace-Id']]
+    spans = traces[response.headers['X-Trace-Id']]
+    by_name = {data['name']: data for data in spans}
+    root = by_name['GET /articles']
+    assert root['kind'] == 2 and 'parentSpanId' not in root
+    view = by_name['view articles.articles_page']
+    assert view['parentSpanId'] == root['spanId']
+    assert by_name['article_service.list_articles']['parentSpanId'] == view['spanId']
+    assert any(name.startswith('render ') for name in by_name)
+    assert any(data['name'] == 'sql SELECT' for data in spans)
+    tree = format_trace(spans)
+    assert tree.splitlines()[0].endswith('GET /articles')
+    assert '  view articles.articles_page' in tree
+
+
+def test_root_span_survives_the_span_limit(client, app, tmp_path, monkeypatch):
+    monkeypatch.setattr(tracing, 'MAX_SPANS_PER_TRACE', 2)
+    path = tmp_path / 'traces.jsonl'
+    set_tracing(app, True, str(path), sample_rate=1.0)
+    trace_id = client.get('/articles').headers['X-Trace-Id']
+    drain_exports()
+    spans = read_traces(path)[trace_id]
+    assert len(spans) == 3
+    root = next(data for data in spans if data['name'] == 'GET /articles')
+    assert any(attr['key'] == 'spans.dropped' for attr in root['attributes'])
+
+
+def test_unsampled_requests_and_disabled_tracing(client, app, tmp_path):
+    path = tmp_path / 'traces.jsonl'
+    set_tracing(app, True, str(path), sample_rate=0)
+    assert 'X-Trace-Id' not in client.get('/articles').headers
+    # Only an admin can force sampling through traceparent
+    assert 'X-Trace-Id' not in client.get('/articles', headers={'traceparent': TRACEPARENT}).headers
+
+    app.config['ADMIN_TOKEN'] = 'secret'
+    response = client.get('/articles', headers={'traceparent': TRACEPARENT, 'X-Admin-Token': 'secret'})
+    assert response.headers['X-Trace-Id'] == 'a' * 32
+    drain_exports()
+    root = next(d for d in read_traces(path)['a' * 32] if d['name'] == 'GET /articles')
+    assert root['parentSpanId'] == 'b' * 16
+
+    set_tracing(app, False)
+    assert 'X-Trace-Id' not in client.get('/articles', headers={'traceparent': TRACEPARENT,
+                                                              'X-Admin-Token': 'secret'}).headers
+
+
+def test_span_helpers_are_noops_outside_a_trace():
+    @traced()
+    def work():
+        return 42
+
+    assert work() == 42
+    with span('nothing') as current:
+        assert current is None
+
+
+def test_tracing_endpoint(client, app, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    app.config['ADMIN_TOKEN'] = 'secret'
+    client.environ_base['HTTP_X_ADMIN_TOKEN'] = 'secret'
+    response = client.post('/api/debug/tracing', json={'enabled': True, 'sample_rate': 0.5})
+    assert response.get_json() == {'enabled': True, 'sample_rate': 0.5, 'file': 'traces.jsonl'}
+    assert client.post('/api/debug/tracing', json={'enabled': True, 'sample_rate': 'x'}).status_code == 400
+    # Changing the sampling rate alone keeps tracing on
+    response = client.post('/api/debug/tracing', json={'sample_rate': 0.2})
+    assert response.get_json() == {'enabled': True, 'sample_rate': 0.2, 'file': 'traces.jsonl'}
+    assert client.post('/api/debug/tracing', json={'enabled': False}).get_json()['enabled'] is False
+    response = client.post('/api/debug/tracing', json={'sample_rate': 0.3})
+    assert response.get_json()['enabled'] is False and response.get_json()['sample_rate'] == 0.3
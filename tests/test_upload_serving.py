@@ -0,0 +1,33 @@
+import io
+
+
+def _upload(client, data=b'0123456789' * 100):
+    resp = client.post('/api/media', data={'file': (io.BytesIO(data), 'pic.png')},
+                       content_type='multipart/form-data')
+    return resp.get_json()['media']
+
+
+def test_uploads_support_ranges_and_strong_etags(media_app):
+    client = media_app.test_client()
+    media = _upload(client)
+
+    resp = client.get(media['file_path'], headers={'Range': 'bytes=10-19'})
+    assert resp.status_code == 206
+    assert resp.data == b'0123456789'
+    assert resp.headers['ETag'] == f'"{media["filename"]}"'
+    assert 'immutable' in resp.headers['Cache-Control']
+
+    not_modified = client.get(media['file_path'], headers={'If-None-Match': resp.headers['ETag']})
+    assert not_modified.status_code == 304
+
+
+def test_uploads_offload_to_nginx_and_hide_partials(media_app):
+    media_app.config['MEDIA_ACCEL'] = 'nginx'
+    client = media_app.test_client()
+    media = _upload(client)
+
+    resp = client.get(media['file_path'])
+    assert resp.headers['X-Accel-Redirect'] == '/protected-uploads/' + media['filename']
+    assert resp.data == b''
+    assert client.get('/static/uploads/.partial/x.part').status_code == 404
+    assert client.get('/static/uploads/../../__init__.py').status_code == 404